@@ -92,7 +92,9 @@ class GenericSubAgent:
         """
         if llm is None:
             from src.config.llm import get_gpt_model
-            self.llm = get_gpt_model()
+            from src.utils.llm_scheduler import PRIORITY_BATCH
+            # 后台分析任务，让位于交互请求
+            self.llm = get_gpt_model(priority=PRIORITY_BATCH)
         else:
             self.llm = llm
     
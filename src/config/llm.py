@@ -4,6 +4,9 @@ from typing import Optional
 from dotenv import load_dotenv
 from langchain_openai import ChatOpenAI
 
+from src.utils.llm_pool import PoolCallback, get_llm_pool
+from src.utils.llm_scheduler import PRIORITY_NORMAL, get_scheduler_callbacks
+
 load_dotenv()
 
 DEFAULT_OPENAI_PROXY_BASE_URL = "https://api.openai-proxy.org/v1"
@@ -34,8 +37,37 @@ def _require_api_key(*keys: str) -> str:
     )
 
 
-def get_gpt_model(model: Optional[str] = None, streaming: bool = False):
+def _client_options() -> dict:
+    # 单次 HTTP 请求的硬上限；请求级截止时间由 src/utils/deadline.py 在调用处控制。
+    # 429 的退避交给 LLM 调度器（src/utils/llm_scheduler.py），客户端只保留少量重试
+    return {
+        "timeout": float(os.getenv("LLM_TIMEOUT_SECONDS", 60)),
+        "max_retries": int(os.getenv("LLM_MAX_RETRIES", 1)),
+    }
+
+
+def _use_alternate_endpoint() -> bool:
+    return os.getenv("LLM_HEDGE_ALTERNATE", "false").lower() == "true" and bool(_get_first_env("MT_OPENAI_API_KEY", "mt"))
+
+
+def get_gpt_model(
+    model: Optional[str] = None,
+    streaming: bool = False,
+    priority: int = PRIORITY_NORMAL,
+    alternate: bool = False,
+):
+    """
+    配置了 LLM_ENDPOINTS 时从多端点池中按健康状况选端点，见 src/utils/llm_pool.py。
+
+    alternate=True 用于对冲请求：池中有多个端点时优先发往次优端点；没有池时，
+    配置了 LLM_HEDGE_ALTERNATE=true 且内部网关可用则发往 mt_llm，否则对同一代理重发。
+    """
     resolved_model = model or _get_first_env("OPENAI_COMPAT_MODEL") or "gpt-4o-mini"
+    pool = get_llm_pool()
+    if pool is not None:
+        return _pooled_model(pool, resolved_model, streaming, priority, alternate)
+    if alternate and _use_alternate_endpoint():
+        return mt_llm(model or "gpt-4.1", streaming=streaming, priority=priority)
     api_key = _require_api_key("OPENAI_COMPAT_API_KEY", "OPENAI_PROXY_API_KEY", "close")
     base_url = _normalize_base_url(
         _get_first_env("OPENAI_COMPAT_BASE_URL", "OPENAI_PROXY_BASE_URL"),
@@ -46,10 +78,34 @@ def get_gpt_model(model: Optional[str] = None, streaming: bool = False):
         api_key=api_key,
         base_url=base_url,
         streaming=streaming,
+        callbacks=get_scheduler_callbacks(resolved_model, priority),
+        **_client_options(),
     )
 
 
-def get_claude_model(model: str = "claude-haiku-4-5", streaming: bool = False):
+def _pooled_model(pool, model: str, streaming: bool, priority: int, alternate: bool):
+    endpoints = pool.select(model)
+    if alternate and len(endpoints) > 1:
+        endpoints = endpoints[1:] + endpoints[:1]
+    max_fallbacks = int(os.getenv("LLM_POOL_MAX_FALLBACKS", 1))
+    models = [
+        ChatOpenAI(
+            model=endpoint.model_name(model),
+            api_key=endpoint.api_key,
+            base_url=endpoint.base_url,
+            streaming=streaming,
+            callbacks=get_scheduler_callbacks(model, priority) + [PoolCallback(endpoint)],
+            **_client_options(),
+        )
+        for endpoint in endpoints[: 1 + max_fallbacks]
+    ]
+    if len(models) == 1:
+        return models[0]
+    # 同一次调用内失败时切到下一个端点；bind_tools 等会同时作用于所有端点
+    return models[0].with_fallbacks(models[1:])
+
+
+def get_claude_model(model: str = "claude-haiku-4-5", streaming: bool = False, priority: int = PRIORITY_NORMAL):
     api_key = _require_api_key("OPENAI_COMPAT_API_KEY", "OPENAI_PROXY_API_KEY", "close")
     base_url = _normalize_base_url(
         _get_first_env("ANTHROPIC_PROXY_BASE_URL"),
@@ -60,10 +116,12 @@ def get_claude_model(model: str = "claude-haiku-4-5", streaming: bool = False):
         api_key=api_key,
         base_url=base_url,
         streaming=streaming,
+        callbacks=get_scheduler_callbacks(model, priority),
+        **_client_options(),
     )
 
 
-def mt_llm(model: str = "gpt-4.1", streaming: bool = False):
+def mt_llm(model: str = "gpt-4.1", streaming: bool = False, priority: int = PRIORITY_NORMAL):
     api_key = _require_api_key("MT_OPENAI_API_KEY", "mt")
     base_url = (_get_first_env("MT_OPENAI_BASE_URL") or "https://aigc.sankuai.com/v1/openai/native").rstrip("/")
     return ChatOpenAI(
@@ -71,4 +129,7 @@ def mt_llm(model: str = "gpt-4.1", streaming: bool = False):
         api_key=api_key,
         base_url=base_url,
         streaming=streaming,
+        callbacks=get_scheduler_callbacks(model, priority),
+        **_client_options(),
     )
+
@@ -0,0 +1,85 @@
+"""
+节点模型路由配置加载器
+从 model_routes.yaml 读取每个节点（可按 SOP 覆盖）的模型梯队
+"""
+
+import logging
+import os
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional
+
+import yaml
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_TIERS = ["gpt-4.1-mini"]
+
+
+@dataclass
+class ModelRoute:
+    """单个节点的模型梯队"""
+    node: str
+    tiers: List[str] = field(default_factory=lambda: list(DEFAULT_TIERS))
+    min_length: int = 0
+
+    @property
+    def primary(self) -> str:
+        return self.tiers[0]
+
+
+class ModelRouter:
+    """模型路由加载器"""
+
+    def __init__(self, config_path: str = None):
+        if config_path is None:
+            config_path = os.path.join(os.path.dirname(__file__), "model_routes.yaml")
+        self.config_path = config_path
+        self.defaults: Dict[str, Any] = {}
+        self.nodes: Dict[str, Dict[str, Any]] = {}
+        self.sops: Dict[str, Dict[str, Dict[str, Any]]] = {}
+        self._load()
+
+    def _load(self):
+        try:
+            with open(self.config_path, "r", encoding="utf-8") as f:
+                raw_config = yaml.safe_load(f) or {}
+        except FileNotFoundError:
+            logger.error("Model route config not found: %s", self.config_path)
+            return
+        except Exception as e:
+            logger.exception("Error loading model routes: %s", e)
+            return
+
+        self.defaults = raw_config.get("defaults") or {}
+        self.nodes = raw_config.get("nodes") or {}
+        self.sops = raw_config.get("sops") or {}
+        logger.info("Loaded model routes for %s nodes, %s SOP overrides", len(self.nodes), len(self.sops))
+
+    def get_route(self, node: str, intent: Optional[str] = None) -> ModelRoute:
+        """合并 defaults < nodes.<node> < sops.<intent>.<node>"""
+        merged: Dict[str, Any] = dict(self.defaults)
+        merged.update(self.nodes.get(node) or {})
+        if intent:
+            merged.update((self.sops.get(intent) or {}).get(node) or {})
+
+        tiers = [str(model) for model in merged.get("tiers") or []] or list(DEFAULT_TIERS)
+        return ModelRoute(node=node, tiers=tiers, min_length=int(merged.get("min_length", 0)))
+
+    def reload(self):
+        """重新加载配置"""
+        self.defaults, self.nodes, self.sops = {}, {}, {}
+        self._load()
+
+
+_model_router: Optional[ModelRouter] = None
+
+
+def get_model_router() -> ModelRouter:
+    global _model_router
+    if _model_router is None:
+        _model_router = ModelRouter()
+    return _model_router
+
+
+def get_model_route(node: str, intent: Optional[str] = None) -> ModelRoute:
+    return get_model_router().get_route(node, intent)
@@ -8,6 +8,7 @@ QDRANT_HOST = os.getenv("QDRANT_HOST", "localhost")
 QDRANT_PORT = int(os.getenv("QDRANT_PORT", 6333))
 QDRANT_API_KEY = os.getenv("QDRANT_API_KEY")
 QDRANT_HTTPS = os.getenv("QDRANT_HTTPS", "false").lower() == "true"
+QDRANT_TIMEOUT = int(os.getenv("QDRANT_TIMEOUT_SECONDS", 5))
 
 
 def get_qdrant_client_kwargs() -> dict:
@@ -15,6 +16,7 @@ def get_qdrant_client_kwargs() -> dict:
         "host": QDRANT_HOST,
         "port": QDRANT_PORT,
         "https": QDRANT_HTTPS,
+        "timeout": QDRANT_TIMEOUT,
     }
     if QDRANT_API_KEY:
         kwargs["api_key"] = QDRANT_API_KEY
@@ -1,14 +1,17 @@
-import json
+import asyncio
 import logging
+import os
 import sys
+from contextlib import asynccontextmanager
 from datetime import datetime
 from enum import Enum
 from pathlib import Path
-from typing import Any, AsyncIterator, Dict, List, Optional
+from typing import Any, AsyncIterator, Dict, List, Literal, Optional
 from uuid import uuid4
 
-from fastapi import FastAPI, HTTPException
-from fastapi.responses import StreamingResponse
+from fastapi import FastAPI, HTTPException, Query, Request
+from fastapi.responses import Response, StreamingResponse
+from starlette.background import BackgroundTask
 from langchain_core.messages import AIMessage, BaseMessage, HumanMessage
 from langgraph.errors import GraphInterrupt
 from langgraph.types import Command
@@ -20,13 +23,84 @@ sys.path.insert(0, str(project_root))
 
 from src.graph_state import AgentState
 from src.nodes.build_graph import build_graph
+from src.config.mysql import close_aio_pool
+from src.utils.admission import (
+    AdmissionRejected,
+    AdmissionTicket,
+    get_admission_controller,
+    get_admission_stats,
+    resolve_tenant,
+)
+from src.utils.checkpoint_retention import run_retention_loop
+from src.utils.checkpoint_serde import get_serde_stats
+from src.utils.deadline import DEADLINE_KEY, make_deadline, resolve_request_timeout
+from src.utils.execution_log import (
+    get_execution_log_writer,
+    get_slowest_steps,
+    get_thread_steps,
+    get_token_usage_by_intent,
+    is_execution_log_enabled,
+)
+from src.utils.faq_index import get_retrieval_backend, run_snapshot_refresher
+from src.utils.llm_hedge import get_hedge_stats
+from src.utils.llm_pool import get_llm_pool_stats
+from src.utils.llm_scheduler import get_llm_scheduler_stats
+from src.utils.memory_checkpointer import get_memory_saver_stats
+from src.utils.model_cascade import get_cascade_stats
+from src.utils.plan_cache import get_plan_cache_stats
+from src.utils.progress import PROGRESS_EVENT
+from src.utils.sse_encoder import StreamEncoder, encode_sse, normalize_message_content
+from src.utils.state_reader import EXECUTION_CHANNELS, find_step, get_state_reader
+from src.utils.structured_output import get_structured_output_stats
+from src.utils.thread_registry import (
+    STATUS_CANCELLED,
+    STATUS_COMPLETED,
+    STATUS_FAILED,
+    STATUS_INTERRUPTED,
+    STATUS_RUNNING,
+    is_registry_enabled,
+    list_threads,
+    record_thread,
+)
+from src.utils.tiered_checkpointer import get_hot_tier_stats
+
+logger = logging.getLogger(__name__)
+
+
+@asynccontextmanager
+async def lifespan(_: FastAPI):
+    background_tasks = []
+    if get_retrieval_backend() == "local":
+        # 进程内 FAQ 索引：定时从 Qdrant 刷新本地快照
+        background_tasks.append(asyncio.create_task(run_snapshot_refresher()))
+    if (
+        os.getenv("LANGGRAPH_CHECKPOINTER", "mysql").lower() == "mysql"
+        and float(os.getenv("CHECKPOINT_RETENTION_INTERVAL_SECONDS", 3600)) > 0
+    ):
+        # checkpoint 保留策略：多 worker 时由 MySQL GET_LOCK 保证只有一个在清理
+        background_tasks.append(asyncio.create_task(run_retention_loop()))
+    execution_log = get_execution_log_writer()
+    if is_execution_log_enabled():
+        try:
+            await execution_log.start()
+        except Exception as e:
+            logger.warning("Execution log writer disabled: %s", e)
+    try:
+        yield
+    finally:
+        for task in background_tasks:
+            task.cancel()
+        await asyncio.gather(*background_tasks, return_exceptions=True)
+        await execution_log.close()
+        await close_aio_pool()
+
 
 app = FastAPI(
     title="TT Assistant API",
     description="TT Assistant API",
     version="v0.1",
+    lifespan=lifespan,
 )
-logger = logging.getLogger(__name__)
 
 
 class ChatRequest(BaseModel):
@@ -34,6 +108,14 @@ class ChatRequest(BaseModel):
     thread_id: Optional[str] = None
     resume_input: Optional[str] = None
     history: Optional[List[dict]] = Field(default_factory=list)
+    # checkpoint 持久化时机：sync 每步落库后再继续 / async 后台按序落库 / exit 只在结束或中断时落库
+    durability: Optional[Literal["sync", "async", "exit"]] = None
+    # /chat/stream 的 updates 事件只推送这些 payload 字段（为空表示全部）
+    stream_fields: Optional[List[str]] = None
+    # 从最后一个 checkpoint 继续执行（用于客户端断开后被取消的运行）
+    resume_cancelled: bool = False
+    # 请求整体超时（秒），优先于 X-Request-Timeout 头和 REQUEST_TIMEOUT_SECONDS
+    timeout_seconds: Optional[float] = Field(default=None, gt=0)
 
 
 class StepResultResponse(BaseModel):
@@ -67,12 +149,6 @@ class StreamMessageResponse(BaseModel):
     content: str = ""
 
 
-class StreamEventResponse(BaseModel):
-    thread_id: str
-    mode: str
-    data: Dict[str, Any] = Field(default_factory=dict)
-
-
 def build_initial_state(request: ChatRequest) -> AgentState:
     # 这里构造的是“最小可运行状态”：
     # 只放图入口一定会用到的字段，其余字段交给节点按需补齐。
@@ -80,6 +156,8 @@ def build_initial_state(request: ChatRequest) -> AgentState:
     initial_state["original_query"] = request.query or ""
     initial_state["plan"] = []
     initial_state["current_step"] = 0
+    # 同一 thread 的上一轮计划缓存信息不能带到这一轮（SOP 路径不经过 planning_node，不会覆盖它）
+    initial_state["plan_cache"] = None
 
     messages = []
     for msg in request.history or []:
@@ -169,7 +247,11 @@ def extract_interrupt_question(state_snapshot: Any) -> Optional[str]:
     return str(interrupt_value)
 
 
-def build_graph_input(request: ChatRequest) -> AgentState | Command:
+def build_graph_input(request: ChatRequest) -> AgentState | Command | None:
+    if request.resume_cancelled:
+        # 输入为 None 时 LangGraph 从该 thread 最后一个 checkpoint 的 next 节点继续
+        return None
+
     if request.resume_input:
         logger.info("Resuming interrupted graph execution")
         # LangGraph 的 resume 机制：Command(resume=value) 会将 value 传回
@@ -179,21 +261,63 @@ def build_graph_input(request: ChatRequest) -> AgentState | Command:
     return build_initial_state(request)
 
 
-async def execute_chat_request(request: ChatRequest) -> tuple[Dict[str, Any], str, str]:
+def resolve_durability(request: ChatRequest) -> str:
+    """
+    请求未指定时使用 CHECKPOINT_DURABILITY（默认 async）
+
+    async / exit 下 checkpoint 写入不再阻塞节点之间的切换；LangGraph 会按顺序提交同一次运行的写入，
+    并在中断（ask_human_node）和图执行结束时等待写入完成后才返回，所以随后的 aget_state 能读到最新状态。
+    """
+    durability = request.durability or os.getenv("CHECKPOINT_DURABILITY", "async").lower()
+    if durability not in ("sync", "async", "exit"):
+        logger.warning("Unknown CHECKPOINT_DURABILITY=%s, using async", durability)
+        return "async"
+    return durability
+
+
+REQUEST_TIMEOUT_HEADER = "X-Request-Timeout"
+
+
+def build_run_config(thread_id: str, request: ChatRequest, timeout_header: Optional[str] = None) -> Dict[str, Any]:
+    """图运行配置；deadline 随 config 传到各节点，约束其中的 LLM / 工具 / 检索调用"""
+    timeout_seconds = resolve_request_timeout(request.timeout_seconds, timeout_header)
+    return {"configurable": {"thread_id": thread_id, DEADLINE_KEY: make_deadline(timeout_seconds)}}
+
+
+async def record_thread_snapshot(thread_id: str, state_snapshot: Any, status: str) -> None:
+    values = getattr(state_snapshot, "values", None) or {}
+    checkpoint_config = getattr(state_snapshot, "config", None) or {}
+    await record_thread(
+        thread_id,
+        status,
+        intent=values.get("intent"),
+        last_checkpoint_id=checkpoint_config.get("configurable", {}).get("checkpoint_id"),
+    )
+
+
+async def execute_chat_request(
+    request: ChatRequest, timeout_header: Optional[str] = None
+) -> tuple[Dict[str, Any], str, str]:
     graph = None
     thread_id = resolve_thread_id(request.thread_id)
+    await record_thread(thread_id, STATUS_RUNNING)
     try:
+        config = build_run_config(thread_id, request, timeout_header)
         graph = await build_graph(init_mcp=False)
-        config = {"configurable": {"thread_id": thread_id}}
         result = {}
 
         try:
-            result = await graph.ainvoke(build_graph_input(request), config=config)
+            result = await graph.ainvoke(
+                build_graph_input(request), config=config, durability=resolve_durability(request)
+            )
         except GraphInterrupt:
             logger.info("Graph execution interrupted for thread_id=%s", thread_id)
 
         state_snapshot = await graph.aget_state(config)
         question = extract_interrupt_question(state_snapshot)
+        await record_thread_snapshot(
+            thread_id, state_snapshot, STATUS_INTERRUPTED if question else STATUS_COMPLETED
+        )
         if question:
             return (
                 {
@@ -211,6 +335,9 @@ async def execute_chat_request(request: ChatRequest) -> tuple[Dict[str, Any], st
 
         result["thread_id"] = thread_id
         return result, "success", thread_id
+    except Exception:
+        await record_thread(thread_id, STATUS_FAILED)
+        raise
     finally:
         await cleanup_runtime(graph)
 
@@ -230,26 +357,6 @@ async def cleanup_runtime(graph: Any) -> None:
             logger.warning("Error closing DB connection: %s", exc)
 
 
-def encode_sse(event: str, data: Dict[str, Any]) -> str:
-    return f"event: {event}\ndata: {json.dumps(data, ensure_ascii=False)}\n\n"
-
-
-def normalize_message_content(content: Any) -> str:
-    if isinstance(content, str):
-        return content
-    if isinstance(content, list):
-        parts = []
-        for item in content:
-            if isinstance(item, str):
-                parts.append(item)
-            elif isinstance(item, dict):
-                text = item.get("text")
-                if isinstance(text, str):
-                    parts.append(text)
-        return "".join(parts)
-    return str(content) if content is not None else ""
-
-
 def make_json_safe(value: Any) -> Any:
     if isinstance(value, BaseMessage):
         return StreamMessageResponse(
@@ -270,67 +377,62 @@ def make_json_safe(value: Any) -> Any:
     return value
 
 
-def build_updates_event_payload(thread_id: str, update: Dict[str, Any]) -> StreamEventResponse:
-    node_name, payload = next(iter(update.items()))
-    return StreamEventResponse(
-        thread_id=thread_id,
-        mode="updates",
-        data={
-            "node": node_name,
-            "payload": make_json_safe(payload),
-        },
-    )
-
-
-def build_messages_event_payload(
-    thread_id: str,
-    message: BaseMessage,
-    metadata: Dict[str, Any],
-) -> StreamEventResponse:
-    return StreamEventResponse(
-        thread_id=thread_id,
-        mode="messages",
-        data={
-            "message": make_json_safe(message),
-            "metadata": make_json_safe(metadata),
-        },
-    )
-
-
 async def emit_graph_stream(
     graph: Any,
     graph_input: AgentState | Command,
     config: Dict[str, Any],
+    durability: str = "sync",
+    encoder: Optional[StreamEncoder] = None,
 ) -> AsyncIterator[str]:
+    encoder = encoder or StreamEncoder(config["configurable"]["thread_id"])
     async for update in graph.astream(
         graph_input,
         config=config,
-        stream_mode=["updates", "messages"],
+        stream_mode=["updates", "messages", "custom"],
+        durability=durability,
     ):
         if not isinstance(update, tuple) or len(update) != 2:
             continue
 
         mode, chunk = update
-        thread_id = config["configurable"]["thread_id"]
 
-        if mode == "updates" and isinstance(chunk, dict) and chunk:
-            yield encode_sse(
-                "updates",
-                build_updates_event_payload(thread_id, chunk).model_dump(),
-            )
+        if mode == "custom" and isinstance(chunk, dict) and chunk.get("type") == PROGRESS_EVENT:
+            # 进度事件只推给客户端，不写入 state / checkpoint
+            yield encoder.event("progress", chunk)
+        elif mode == "updates" and isinstance(chunk, dict) and chunk:
+            node_name, payload = next(iter(chunk.items()))
+            event = encoder.updates(node_name, payload)
+            if event is not None:
+                yield event
         elif mode == "messages" and isinstance(chunk, tuple) and len(chunk) == 2:
             message, metadata = chunk
             if isinstance(message, BaseMessage) and isinstance(metadata, dict):
-                yield encode_sse(
-                    "messages",
-                    build_messages_event_payload(thread_id, message, metadata).model_dump(),
-                )
+                yield encoder.messages(message, metadata)
+
+
+async def admit_request(http_request: Request) -> Optional[AdmissionTicket]:
+    """准入控制；被拒绝时直接返回 429 / 503 和 Retry-After，不进入图执行"""
+    controller = get_admission_controller()
+    if controller is None:
+        return None
+    client_host = http_request.client.host if http_request.client else None
+    try:
+        return await controller.acquire(resolve_tenant(http_request.headers, client_host))
+    except AdmissionRejected as exc:
+        raise HTTPException(
+            status_code=exc.status_code,
+            detail=str(exc),
+            headers={"Retry-After": str(exc.retry_after)},
+        )
 
 
 @app.post("/chat", response_model=ChatResponse)
-async def chat(request: ChatRequest):
+async def chat(request: ChatRequest, http_request: Request):
+    ticket = await admit_request(http_request)
     try:
-        result, status, thread_id = await execute_chat_request(request)
+        result, status, thread_id = await execute_chat_request(
+            request, http_request.headers.get(REQUEST_TIMEOUT_HEADER)
+        )
         return build_chat_response(
             result=result,
             request=request,
@@ -342,69 +444,141 @@ async def chat(request: ChatRequest):
     except Exception as exc:
         logger.exception("Chat request failed")
         raise HTTPException(status_code=500, detail=str(exc))
+    finally:
+        if ticket is not None:
+            ticket.release()
+
+
+SSE_HEARTBEAT = ": heartbeat\n\n"
+_STREAM_END = object()
 
 
 @app.post("/chat/stream")
-async def chat_stream(request: ChatRequest):
-    async def event_generator() -> AsyncIterator[str]:
-        graph = None
-        thread_id = resolve_thread_id(request.thread_id)
-        config = {"configurable": {"thread_id": thread_id}}
+async def chat_stream(request: ChatRequest, http_request: Request):
+    """
+    流式执行
+
+    图在独立的生产者任务里运行，事件经队列转给响应生成器：
+    - 空闲超过 SSE_HEARTBEAT_SECONDS 时发送 SSE 注释作为心跳，避免代理按读超时断开长时间的运行
+    - 客户端断开（心跳时检测到，或发送失败导致生成器关闭）时取消生产者任务，
+      正在进行的 LLM / 工具调用随之取消；已写入的 checkpoint 保留，注册表标记为 cancelled，
+      之后可以带 resume_cancelled=true 从最后一个 checkpoint 继续
+    - 准入槽位在整个流结束（或客户端断开）后才释放
+    """
+    ticket = await admit_request(http_request)
+    thread_id = resolve_thread_id(request.thread_id)
+    config = build_run_config(thread_id, request, http_request.headers.get(REQUEST_TIMEOUT_HEADER))
+    heartbeat_seconds = float(os.getenv("SSE_HEARTBEAT_SECONDS", 15))
 
+    async def run_graph(queue: asyncio.Queue) -> None:
+        graph = None
         try:
+            await record_thread(thread_id, STATUS_RUNNING)
             graph = await build_graph(init_mcp=False)
-            yield encode_sse(
+            await queue.put(encode_sse(
                 "metadata",
                 {
                     "thread_id": thread_id,
                     "mode": "metadata",
                     "data": {"message": "started"},
                 },
-            )
+            ))
 
             try:
-                async for event in emit_graph_stream(graph, build_graph_input(request), config):
-                    yield event
+                async for event in emit_graph_stream(
+                    graph,
+                    build_graph_input(request),
+                    config,
+                    durability=resolve_durability(request),
+                    encoder=StreamEncoder(thread_id, request.stream_fields),
+                ):
+                    await queue.put(event)
             except GraphInterrupt:
                 logger.info("Graph stream interrupted for thread_id=%s", thread_id)
 
             state_snapshot = await graph.aget_state(config)
             question = extract_interrupt_question(state_snapshot)
+            await record_thread_snapshot(
+                thread_id, state_snapshot, STATUS_INTERRUPTED if question else STATUS_COMPLETED
+            )
             if question:
-                yield encode_sse(
+                await queue.put(encode_sse(
                     "clarification",
                     {
                         "thread_id": thread_id,
                         "mode": "clarification",
                         "data": {"question": question},
                     },
-                )
+                ))
                 return
 
             state = state_snapshot.values or {}
             response = build_chat_response(state, request, thread_id, status="success")
-            yield encode_sse(
+            await queue.put(encode_sse(
                 "final",
                 {
                     "thread_id": thread_id,
                     "mode": "final",
                     "data": response.model_dump(),
                 },
-            )
+            ))
+        except asyncio.CancelledError:
+            logger.info("Client disconnected, cancelled graph run for thread_id=%s", thread_id)
+            await record_cancelled_run(graph, thread_id, config)
+            raise
         except Exception as exc:
             logger.exception("Chat stream failed for thread_id=%s", thread_id)
-            yield encode_sse(
+            await record_thread(thread_id, STATUS_FAILED)
+            await queue.put(encode_sse(
                 "error",
                 {
                     "thread_id": thread_id,
                     "mode": "error",
                     "data": {"message": str(exc)},
                 },
-            )
+            ))
         finally:
             await cleanup_runtime(graph)
+            queue.put_nowait(_STREAM_END)
 
-    return StreamingResponse(event_generator(), media_type="text/event-stream")
+    async def event_generator() -> AsyncIterator[str]:
+        queue: asyncio.Queue = asyncio.Queue()
+        producer = asyncio.create_task(run_graph(queue))
+        try:
+            while True:
+                try:
+                    event = await asyncio.wait_for(queue.get(), timeout=heartbeat_seconds)
+                except asyncio.TimeoutError:
+                    if await http_request.is_disconnected():
+                        break
+                    yield SSE_HEARTBEAT
+                    continue
+                if event is _STREAM_END:
+                    break
+                yield event
+        finally:
+            if not producer.done():
+                producer.cancel()
+            await asyncio.gather(producer, return_exceptions=True)
+            if ticket is not None:
+                ticket.release()
+
+    return StreamingResponse(
+        event_generator(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+        # 生成器没有被迭代（发送响应头前客户端已断开）时也要归还槽位；release 可重复调用
+        background=BackgroundTask(ticket.release) if ticket is not None else None,
+    )
+
+
+async def record_cancelled_run(graph: Any, thread_id: str, config: Dict[str, Any]) -> None:
+    """取消后记录最后一个 checkpoint；失败只记日志"""
+    try:
+        state_snapshot = await graph.aget_state(config) if graph is not None else None
+        await record_thread_snapshot(thread_id, state_snapshot, STATUS_CANCELLED)
+    except Exception as exc:
+        logger.warning("Failed to record cancelled run for thread_id=%s: %s", thread_id, exc)
 
 
 @app.get("/health")
@@ -412,48 +586,203 @@ async def health_check():
     return {"status": "healthy"}
 
 
-@app.get("/execution/{thread_id}")
-async def get_execution_history(thread_id: str):
+@app.get("/stats/checkpoint-serde")
+async def checkpoint_serde_stats():
+    """当前进程累计的 checkpoint 序列化体积（bytes_per_checkpoint / 压缩比）"""
+    return get_serde_stats()
+
+
+@app.get("/stats/checkpoint-cache")
+async def checkpoint_cache_stats():
+    """checkpoint 热层命中率 / 条目数 / 淘汰次数"""
+    return get_hot_tier_stats()
+
+
+@app.get("/stats/admission")
+async def admission_stats():
+    """准入控制：在途请求数 / 队列深度 / 排队耗时分位数 / 各原因拒绝次数"""
+    stats = get_admission_stats()
+    if stats is None:
+        raise HTTPException(status_code=404, detail="准入控制未启用")
+    return stats
+
+
+@app.get("/stats/llm-scheduler")
+async def llm_scheduler_stats():
+    """各模型的在途调用 / AIMD 并发上限 / 按优先级的排队数 / 令牌桶余量 / 429 次数"""
+    return get_llm_scheduler_stats() or {}
+
+
+@app.get("/stats/llm-pool")
+async def llm_pool_stats():
+    """各 LLM 端点的熔断状态 / 延迟 EWMA / 在途数 / 失败次数（未配置 LLM_ENDPOINTS 时 404）"""
+    stats = get_llm_pool_stats()
+    if stats is None:
+        raise HTTPException(status_code=404, detail="LLM 端点池未启用")
+    return stats
+
+
+@app.get("/stats/llm-hedge")
+async def llm_hedge_stats():
+    """各节点的调用数 / 对冲次数 / 对冲请求胜出次数 / 剩余预算"""
+    return get_hedge_stats() or {}
+
+
+@app.get("/stats/model-cascade")
+async def model_cascade_stats():
+    """各节点由哪一级模型承接、升级原因分布"""
+    return get_cascade_stats()
+
+
+@app.get("/stats/structured-output")
+async def structured_output_stats():
+    """各节点结构化输出的解析失败次数 / 失败率 / 失败原因"""
+    return get_structured_output_stats()
+
+
+@app.get("/stats/plan-cache")
+async def plan_cache_stats():
+    """计划缓存条目数，以及各问题模板的命中率 / 计划执行成功率"""
+    stats = get_plan_cache_stats()
+    if stats is None:
+        raise HTTPException(status_code=404, detail="计划缓存未启用")
+    return stats
+
+
+@app.get("/stats/memory-checkpointer")
+async def memory_checkpointer_stats():
+    """内存 checkpointer 的 thread 数 / 字节数 / 淘汰次数（未使用内存模式时 404）"""
+    stats = get_memory_saver_stats()
+    if stats is None:
+        raise HTTPException(status_code=404, detail="内存 checkpointer 未启用")
+    return stats
+
+
+@app.get("/threads")
+async def get_threads(
+    status: Optional[str] = None,
+    intent: Optional[str] = None,
+    limit: int = Query(20, ge=1, le=100),
+    cursor: Optional[str] = None,
+):
+    """按最近活跃时间倒序分页列出会话；翻页时把上一页的 next_cursor 原样传回"""
+    if not is_registry_enabled():
+        raise HTTPException(status_code=404, detail="会话注册表未启用")
+    try:
+        page = await list_threads(status=status, intent=intent, limit=limit, cursor=cursor)
+    except ValueError as exc:
+        raise HTTPException(status_code=400, detail=str(exc))
+    return make_json_safe(page)
+
+
+@app.get("/analytics/steps/slowest")
+async def analytics_slowest_steps(
+    intent: Optional[str] = None,
+    since_hours: int = Query(24, ge=1, le=24 * 90),
+    limit: int = Query(20, ge=1, le=200),
+):
+    """按 (intent, 步骤) 聚合的平均 / 最大耗时，找出最慢的 SOP 步骤"""
+    if not is_execution_log_enabled():
+        raise HTTPException(status_code=404, detail="执行日志未启用")
+    rows = await get_slowest_steps(since_hours=since_hours, intent=intent, limit=limit)
+    return make_json_safe({"since_hours": since_hours, "items": rows})
+
+
+@app.get("/analytics/tokens/by-intent")
+async def analytics_tokens_by_intent(since_hours: int = Query(24, ge=1, le=24 * 90)):
+    """各 intent 的运行次数与 token 消耗"""
+    if not is_execution_log_enabled():
+        raise HTTPException(status_code=404, detail="执行日志未启用")
+    rows = await get_token_usage_by_intent(since_hours=since_hours)
+    return make_json_safe({"since_hours": since_hours, "items": rows})
+
+
+@app.get("/analytics/threads/{thread_id}/steps")
+async def analytics_thread_steps(thread_id: str):
+    """单个会话在执行日志中的全部步骤记录；checkpoint 被清理后仍可查询"""
+    if not is_execution_log_enabled():
+        raise HTTPException(status_code=404, detail="执行日志未启用")
+    rows = await get_thread_steps(thread_id)
+    return make_json_safe({"thread_id": thread_id, "items": rows})
+
+
+def build_execution_history(thread_id: str, state: Dict[str, Any]) -> Dict[str, Any]:
+    return {
+        "thread_id": thread_id,
+        "query": state.get("original_query"),
+        "plan": state.get("plan"),
+        "step_results": [
+            item.model_dump()
+            for item in (serialize_step_results(state.get("step_results")) or [])
+        ],
+        "execution_summary": serialize_execution_summary(state.get("execution_summary")),
+    }
+
+
+async def read_state_via_graph(thread_id: str) -> Dict[str, Any]:
+    """非 MySQL checkpointer 时的通用读取路径：编译图后 aget_state"""
     graph = None
     try:
         graph = await build_graph(init_mcp=False)
-        config = {"configurable": {"thread_id": thread_id}}
-        state_snapshot = await graph.aget_state(config)
-
+        state_snapshot = await graph.aget_state({"configurable": {"thread_id": thread_id}})
         if not state_snapshot or not state_snapshot.values:
             raise HTTPException(status_code=404, detail="会话不存在")
+        return state_snapshot.values
+    finally:
+        await cleanup_runtime(graph)
+
 
-        state = state_snapshot.values
-        return {
-            "thread_id": thread_id,
-            "query": state.get("original_query"),
-            "plan": state.get("plan"),
-            "step_results": [
-                item.model_dump()
-                for item in (serialize_step_results(state.get("step_results")) or [])
-            ],
-            "execution_summary": serialize_execution_summary(state.get("execution_summary")),
-        }
+async def read_execution_state(
+    thread_id: str,
+    request: Request,
+    response: Response,
+    channels: tuple = EXECUTION_CHANNELS,
+) -> Optional[Dict[str, Any]]:
+    """
+    读取执行状态并处理条件请求
+
+    Returns:
+        channel 值字典；If-None-Match 命中时返回 None（调用方直接回 304）
+    """
+    reader = await get_state_reader()
+    if reader is None:
+        return await read_state_via_graph(thread_id)
+
+    view = await reader.read(thread_id, channels=channels, if_none_match=request.headers.get("if-none-match"))
+    if view is None:
+        raise HTTPException(status_code=404, detail="会话不存在")
+    response.headers["ETag"] = view.etag
+    # 允许客户端缓存，但每次都要带 If-None-Match 回来校验
+    response.headers["Cache-Control"] = "no-cache"
+    return None if view.not_modified else view.values
+
+
+@app.get("/execution/{thread_id}")
+async def get_execution_history(thread_id: str, request: Request, response: Response):
+    try:
+        state = await read_execution_state(thread_id, request, response)
+        if state is None:
+            return Response(status_code=304, headers=dict(response.headers))
+        return build_execution_history(thread_id, state)
     except HTTPException:
         raise
     except Exception as exc:
         logger.exception("Get execution history failed for thread_id=%s", thread_id)
         raise HTTPException(status_code=500, detail=str(exc))
-    finally:
-        await cleanup_runtime(graph)
 
 
 @app.get("/execution/{thread_id}/step/{step_index}")
-async def get_step_detail(thread_id: str, step_index: int):
+async def get_step_detail(thread_id: str, step_index: int, request: Request, response: Response):
     try:
-        history = await get_execution_history(thread_id)
-        steps = history.get("step_results", [])
-        matching_steps = [step for step in steps if step["step_index"] == step_index]
+        state = await read_execution_state(thread_id, request, response, channels=("step_results",))
+        if state is None:
+            return Response(status_code=304, headers=dict(response.headers))
 
-        if not matching_steps:
+        step = find_step(state.get("step_results"), step_index)
+        if step is None:
             raise HTTPException(status_code=404, detail=f"步骤 {step_index} 不存在")
 
-        return matching_steps[0]
+        return serialize_step_results([step])[0].model_dump()
     except HTTPException:
         raise
     except Exception as exc:
@@ -1,7 +1,7 @@
 import operator
 
 from pydantic import BaseModel, Field
-from typing import Annotated, List, Optional, Required, TypedDict, Union
+from typing import Annotated, List, Literal, Optional, Required, TypedDict, Union
 from langchain_core.messages import AnyMessage
 from langgraph.graph.message import add_messages
 
@@ -47,6 +47,10 @@ class AgentState(TypedDict, total=False):
     # 字面意思：在原始问题基础上补充上下文后的改写版本。
     # 作用：提供给 FAQ 检索、SOP 匹配、planning 等节点作为更适合检索和推理的输入。
     rewritten_query: Annotated[str, overwrite]
+    # `keywords`
+    # 字面意思：改写时从问题中提炼出的关键词（商户ID、字段名等）。
+    # 作用：供检索和排查步骤直接使用，避免再从改写文本里二次抽取。
+    keywords: Annotated[List[str], overwrite]
     # `faq_response`
     # 字面意思：FAQ 召回结果，统一存成字符串。
     # 作用：作为可直接展示或继续传给后续节点参考的 FAQ 上下文。
@@ -65,6 +69,10 @@ class AgentState(TypedDict, total=False):
     # 字面意思：整个执行过程的最终摘要。
     # 作用：把 step_results 汇总成面向接口和前端的总览信息，避免调用方自己再做二次聚合。
     execution_summary: Annotated[Optional[PlanExecutionSummary], overwrite]
+    # `plan_cache`
+    # 字面意思：当前计划对应的计划缓存信息（模板键、槽位值、计划、是否命中）。
+    # 作用：执行结束后据此回写计划缓存、统计模板成功率；SOP 计划和兜底计划为 None。
+    plan_cache: Annotated[Optional[dict], overwrite]
     # `human_question`
     # 字面意思：当前等待用户补充的问题。
     # 作用：由业务节点声明，统一交给 ask_human_node 触发中断。
@@ -81,9 +89,31 @@ class AgentState(TypedDict, total=False):
 
 
 class Plan(BaseModel):
+    """执行计划"""
+
     steps: List[str] = Field(description="遵循的不同步骤，应按顺序排列")
 
 
+class QueryRewrite(BaseModel):
+    """Query 改写结果"""
+
+    need_clarification: bool = Field(default=False, description="是否需要用户澄清")
+    clarifying_question: str = Field(default="", description="需要澄清时向用户提的问题，否则为空")
+    rewritten_query: str = Field(default="", description="改写后的规范排查描述")
+    keywords: List[str] = Field(default_factory=list, description="问题中的关键词，如商户ID、字段名")
+
+
+class ReplanDecision(BaseModel):
+    """执行评估决策"""
+
+    decision: Literal["respond", "continue", "replan"] = Field(
+        description="respond: 信息足够可以回答; continue: 继续执行剩余计划; replan: 需要重新规划"
+    )
+    reasoning: str = Field(default="", description="推理过程")
+    response: Optional[str] = Field(default=None, description="最终响应（仅当 decision 为 respond 时）")
+    new_plan: List[str] = Field(default_factory=list, description="新计划（仅当 decision 为 replan 时）")
+
+
 class Response(BaseModel):
     """Response to user."""
 
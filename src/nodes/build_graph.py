@@ -2,7 +2,6 @@ import logging
 import os
 from functools import partial
 
-from langgraph.checkpoint.memory import MemorySaver
 from langgraph.checkpoint.mysql.aio import AIOMySQLSaver
 from langgraph.graph import END, StateGraph
 
@@ -21,6 +20,10 @@ from src.nodes.query_rewrite_node import query_rewrite_node
 from src.nodes.response_generator_node import response_generator_node
 from src.nodes.sop_match_node import sop_match_node
 from src.tools import ALL_TOOLS
+from src.utils.checkpoint_serde import get_checkpoint_serializer
+from src.utils.memory_checkpointer import get_memory_saver
+from src.utils.sharded_checkpointer import build_sharded_checkpointer, is_sharding_enabled
+from src.utils.tiered_checkpointer import TieredCheckpointer, get_hot_tier, is_hot_tier_enabled
 
 logger = logging.getLogger(__name__)
 sop_loader = get_sop_loader()
@@ -97,26 +100,45 @@ async def build_graph(init_mcp: bool = True):
     return graph.compile(checkpointer=checkpointer, store=None)
 
 
+class MySQLSaver(AIOMySQLSaver):
+    """AIOMySQLSaver + 紧凑序列化，并按 checkpoint 统计写入体积。"""
+
+    async def aput(self, config, checkpoint, metadata, new_versions):
+        result = await super().aput(config, checkpoint, metadata, new_versions)
+        stats = getattr(self.serde, "stats", None)
+        if stats is not None:
+            stats.record_checkpoint()
+        return result
+
+
 async def build_checkpointer():
     persistence_backend = os.getenv("LANGGRAPH_CHECKPOINTER", "mysql").lower()
     allow_memory_fallback = os.getenv("ALLOW_MEMORY_CHECKPOINTER_FALLBACK", "false").lower() == "true"
 
     if persistence_backend == "memory":
-        logger.info("Using in-memory LangGraph checkpointer")
-        return MemorySaver()
+        logger.info("Using bounded in-memory LangGraph checkpointer")
+        return get_memory_saver()
 
     import aiomysql
 
-    conn_str = await get_connection_string()
-    db_params = AIOMySQLSaver.parse_conn_string(conn_str)
-
     try:
-        conn = await aiomysql.connect(**db_params, autocommit=True)
-        return AIOMySQLSaver(conn=conn)
+        if is_sharding_enabled():
+            # 多个 MySQL 实例：按 thread_id 一致性哈希路由，连接池进程内共享
+            saver = await build_sharded_checkpointer(
+                lambda pool: MySQLSaver(conn=pool, serde=get_checkpoint_serializer())
+            )
+        else:
+            conn_str = await get_connection_string()
+            conn = await aiomysql.connect(**AIOMySQLSaver.parse_conn_string(conn_str), autocommit=True)
+            saver = MySQLSaver(conn=conn, serde=get_checkpoint_serializer())
+        if is_hot_tier_enabled():
+            # 最近活跃 thread 的最新 checkpoint 走进程内热层
+            return TieredCheckpointer(saver, get_hot_tier())
+        return saver
     except Exception as exc:
         if allow_memory_fallback:
             logger.warning("MySQL checkpointer unavailable, falling back to memory saver: %s", exc)
-            return MemorySaver()
+            return get_memory_saver()
         raise RuntimeError(f"Failed to initialize MySQL checkpointer: {exc}") from exc
 
 
@@ -1,21 +1,27 @@
 import logging
+from typing import Optional
 
-from src.utils.qdrant_utils import qdrant_select
+from langchain_core.runnables import RunnableConfig
+
+from src.utils.deadline import run_sync_with_deadline
+from src.utils.faq_index import faq_select
 from src.utils.state_utils import get_effective_query
 from src.graph_state import AgentState
 
 logger = logging.getLogger(__name__)
 
 
-async def faq_retrieve_node(state: AgentState):
+async def faq_retrieve_node(state: AgentState, config: Optional[RunnableConfig] = None):
     rewritten_query = get_effective_query(state)
     if not rewritten_query:
         return {"faq_response": None}
 
     try:
-        results = qdrant_select(rewritten_query, collection_name="dz_channel_faq")
+        results = await run_sync_with_deadline(
+            faq_select, rewritten_query, collection_name="dz_channel_faq", config=config, kind="retrieval"
+        )
     except Exception as e:
-        logger.warning("Qdrant query failed, skip FAQ retrieval: %s", e)
+        logger.warning("FAQ query failed, skip FAQ retrieval: %s", e)
         return {"faq_response": None}
 
     faq_items = []
@@ -1,19 +1,18 @@
-import json
 import logging
 import time
 from datetime import datetime
 from typing import List, Optional
 
+from langchain_core.runnables import RunnableConfig
 from langgraph.types import Command
-from langchain_core.messages import SystemMessage, AIMessage, HumanMessage, ToolMessage
-from langchain_core.output_parsers import JsonOutputParser
-from langchain_core.prompts import ChatPromptTemplate
+from langchain_core.messages import AIMessage, SystemMessage, HumanMessage, ToolMessage
 from langchain_core.tools import BaseTool
 
 from src.config.llm import get_gpt_model
+from src.config.model_router import get_model_route
 from src.config.sop_loader import get_sop_loader
 from src.constants import MAX_STEP_OUTPUT_LENGTH, MAX_OUTPUT_PREVIEW_LENGTH, MAX_REPLAN_SUMMARY_LENGTH, MAX_REPLAN_ERROR_LENGTH
-from src.graph_state import AgentState, Plan
+from src.graph_state import AgentState, Plan, ReplanDecision
 from src.tools import (
     ALL_TOOLS,
     ask_human,
@@ -25,6 +24,13 @@ from src.models.execution_result import (
     PlanExecutionSummary,
     TokenUsage
 )
+from src.utils.deadline import DeadlineExceeded, is_expiring, with_deadline
+from src.utils.execution_log import log_execution_summary, log_step_result
+from src.utils.llm_hedge import hedged
+from src.utils.model_cascade import run_cascade
+from src.utils.plan_cache import get_plan_cache, make_key, to_template
+from src.utils.progress import emit_progress
+from src.utils.structured_output import ainvoke_structured
 
 logger = logging.getLogger(__name__)
 sop_loader = get_sop_loader()
@@ -43,52 +49,124 @@ def _extract_token_usage(response) -> TokenUsage:
     return TokenUsage()
 
 
-async def planning_node(state: AgentState):
+async def planning_node(state: AgentState, config: Optional[RunnableConfig] = None):
     """生成执行计划 - 根据intent动态选择prompt"""
     rewritten_query = state['rewritten_query']
     intent = state.get('intent', 'default')
 
+    # 非 SOP 问题先按 (intent, 问题模板) 查计划缓存，命中时跳过 planning 模型调用
+    cache = None if sop_loader.has_sop(intent) else get_plan_cache()
+    cache_ref = None
+    if cache is not None:
+        template, slots = to_template(rewritten_query)
+        cache_ref = {
+            "key": make_key(intent, template),
+            "slots": slots,
+            "hit": False,
+            # step_results 跨轮累积，记下本计划之前已有的条数，结束时只看本计划的步骤
+            "results_offset": len(state.get("step_results", [])),
+        }
+        cached_steps = cache.lookup(cache_ref["key"], slots)
+        if cached_steps:
+            logger.info("Plan cache hit for %s", cache_ref["key"])
+            _emit_plan_created(intent, cached_steps, cached=True)
+            return {
+                "plan": cached_steps,
+                "current_step": 0,
+                "plan_cache": {**cache_ref, "hit": True, "steps": cached_steps},
+            }
+
     # ⭐ 从SOPLoader获取planning prompt（使用模块级 sop_loader）
     plan_prompt = sop_loader.get_planning_prompt(intent)
 
-    plan_parser = JsonOutputParser(pydantic_object=Plan)
-    format_instructions = plan_parser.get_format_instructions()
-
     from src.prompt.prompt_loader import get_prompt
     plan_messages = [SystemMessage(content=get_prompt("system_prompt"))]
     if plan_prompt:
         plan_messages.append(SystemMessage(content=plan_prompt))
-    plan_messages.extend([
-        HumanMessage(content=rewritten_query),
-        SystemMessage(content=f"所有回复必须遵循以下格式：\n{format_instructions}"),
-    ])
-    prompt = ChatPromptTemplate.from_messages(plan_messages)
-    chain = prompt | get_gpt_model("gpt-4.1-mini") | plan_parser
-    _MAX_PLAN_RETRIES = 2
-    result = None
-    for attempt in range(_MAX_PLAN_RETRIES):
-        try:
-            result = await chain.ainvoke({})
-            break
-        except Exception as e:
-            logger.warning("Plan parsing failed (attempt %s/%s): %s", attempt + 1, _MAX_PLAN_RETRIES, e)
-            if attempt == _MAX_PLAN_RETRIES - 1:
-                result = {"steps": [f"直接回答用户问题: {rewritten_query}"]}
-    steps = result.get('steps', [])
-    
-    # 📝 添加计划生成消息
-    plan_message = AIMessage(
-        content=f"📋 [{intent}] 已生成执行计划，共{len(steps)}个步骤:\n" + 
-                "\n".join([f"{i+1}. {step}" for i, step in enumerate(steps)])
-    )
-    
+    plan_messages.append(HumanMessage(content=rewritten_query))
+
+    streamed_steps = 0
+
+    def on_partial(partial: dict) -> None:
+        # 最后一个步骤可能还没生成完，只推送已完整的步骤
+        nonlocal streamed_steps
+        steps = partial.get("steps")
+        if not isinstance(steps, list) or len(steps) - 1 <= streamed_steps:
+            return
+        for index in range(streamed_steps, len(steps) - 1):
+            emit_progress("plan_step_drafted", f"📝 {index + 1}. {steps[index]}", step_index=index, step=steps[index])
+        streamed_steps = len(steps) - 1
+
+    async def plan_with(model: str) -> Plan:
+        nonlocal streamed_steps
+        streamed_steps = 0
+        return await with_deadline(
+            hedged(
+                "planning_node",
+                model,
+                lambda alternate: ainvoke_structured(
+                    get_gpt_model(model, alternate=alternate),
+                    plan_messages,
+                    Plan,
+                    "planning_node",
+                    # 对冲请求不推送，避免同一步骤出现两次
+                    on_partial=None if alternate else on_partial,
+                ),
+            ),
+            config,
+            "planning",
+        )
+
+    def validate(plan: Plan):
+        return None if plan.steps else "empty_plan"
+
+    # 结构化输出不符合 schema 或计划为空时升级模型
+    try:
+        result = await run_cascade(get_model_route("planning_node", intent), plan_with, validate)
+        steps = result.steps
+    except DeadlineExceeded:
+        logger.warning("Planning timed out, using fallback plan")
+        steps = []
+    except Exception as e:
+        logger.warning("Plan generation failed on all model tiers: %s", e)
+        steps = []
+    if not steps:
+        # 兜底计划不进入缓存
+        steps = [f"直接回答用户问题: {rewritten_query}"]
+        cache_ref = None
+
+    _emit_plan_created(intent, steps)
+
     return {
         "plan": steps,
         "current_step": 0,
-        "messages": [plan_message]
+        "plan_cache": {**cache_ref, "steps": steps} if cache_ref else None,
     }
 
 
+def _emit_plan_created(intent: str, steps: List[str], cached: bool = False) -> None:
+    emit_progress(
+        "plan_created",
+        f"📋 [{intent}] 已{'复用缓存的' if cached else '生成'}执行计划，共{len(steps)}个步骤:\n"
+        + "\n".join([f"{i+1}. {step}" for i, step in enumerate(steps)]),
+        intent=intent,
+        plan=steps,
+        cached=cached,
+    )
+
+
+def _record_plan_outcome(state: AgentState) -> None:
+    """计划执行结束后回写缓存；只看本计划的步骤结果，执行中被 replan 改写过的计划视为失败"""
+    cache_ref = state.get("plan_cache")
+    cache = get_plan_cache()
+    if not cache_ref or cache is None:
+        return
+    plan = state.get("plan", [])
+    results = state.get("step_results", [])[cache_ref.get("results_offset", 0):]
+    success = plan == cache_ref["steps"] and all(r.status == StepStatus.SUCCESS for r in results)
+    cache.record_outcome(cache_ref["key"], cache_ref["slots"], plan, success, cache_ref["hit"])
+
+
 def _get_previous_results_context(state: AgentState) -> str:
     previous_results = state.get("step_results", [])
     if not previous_results:
@@ -113,7 +191,11 @@ def _get_latest_human_clarification(state: AgentState) -> str:
     return ""
 
 
-async def plan_executor_node(state: AgentState, tools: Optional[List[BaseTool]] = None):
+async def plan_executor_node(
+    state: AgentState,
+    tools: Optional[List[BaseTool]] = None,
+    config: Optional[RunnableConfig] = None,
+):
     plan = state.get("plan", [])
     current_step = state.get("current_step", 0)
 
@@ -121,6 +203,11 @@ async def plan_executor_node(state: AgentState, tools: Optional[List[BaseTool]]
         logger.info("All plan steps completed, moving to finalization")
         return Command(goto="finalize_execution_node")
 
+    intent = state.get("intent")
+    is_sop = bool(intent and sop_loader.has_sop(intent))
+    if is_expiring(config):
+        return _skip_remaining_steps(plan, current_step, config, intent, is_sop)
+
     step_description = plan[current_step]
 
     step_result = StepExecutionResult(
@@ -130,15 +217,16 @@ async def plan_executor_node(state: AgentState, tools: Optional[List[BaseTool]]
         start_time=datetime.now()
     )
 
-    messages_to_add = []
-    start_message = AIMessage(
-        content=f"🔄 开始执行步骤 {current_step + 1}/{len(plan)}: {step_description}"
+    emit_progress(
+        "step_started",
+        f"🔄 开始执行步骤 {current_step + 1}/{len(plan)}: {step_description}",
+        step_index=current_step,
+        total_steps=len(plan),
     )
-    messages_to_add.append(start_message)
 
     logger.info("Executing step %s/%s: %s", current_step + 1, len(plan), step_description)
 
-    system_prompt = build_executor_prompt(state, current_step, step_description, messages_to_add)
+    system_prompt = build_executor_prompt(state, current_step, step_description)
 
     if tools is not None:
         all_tools = list(tools) + [ask_human]
@@ -148,11 +236,39 @@ async def plan_executor_node(state: AgentState, tools: Optional[List[BaseTool]]
         all_tools = ALL_TOOLS + mcp_tools + [ask_human]
     logger.info("Using %s tools for step %s", len(all_tools), current_step + 1)
 
-    llm = get_gpt_model("gpt-4.1-mini").bind_tools(all_tools)
+    model = get_model_route("plan_executor_node", intent).primary
+    llm = get_gpt_model(model).bind_tools(all_tools)
     tool_map = {t.name: t for t in all_tools}
+
+    def call_llm(messages):
+        return hedged(
+            "plan_executor_node",
+            model,
+            lambda alternate: (
+                get_gpt_model(model, alternate=True).bind_tools(all_tools) if alternate else llm
+            ).ainvoke(messages),
+        )
+
     input_messages = [SystemMessage(content=system_prompt)]
     start_exec = time.time()
-    ai_response = await llm.ainvoke(input_messages)
+    try:
+        ai_response = await with_deadline(call_llm(input_messages), config, "executor_llm")
+    except DeadlineExceeded as e:
+        step_result.status = StepStatus.FAILED
+        step_result.end_time = datetime.now()
+        step_result.duration_ms = (time.time() - start_exec) * 1000
+        step_result.error_message = str(e)
+        logger.warning("Step %s timed out: %s", current_step + 1, e)
+        log_step_result(config, intent, is_sop, step_result)
+        emit_progress(
+            "step_failed",
+            f"⏱️ 步骤 {current_step + 1} 执行超时",
+            step_index=current_step,
+        )
+        return {
+            "current_step": current_step + 1,
+            "step_results": [step_result],
+        }
 
     ask_human_call = None
     if ai_response.tool_calls:
@@ -167,14 +283,15 @@ async def plan_executor_node(state: AgentState, tools: Optional[List[BaseTool]]
             or "请提供执行此步骤所需的信息"
         )
         logger.info("Step %s requires clarification via ask_human tool: %s", current_step + 1, question)
-        ask_message = AIMessage(
-            content=f"⏸️ 步骤 {current_step + 1} 需要补充信息\n{question}"
+        emit_progress(
+            "step_waiting",
+            f"⏸️ 步骤 {current_step + 1} 需要补充信息\n{question}",
+            step_index=current_step,
+            question=question,
         )
-        messages_to_add.append(ask_message)
         return Command(
             goto="ask_human_node",
             update={
-                "messages": messages_to_add,
                 "human_question": question,
                 "human_resume_node": "plan_executor_node",
             },
@@ -188,7 +305,9 @@ async def plan_executor_node(state: AgentState, tools: Optional[List[BaseTool]]
             tool_func = tool_map.get(tc["name"])
             if tool_func:
                 try:
-                    result = await tool_func.ainvoke(tc["args"])
+                    result = await with_deadline(tool_func.ainvoke(tc["args"]), config, "tool")
+                except DeadlineExceeded:
+                    result = f"工具调用超时: {tc['name']}"
                 except Exception as e:
                     result = f"工具调用失败: {e}"
             else:
@@ -199,9 +318,14 @@ async def plan_executor_node(state: AgentState, tools: Optional[List[BaseTool]]
             ))
 
     if tool_messages:
-        final_response = await llm.ainvoke(
-            input_messages + [ai_response] + tool_messages
-        )
+        try:
+            final_response = await with_deadline(
+                call_llm(input_messages + [ai_response] + tool_messages), config, "executor_llm"
+            )
+        except DeadlineExceeded:
+            # 来不及总结时直接把工具原始结果作为本步输出
+            logger.warning("Step %s summary timed out, using raw tool results", current_step + 1)
+            final_response = AIMessage(content="\n".join(str(m.content) for m in tool_messages))
     else:
         final_response = ai_response
 
@@ -238,23 +362,59 @@ async def plan_executor_node(state: AgentState, tools: Optional[List[BaseTool]]
     step_result.tool_calls = tool_calls
 
     logger.info("Step %s completed in %.2fms", current_step + 1, exec_duration)
+    log_step_result(config, intent, is_sop, step_result)
 
     result_summary = step_result.output_result[:MAX_OUTPUT_PREVIEW_LENGTH] if step_result.output_result else "执行完成"
     tools_used = f" (使用了{len(tool_calls)}个工具)" if tool_calls else ""
-    success_message = AIMessage(
-        content=f"✅ 步骤 {current_step + 1} 完成{tools_used}\n{result_summary}"
+    emit_progress(
+        "step_completed",
+        f"✅ 步骤 {current_step + 1} 完成{tools_used}\n{result_summary}",
+        step_index=current_step,
+        duration_ms=exec_duration,
     )
-    messages_to_add.append(success_message)
 
     return {
         "current_step": current_step + 1,
         "step_results": [step_result],
-        "messages": messages_to_add,
     }
 
 
 
 
+def _skip_remaining_steps(
+    plan: list,
+    current_step: int,
+    config: Optional[RunnableConfig] = None,
+    intent: Optional[str] = None,
+    is_sop: bool = False,
+) -> Command:
+    """请求即将到期：剩余步骤标记为 skipped，直接进入总结，用已有结果回答"""
+    now = datetime.now()
+    skipped = [
+        StepExecutionResult(
+            step_index=index,
+            step_description=plan[index],
+            status=StepStatus.SKIPPED,
+            start_time=now,
+            end_time=now,
+            error_message="请求即将超时，跳过",
+        )
+        for index in range(current_step, len(plan))
+    ]
+    logger.warning("Request deadline approaching, skipping %s remaining steps", len(skipped))
+    for step_result in skipped:
+        log_step_result(config, intent, is_sop, step_result)
+    emit_progress(
+        "deadline_reached",
+        f"⏱️ 处理时间即将用完，跳过剩余 {len(skipped)} 个步骤，基于已有结果回答",
+        skipped_steps=len(skipped),
+    )
+    return Command(
+        goto="finalize_execution_node",
+        update={"current_step": len(plan), "step_results": skipped},
+    )
+
+
 def format_message_history(messages: list, filter_types: list = None) -> str:
     """
     格式化消息历史为字符串
@@ -361,29 +521,33 @@ def finalize_execution(state: AgentState) -> dict:
             ).total_seconds() * 1000
 
     duration_text = f"{summary.total_duration_ms:.0f}ms" if summary.total_duration_ms is not None else "未知"
-    
-    # 📝 添加完成消息
+
     status_emoji = "🎉" if summary.overall_status == StepStatus.SUCCESS else "⚠️"
-    completion_message = AIMessage(
-        content=f"{status_emoji} 所有步骤已完成\n" +
-                f"• 总计: {summary.total_steps} 步\n" +
-                f"• 成功: {summary.completed_steps} 步\n" +
-                f"• 失败: {summary.failed_steps} 步\n" +
-                f"• 总耗时: {duration_text}\n" +
-                f"• Token消耗: {summary.total_token_usage.total_tokens}"
+    emit_progress(
+        "finalized",
+        f"{status_emoji} 所有步骤已完成\n" +
+        f"• 总计: {summary.total_steps} 步\n" +
+        f"• 成功: {summary.completed_steps} 步\n" +
+        f"• 失败: {summary.failed_steps} 步\n" +
+        f"• 总耗时: {duration_text}\n" +
+        f"• Token消耗: {summary.total_token_usage.total_tokens}",
+        overall_status=summary.overall_status.value,
     )
 
     return {
         "execution_summary": summary,
-        "messages": [completion_message]
     }
 
 
-async def finalize_execution_node(state: AgentState) -> dict:
-    return finalize_execution(state)
+async def finalize_execution_node(state: AgentState, config: Optional[RunnableConfig] = None) -> dict:
+    result = finalize_execution(state)
+    log_execution_summary(config, result["execution_summary"])
+    _record_plan_outcome(state)
+    # 计划缓存信息只属于本轮，清掉以免同一 thread 的下一轮（如 SOP 路径）误用
+    return {**result, "plan_cache": None}
 
 
-async def replan_node(state: AgentState) -> dict:
+async def replan_node(state: AgentState, config: Optional[RunnableConfig] = None) -> dict:
     """
     重新规划节点 - 评估执行结果并决定下一步行动
     
@@ -413,6 +577,12 @@ async def replan_node(state: AgentState) -> dict:
     # 如果还没有执行任何步骤，直接继续
     if not step_results:
         return {}
+
+    # 时间不够再评估一轮：剩余步骤交给 plan_executor_node 跳过，或已全部完成时直接总结
+    if is_expiring(config):
+        if current_step < len(plan):
+            return {}
+        return Command(goto="finalize_execution_node")
     
     # 构建已完成步骤的摘要
     completed_steps_summary = []
@@ -460,100 +630,66 @@ async def replan_node(state: AgentState) -> dict:
         {"role": "user", "content": replan_prompt}
     ]
     
+    async def decide(model: str) -> ReplanDecision:
+        return await with_deadline(
+            hedged(
+                "replan_node",
+                model,
+                lambda alternate: ainvoke_structured(
+                    get_gpt_model(model, alternate=alternate), messages, ReplanDecision, "replan_node"
+                ),
+            ),
+            config,
+            "replan",
+        )
+
+    def validate(result: ReplanDecision):
+        if result.decision == "replan" and not result.new_plan:
+            return "empty_new_plan"
+        return None
+
     try:
-        result = await get_gpt_model("gpt-4.1-mini").ainvoke(messages)
-        
-        # 解析LLM响应
-        decision_data = None
-        
-        # 策略1: 直接解析 result.content
-        try:
-            decision_data = json.loads(result.content)
-        except json.JSONDecodeError:
-            pass
-        
-        # 策略2: 使用正则提取 JSON 块
-        if not decision_data:
-            try:
-                json_match = re.search(r'\{.*\}', result.content, re.DOTALL)
-                if json_match:
-                    json_str = json_match.group()
-                    # 尝试修复常见的 JSON 格式问题
-                    # 1. 移除 JSON 中的注释
-                    json_str = re.sub(r'//.*?\n|/\*.*?\*/', '', json_str, flags=re.DOTALL)
-                    # 2. 移除尾随逗号
-                    json_str = re.sub(r',(\s*[}\]])', r'\1', json_str)
-                    decision_data = json.loads(json_str)
-            except (json.JSONDecodeError, AttributeError) as e:
-                logger.debug("Replan JSON parse failed: %s", e)
-        
-        # 策略3: 使用 LangChain 的 JsonOutputParser 强制解析
-        if not decision_data:
-            try:
-                parser = JsonOutputParser()
-                decision_data = parser.invoke(result)
-            except Exception as e:
-                logger.debug("Replan JsonOutputParser failed: %s", e)
-        
-        # 最后的兜底: 默认继续执行
-        if not decision_data:
-            logger.warning("Unable to parse replan response, defaulting to continue")
-            decision_data = {
-                "decision": "continue",
-                "reasoning": "无法解析LLM响应，默认继续执行"
-            }
-        decision = decision_data.get("decision", "continue")
-        reasoning = decision_data.get("reasoning", "")
-        
+        # 不符合 schema 时抛出 StructuredOutputError，由下方统一按“继续执行”处理并计入解析失败统计
+        result = await run_cascade(get_model_route("replan_node", intent), decide, validate)
+        decision = result.decision
+        reasoning = result.reasoning
+        if decision == "replan" and not result.new_plan:
+            logger.warning("Replan decision without new plan, continuing")
+            decision = "continue"
+
         logger.info("Replan decision=%s reasoning=%s", decision, reasoning[:120])
-        
-        messages_to_add = []
-        
+
         # 根据决策返回不同的结果
         if decision == "respond":
-            routing_message = AIMessage(
-                content="💡 已收集足够信息，正在生成最终答案..."
-            )
-            messages_to_add.append(routing_message)
+            emit_progress("replan_respond", "💡 已收集足够信息，正在生成最终答案...")
 
             return Command(goto="finalize_execution_node", update={
-                "messages": messages_to_add,
                 "current_step": len(plan)
             })
         
         elif decision == "replan":
             # 需要重新规划
-            new_plan = decision_data.get("new_plan", [])
+            new_plan = result.new_plan
             
-            replan_message = AIMessage(
-                content="🔄 需要调整计划\n新计划:\n" +
-                        "\n".join([f"{i+1}. {step}" for i, step in enumerate(new_plan)])
+            emit_progress(
+                "replanned",
+                "🔄 需要调整计划\n新计划:\n" +
+                "\n".join([f"{i+1}. {step}" for i, step in enumerate(new_plan)]),
+                plan=new_plan,
             )
-            messages_to_add.append(replan_message)
-            
+
             return {
                 "plan": new_plan,
                 "current_step": 0,  # 重置到第一步
-                "messages": messages_to_add
             }
-        
+
         else:  # continue
             # 继续执行剩余计划
-            # 不添加消息，避免在对话历史中插入过时的推理内容
-            pass
-            
-            return {
-                "messages": messages_to_add
-            }
+            return {}
     
     except Exception as e:
         logger.exception("Replan failed")
         
         # 出错时默认继续执行
-        error_message = AIMessage(
-            content=f"⚠️ 评估过程出错，继续执行原计划\n错误: {str(e)[:100]}"
-        )
-        
-        return {
-            "messages": [error_message]
-        }
+        emit_progress("replan_failed", f"⚠️ 评估过程出错，继续执行原计划\n错误: {str(e)[:100]}")
+        return {}
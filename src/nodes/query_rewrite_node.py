@@ -1,25 +1,26 @@
-import json
 import logging
-import re
+from typing import Optional
 
 from langchain_core.messages import SystemMessage
+from langchain_core.runnables import RunnableConfig
 from langgraph.types import Command
 
 from src.config.llm import get_gpt_model
-from src.graph_state import AgentState
+from src.config.model_router import get_model_route
+from src.graph_state import AgentState, QueryRewrite
 from src.prompt.prompt_loader import get_prompt
+from src.utils.deadline import DeadlineExceeded, with_deadline
+from src.utils.llm_hedge import hedged
+from src.utils.model_cascade import run_cascade
+from src.utils.structured_output import StructuredOutputError, ainvoke_structured
 
 logger = logging.getLogger(__name__)
 
 
-def _extract_json_payload(content: str) -> dict:
-    try:
-        return json.loads(content)
-    except json.JSONDecodeError:
-        match = re.search(r"\{.*\}", content, re.DOTALL)
-        if not match:
-            raise
-        return json.loads(match.group())
+def _validate_rewrite(ret: QueryRewrite) -> Optional[str]:
+    if not ret.need_clarification and not ret.rewritten_query:
+        return "missing_rewritten_query"
+    return None
 
 
 def _get_latest_human_message(state: AgentState, original_query: str) -> str:
@@ -35,7 +36,7 @@ def _get_latest_human_message(state: AgentState, original_query: str) -> str:
     return ""
 
 
-async def query_rewrite_node(state: AgentState):
+async def query_rewrite_node(state: AgentState, config: Optional[RunnableConfig] = None):
     original_query = state["original_query"]
     history = state.get("messages", [])
 
@@ -49,11 +50,35 @@ async def query_rewrite_node(state: AgentState):
         effective_query = original_query
 
     prompt = get_prompt("query_rewrite").format(query=effective_query, history=history_str)
-    response = await get_gpt_model("gpt-4.1-mini").ainvoke([SystemMessage(content=prompt)])
-    ret = _extract_json_payload(response.content)
+    async def rewrite(model: str) -> QueryRewrite:
+        return await with_deadline(
+            hedged(
+                "query_rewrite_node",
+                model,
+                lambda alternate: ainvoke_structured(
+                    get_gpt_model(model, alternate=alternate),
+                    [SystemMessage(content=prompt)],
+                    QueryRewrite,
+                    "query_rewrite_node",
+                ),
+            ),
+            config,
+            "query_rewrite",
+        )
+
+    try:
+        ret = await run_cascade(get_model_route("query_rewrite_node"), rewrite, _validate_rewrite)
+    except DeadlineExceeded:
+        # 改写只是优化，超时直接用原问题（含补充信息）继续
+        logger.warning("Query rewrite timed out, using original query")
+        return {"rewritten_query": effective_query}
+    except StructuredOutputError as e:
+        # 所有梯队的输出都不符合 schema（已计入解析失败统计），同样用原问题继续
+        logger.warning("Query rewrite output invalid on all model tiers, using original query: %s", e)
+        return {"rewritten_query": effective_query}
 
-    if ret.get("need_clarification"):
-        question = ret.get("clarifying_question") or "请补充问题相关信息"
+    if ret.need_clarification:
+        question = ret.clarifying_question or "请补充问题相关信息"
         logger.info("Query rewrite requires clarification: %s", question)
         return Command(
             goto="ask_human_node",
@@ -64,5 +89,6 @@ async def query_rewrite_node(state: AgentState):
         )
 
     return {
-        "rewritten_query": ret.get("rewritten_query", original_query),
+        "rewritten_query": ret.rewritten_query or original_query,
+        "keywords": ret.keywords,
     }
@@ -8,24 +8,31 @@
 - 添加必要的上下文和建议
 """
 import logging
+from typing import Optional
 
 from langchain_core.messages import AIMessage
 from langchain_core.prompts import ChatPromptTemplate
+from langchain_core.runnables import RunnableConfig
 
 from src.config.llm import get_gpt_model, mt_llm
+from src.config.model_router import get_model_route
 from src.constants import MAX_OUTPUT_PREVIEW_LENGTH, MAX_AGENT_RESPONSE_PREVIEW
 from src.graph_state import AgentState
 from src.prompt.prompt_loader import get_prompt
+from src.utils.deadline import DeadlineExceeded, with_deadline
+from src.utils.llm_scheduler import PRIORITY_INTERACTIVE
+from src.utils.model_cascade import run_cascade
 
 logger = logging.getLogger(__name__)
 
 
-async def response_generator_node(state: AgentState) -> dict:
+async def response_generator_node(state: AgentState, config: Optional[RunnableConfig] = None) -> dict:
     """
     答案生成节点 - 聚合执行结果并生成最终答案
     
     Args:
         state: 包含执行结果的图状态
+        config: 运行配置（携带请求截止时间；超时时直接返回已完成步骤的摘要）
         
     Returns:
         包含最终答案和消息的字典
@@ -41,11 +48,22 @@ async def response_generator_node(state: AgentState) -> dict:
         get_prompt("response_generation")
     )
     
-    # chain = response_prompt | get_claude_model(model="claude-haiku-4-5",streaming=True)
-    chain = response_prompt | get_gpt_model(model="gpt-4.1",streaming=True)
-    result = await chain.ainvoke(payload)
-    
-    final_response = result.content
+    route = get_model_route("response_generator", state.get("intent"))
+
+    async def generate(model: str) -> str:
+        # 用户正在等的最终回答，优先于其他 LLM 调用放行
+        chain = response_prompt | get_gpt_model(model=model, streaming=True, priority=PRIORITY_INTERACTIVE)
+        result = await with_deadline(chain.ainvoke(payload), config, "response")
+        return result.content
+
+    def validate(text: str):
+        return "too_short" if len((text or "").strip()) < route.min_length else None
+
+    try:
+        final_response = await run_cascade(route, generate, validate)
+    except DeadlineExceeded:
+        logger.warning("Response generation timed out, returning partial step summary")
+        final_response = build_partial_response(payload)
     
     # 添加消息到对话历史
     response_message = AIMessage(
@@ -58,6 +76,14 @@ async def response_generator_node(state: AgentState) -> dict:
     }
 
 
+def build_partial_response(payload: dict) -> str:
+    """请求超时时的降级回答：不再调用 LLM，直接给出已完成步骤的结果"""
+    return (
+        "⚠️ 处理超时，以下为目前已完成步骤的结果，仅供参考：\n\n"
+        f"{payload['steps_summary']}"
+    )
+
+
 def build_response_generation_payload(state: AgentState) -> dict:
     # 回答用户原始问题，original_query 是 Required 字段，始终可用
     query = state.get("original_query", "")
@@ -1,18 +1,24 @@
 import json
 import logging
+from typing import Optional
 
 from langchain_core.messages import SystemMessage, HumanMessage
+from langchain_core.runnables import RunnableConfig
 
 from src.config.llm import get_gpt_model, mt_llm
 from src.graph_state import AgentState
 from src.config.sop_loader import get_sop_loader
+from src.config.model_router import get_model_route
+from src.utils.deadline import DeadlineExceeded, with_deadline
+from src.utils.llm_hedge import hedged
+from src.utils.model_cascade import run_cascade
 
 # ⭐ 使用SOPLoader加载配置
 sop_loader = get_sop_loader()
 intent_dict = sop_loader.get_intent_dict()
 logger = logging.getLogger(__name__)
 
-async def sop_match_node(state: AgentState):
+async def sop_match_node(state: AgentState, config: Optional[RunnableConfig] = None):
     """意图识别，是否命中SOP"""
     rewritten_query = state['rewritten_query']
     intent_string = json.dumps(intent_dict, ensure_ascii=False, indent=2)
@@ -55,8 +61,24 @@ async def sop_match_node(state: AgentState):
         HumanMessage(content=rewritten_query),
     ]
 
-    response = await get_gpt_model("gpt-4.1-mini").ainvoke(messages)
-    intent = response.content.strip()
+    async def classify(model: str) -> str:
+        response = await with_deadline(
+            hedged("sop_match_node", model, lambda alternate: get_gpt_model(model, alternate=alternate).ainvoke(messages)),
+            config,
+            "sop_match",
+        )
+        return response.content.strip()
+
+    def validate(label: str):
+        # 输出了列表之外的标签，说明小模型没理解场景区分规则
+        return None if label in intent_dict or label == "other" else "unknown_label"
+
+    try:
+        intent = await run_cascade(get_model_route("sop_match_node"), classify, validate)
+    except DeadlineExceeded:
+        # 识别超时按未命中处理，走通用规划
+        logger.warning("SOP match timed out, fallback to default intent")
+        return {"intent": "other"}
     
     if intent and intent in intent_dict:
         # ⭐ 从loader获取SOP配置
@@ -10,6 +10,7 @@ from pathlib import Path
 project_root = Path(__file__).parent.parent.parent
 sys.path.insert(0, str(project_root))
 
+from src.config.mysql import close_aio_pool
 from src.nodes.build_graph import build_graph
 from src.utils.time_travel_utils import (
     get_state_history,
@@ -149,6 +150,8 @@ with st.sidebar:
             # 显式关闭数据库连接，防止 Event loop is closed 错误
             if graph and hasattr(graph.checkpointer, 'conn'):
                 graph.checkpointer.conn.close()
+            # 注册表查询用的连接池绑定在本次 asyncio.run 的事件循环上，随之关闭
+            await close_aio_pool()
             
     try:
         all_thread_ids = asyncio.run(fetch_thread_ids())
@@ -417,15 +420,6 @@ if prompt := st.chat_input("Input your query..."):
                             progress_placeholder.markdown("**Progress**\n" + "\n".join(progress_lines))
 
                         if node == "plan_executor_node":
-                            for message in payload_data.get("messages", []):
-                                content = extract_message_text(message)
-                                if content.startswith("🔄 开始执行步骤"):
-                                    progress_lines.append(f"- {content}")
-                                elif content.startswith("✅ 步骤"):
-                                    progress_lines.append(f"- {content}")
-                                elif content.startswith("⏸️ 步骤"):
-                                    progress_lines.append(f"- {content}")
-
                             step_results = payload_data.get("step_results") or []
                             if step_results:
                                 step_result = step_results[-1]
@@ -433,6 +427,14 @@ if prompt := st.chat_input("Input your query..."):
                                     f"- Step {step_result['step_index'] + 1} {step_result['status']}: {step_result['step_description']}"
                                 )
                             progress_placeholder.markdown("**Progress**\n" + "\n".join(progress_lines))
+                    elif event_type == "progress":
+                        if data.get("stage") == "model_escalated" and data.get("node") == "response_generator":
+                            # 回答过短被升级到更强的模型重新生成，丢弃已显示的内容
+                            answer_text = ""
+                            message_placeholder.markdown("Thinking...")
+                        if data.get("stage") in ("plan_step_drafted", "step_started", "step_completed", "step_waiting", "replanned"):
+                            progress_lines.append(f"- {data.get('message', '')}")
+                            progress_placeholder.markdown("**Progress**\n" + "\n".join(progress_lines))
                     elif event_type == "messages":
                         metadata = data.get("metadata", {})
                         if metadata.get("langgraph_node") != "response_generator":
@@ -0,0 +1,246 @@
+"""
+/chat 与 /chat/stream 的准入控制
+
+每个请求会扇出 5~15 次 LLM 调用，打到有速率限制的代理上；不限并发时，流量尖峰会让所有人一起 429 / 超时。
+这里在入口处做准入：
+
+- 全局并发上限（ADMISSION_MAX_IN_FLIGHT）：超出的请求进入有界 FIFO 等待队列
+- 单租户并发上限（ADMISSION_TENANT_MAX_IN_FLIGHT，可按租户覆盖）：排队中的请求也计入，
+  单个租户打满时直接 429，不占用队列
+- 队列已满 / 排队超过 ADMISSION_QUEUE_TIMEOUT_SECONDS：503
+- 拒绝时给出 Retry-After（按最近请求的平均占用时长估算）
+- 统计在途数、队列深度、排队耗时分位数、各原因的拒绝次数
+
+租户标识优先取 X-Tenant-Id 头，其次 X-API-Key（只保留摘要），最后是客户端 IP。
+"""
+import asyncio
+import hashlib
+import json
+import logging
+import math
+import os
+import time
+from collections import defaultdict, deque
+from contextlib import asynccontextmanager
+from typing import Any, AsyncIterator, Deque, Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_MAX_IN_FLIGHT = 32
+DEFAULT_TENANT_MAX_IN_FLIGHT = 8
+DEFAULT_QUEUE_SIZE = 64
+DEFAULT_QUEUE_TIMEOUT_SECONDS = 10
+
+REASON_TENANT_LIMIT = "tenant_limit"
+REASON_QUEUE_FULL = "queue_full"
+REASON_QUEUE_TIMEOUT = "queue_timeout"
+
+
+class AdmissionRejected(Exception):
+    """请求未被准入；status_code 为 429（租户超限）或 503（全局排队已满 / 超时）"""
+
+    def __init__(self, reason: str, status_code: int, retry_after: int):
+        super().__init__(f"Request rejected by admission control: {reason}")
+        self.reason = reason
+        self.status_code = status_code
+        self.retry_after = retry_after
+
+
+class AdmissionTicket:
+    """已准入请求持有的槽位；release 可重复调用"""
+
+    def __init__(self, controller: "AdmissionController", tenant: str):
+        self.controller = controller
+        self.tenant = tenant
+        self.admitted_at = time.monotonic()
+        self._released = False
+
+    def release(self) -> None:
+        if self._released:
+            return
+        self._released = True
+        self.controller._release(self)
+
+
+class AdmissionController:
+    """全局并发 + 单租户并发 + 有界等待队列"""
+
+    def __init__(
+        self,
+        max_in_flight: int = DEFAULT_MAX_IN_FLIGHT,
+        tenant_max_in_flight: int = DEFAULT_TENANT_MAX_IN_FLIGHT,
+        queue_size: int = DEFAULT_QUEUE_SIZE,
+        queue_timeout: float = DEFAULT_QUEUE_TIMEOUT_SECONDS,
+        tenant_limits: Optional[Dict[str, int]] = None,
+    ):
+        self.max_in_flight = max_in_flight
+        self.tenant_max_in_flight = tenant_max_in_flight
+        self.queue_size = queue_size
+        self.queue_timeout = queue_timeout
+        self.tenant_limits = tenant_limits or {}
+        self._in_flight = 0
+        # 每个租户在途 + 排队中的请求数
+        self._tenant_active: Dict[str, int] = defaultdict(int)
+        self._waiters: Deque[asyncio.Future] = deque()
+        self._wait_ms: Deque[float] = deque(maxlen=1000)
+        self._hold_seconds: Optional[float] = None
+        self.admitted = 0
+        self.rejected: Dict[str, int] = defaultdict(int)
+
+    def tenant_limit(self, tenant: str) -> int:
+        return self.tenant_limits.get(tenant, self.tenant_max_in_flight)
+
+    def retry_after(self) -> int:
+        """按平均占用时长估算排在队尾的请求多久能被处理"""
+        hold = self._hold_seconds or 1.0
+        slots = max(self.max_in_flight, 1)
+        return max(1, math.ceil(hold * (len(self._waiters) + 1) / slots))
+
+    def _reject(self, reason: str, status_code: int, tenant: str) -> AdmissionRejected:
+        self.rejected[reason] += 1
+        logger.warning(
+            "Admission rejected tenant=%s reason=%s in_flight=%s queued=%s",
+            tenant, reason, self._in_flight, len(self._waiters),
+        )
+        return AdmissionRejected(reason, status_code, self.retry_after())
+
+    async def acquire(self, tenant: str) -> AdmissionTicket:
+        limit = self.tenant_limit(tenant)
+        if limit > 0 and self._tenant_active[tenant] >= limit:
+            raise self._reject(REASON_TENANT_LIMIT, 429, tenant)
+
+        self._tenant_active[tenant] += 1
+        started = time.monotonic()
+        try:
+            if self._in_flight < self.max_in_flight and not self._waiters:
+                self._in_flight += 1
+            else:
+                await self._wait_for_slot(tenant)
+        except BaseException:
+            self._release_tenant(tenant)
+            raise
+
+        self._wait_ms.append((time.monotonic() - started) * 1000)
+        self.admitted += 1
+        return AdmissionTicket(self, tenant)
+
+    async def _wait_for_slot(self, tenant: str) -> None:
+        if len(self._waiters) >= self.queue_size:
+            raise self._reject(REASON_QUEUE_FULL, 503, tenant)
+
+        waiter = asyncio.get_running_loop().create_future()
+        self._waiters.append(waiter)
+        try:
+            # 槽位由 _release 直接移交给队首（in_flight 不变），避免新请求插队
+            await asyncio.wait_for(waiter, self.queue_timeout)
+        except (asyncio.TimeoutError, asyncio.CancelledError) as exc:
+            if waiter.done() and not waiter.cancelled():
+                # 超时 / 取消与移交同时发生：槽位已经给了我们，要还回去
+                self._handoff()
+            else:
+                try:
+                    self._waiters.remove(waiter)
+                except ValueError:
+                    pass
+            if isinstance(exc, asyncio.CancelledError):
+                raise
+            raise self._reject(REASON_QUEUE_TIMEOUT, 503, tenant) from exc
+
+    def _handoff(self) -> None:
+        while self._waiters:
+            waiter = self._waiters.popleft()
+            if not waiter.done():
+                waiter.set_result(None)
+                return
+        self._in_flight -= 1
+
+    def _release_tenant(self, tenant: str) -> None:
+        self._tenant_active[tenant] -= 1
+        if self._tenant_active[tenant] <= 0:
+            del self._tenant_active[tenant]
+
+    def _release(self, ticket: AdmissionTicket) -> None:
+        held = time.monotonic() - ticket.admitted_at
+        # 指数滑动平均，用于估算 Retry-After
+        self._hold_seconds = held if self._hold_seconds is None else 0.9 * self._hold_seconds + 0.1 * held
+        self._release_tenant(ticket.tenant)
+        self._handoff()
+
+    @asynccontextmanager
+    async def admit(self, tenant: str) -> AsyncIterator[AdmissionTicket]:
+        ticket = await self.acquire(tenant)
+        try:
+            yield ticket
+        finally:
+            ticket.release()
+
+    def stats(self) -> Dict[str, Any]:
+        wait_ms = sorted(self._wait_ms)
+
+        def percentile(p: float) -> Optional[float]:
+            if not wait_ms:
+                return None
+            return round(wait_ms[min(len(wait_ms) - 1, int(len(wait_ms) * p))], 2)
+
+        return {
+            "in_flight": self._in_flight,
+            "queue_depth": len(self._waiters),
+            "active_tenants": len(self._tenant_active),
+            "max_in_flight": self.max_in_flight,
+            "tenant_max_in_flight": self.tenant_max_in_flight,
+            "queue_size": self.queue_size,
+            "queue_timeout_seconds": self.queue_timeout,
+            "admitted": self.admitted,
+            "rejected": dict(self.rejected),
+            "wait_ms_p50": percentile(0.5),
+            "wait_ms_p99": percentile(0.99),
+            "wait_ms_max": round(wait_ms[-1], 2) if wait_ms else None,
+            "avg_hold_seconds": round(self._hold_seconds, 3) if self._hold_seconds is not None else None,
+        }
+
+
+def resolve_tenant(headers: Any, client_host: Optional[str] = None) -> str:
+    tenant = headers.get("x-tenant-id")
+    if tenant:
+        return f"tenant:{tenant}"
+    api_key = headers.get("x-api-key")
+    if api_key:
+        # 统计接口会列出租户，不暴露原始 key
+        return "key:" + hashlib.sha256(api_key.encode("utf-8")).hexdigest()[:12]
+    return f"ip:{client_host or 'unknown'}"
+
+
+def _load_tenant_limits() -> Dict[str, int]:
+    raw = os.getenv("ADMISSION_TENANT_LIMITS")
+    if not raw:
+        return {}
+    try:
+        return {f"tenant:{key}": int(value) for key, value in json.loads(raw).items()}
+    except (ValueError, AttributeError) as exc:
+        logger.warning("Invalid ADMISSION_TENANT_LIMITS, ignoring: %s", exc)
+        return {}
+
+
+_controller: Optional[AdmissionController] = None
+
+
+def is_admission_enabled() -> bool:
+    return int(os.getenv("ADMISSION_MAX_IN_FLIGHT", DEFAULT_MAX_IN_FLIGHT)) > 0
+
+
+def get_admission_controller() -> Optional[AdmissionController]:
+    """进程级准入控制器；ADMISSION_MAX_IN_FLIGHT=0 时关闭"""
+    global _controller
+    if _controller is None and is_admission_enabled():
+        _controller = AdmissionController(
+            max_in_flight=int(os.getenv("ADMISSION_MAX_IN_FLIGHT", DEFAULT_MAX_IN_FLIGHT)),
+            tenant_max_in_flight=int(os.getenv("ADMISSION_TENANT_MAX_IN_FLIGHT", DEFAULT_TENANT_MAX_IN_FLIGHT)),
+            queue_size=int(os.getenv("ADMISSION_QUEUE_SIZE", DEFAULT_QUEUE_SIZE)),
+            queue_timeout=float(os.getenv("ADMISSION_QUEUE_TIMEOUT_SECONDS", DEFAULT_QUEUE_TIMEOUT_SECONDS)),
+            tenant_limits=_load_tenant_limits(),
+        )
+    return _controller
+
+
+def get_admission_stats() -> Optional[Dict[str, Any]]:
+    return _controller.stats() if _controller is not None else None
@@ -0,0 +1,385 @@
+"""
+Checkpoint 保留 / 清理任务
+
+AIOMySQLSaver 只追加不删除，checkpoints / checkpoint_blobs / checkpoint_writes 会无限增长。
+这里按策略定期清理：
+
+- keep_last: 已完成的 thread 只保留最近 N 个 checkpoint（最新 checkpoint 足以继续对话，
+  更早的只用于 time travel），同时回收不再被引用的 blob 和 writes
+- idle_days: 最近一次活动早于 X 天的 thread 整体删除（连同 `threads` 注册表中的行）；
+  配置了 archive_dir 时先归档为 gzip JSONL
+
+“已完成”指：最新 checkpoint 没有挂起的 interrupt，且距今超过 settle_seconds（避免碰到正在运行的图）。
+
+dry_run 时不删除也不归档，计划处理的数量记在报告的 planned 中，实际计数保持为 0。
+
+删除按主键分批执行（每批 batch_size 行，批间让出 pause_seconds），不会长时间持有行锁。
+多 worker 同时运行时通过 MySQL `GET_LOCK` 保证只有一个进程在清理。
+
+用法：
+    python -m src.utils.checkpoint_retention --dry-run
+    python -m src.utils.checkpoint_retention --keep-last 10 --idle-days 30 --archive-dir data/checkpoint_archive
+"""
+import asyncio
+import base64
+import gzip
+import json
+import logging
+import os
+from dataclasses import asdict, dataclass, field
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Sequence, Set, Tuple
+
+from langgraph.checkpoint.base.id import UUID as CheckpointUUID
+
+from src.config.mysql import get_aio_pool
+from src.utils.sharded_checkpointer import get_primary_pools, is_sharding_enabled
+from src.utils.thread_registry import ensure_registry_table, is_registry_enabled
+
+logger = logging.getLogger(__name__)
+
+RETENTION_LOCK_NAME = "tt_checkpoint_retention"
+INTERRUPT_CHANNEL = "__interrupt__"
+# uuid6 的时间戳以 1582-10-15 为起点，单位 100ns
+_UUID_EPOCH = datetime(1582, 10, 15, tzinfo=timezone.utc)
+
+
+def _env_int(name: str, default: int) -> int:
+    return int(os.getenv(name, default))
+
+
+@dataclass
+class RetentionPolicy:
+    keep_last: int = field(default_factory=lambda: _env_int("CHECKPOINT_KEEP_LAST", 20))
+    idle_days: int = field(default_factory=lambda: _env_int("CHECKPOINT_IDLE_DAYS", 30))
+    archive_dir: Optional[str] = field(default_factory=lambda: os.getenv("CHECKPOINT_ARCHIVE_DIR") or None)
+    settle_seconds: int = field(default_factory=lambda: _env_int("CHECKPOINT_SETTLE_SECONDS", 600))
+    batch_size: int = field(default_factory=lambda: _env_int("CHECKPOINT_PRUNE_BATCH", 500))
+    pause_seconds: float = 0.05
+    dry_run: bool = False
+
+
+@dataclass
+class RetentionCounts:
+    threads_pruned: int = 0
+    threads_expired: int = 0
+    threads_archived: int = 0
+    checkpoints_deleted: int = 0
+    blobs_deleted: int = 0
+    writes_deleted: int = 0
+    registry_deleted: int = 0
+
+
+@dataclass
+class RetentionReport(RetentionCounts):
+    threads_scanned: int = 0
+    dry_run: bool = False
+    # dry_run 时计划处理的数量
+    planned: RetentionCounts = field(default_factory=RetentionCounts)
+
+
+def checkpoint_time(checkpoint_id: str) -> datetime:
+    """从 uuid6 格式的 checkpoint_id 中解出写入时间（UTC）。"""
+    return _UUID_EPOCH + timedelta(microseconds=CheckpointUUID(checkpoint_id).time // 10)
+
+
+def _chunks(items: Sequence, size: int):
+    for i in range(0, len(items), size):
+        yield items[i:i + size]
+
+
+class CheckpointRetention:
+    """在 aiomysql 连接池上执行保留策略"""
+
+    def __init__(self, pool, policy: Optional[RetentionPolicy] = None, registry_pool=None):
+        """
+        Args:
+            pool: checkpoint 表所在的连接池（分片部署时为某个分片主库）
+            registry_pool: `threads` 注册表所在的连接池；None 表示不维护注册表
+        """
+        self.pool = pool
+        self.policy = policy or RetentionPolicy()
+        self.registry_pool = registry_pool
+
+    def _counts(self, report: RetentionReport) -> RetentionCounts:
+        return report.planned if self.policy.dry_run else report
+
+    async def run_once(self) -> Optional[RetentionReport]:
+        """
+        执行一轮清理
+
+        Returns:
+            RetentionReport；其他进程正在清理时返回 None
+        """
+        async with self.pool.acquire() as lock_conn:
+            async with lock_conn.cursor() as cursor:
+                await cursor.execute("SELECT GET_LOCK(%s, 0) AS acquired", (RETENTION_LOCK_NAME,))
+                row = await cursor.fetchone()
+            if not row or not row["acquired"]:
+                logger.info("Checkpoint retention is running in another process, skip")
+                return None
+            try:
+                report = RetentionReport(dry_run=self.policy.dry_run)
+                if self.registry_pool is not None:
+                    await ensure_registry_table(self.registry_pool)
+                async for thread_id, latest_id in self._iter_threads():
+                    report.threads_scanned += 1
+                    await self._apply(thread_id, latest_id, report)
+                logger.info("Checkpoint retention finished: %s", asdict(report))
+                return report
+            finally:
+                async with lock_conn.cursor() as cursor:
+                    await cursor.execute("SELECT RELEASE_LOCK(%s)", (RETENTION_LOCK_NAME,))
+
+    async def _iter_threads(self):
+        """按 thread_id 做 keyset 分页遍历，每页一次主键前缀上的分组扫描。"""
+        after = ""
+        while True:
+            async with self.pool.acquire() as conn:
+                async with conn.cursor() as cursor:
+                    await cursor.execute(
+                        "SELECT thread_id, MAX(checkpoint_id) AS latest_id FROM checkpoints "
+                        "WHERE thread_id > %s GROUP BY thread_id ORDER BY thread_id LIMIT %s",
+                        (after, self.policy.batch_size),
+                    )
+                    rows = await cursor.fetchall()
+            for row in rows:
+                yield row["thread_id"], row["latest_id"]
+            if len(rows) < self.policy.batch_size:
+                return
+            after = rows[-1]["thread_id"]
+
+    async def _apply(self, thread_id: str, latest_id: str, report: RetentionReport) -> None:
+        now = datetime.now(timezone.utc)
+        last_active = checkpoint_time(latest_id)
+        counts = self._counts(report)
+
+        if self.policy.idle_days and now - last_active > timedelta(days=self.policy.idle_days):
+            if self.policy.archive_dir:
+                await self._archive_thread(thread_id)
+                counts.threads_archived += 1
+            await self._delete_thread(thread_id, report)
+            counts.threads_expired += 1
+            return
+
+        if not self.policy.keep_last or now - last_active < timedelta(seconds=self.policy.settle_seconds):
+            return
+        if await self._is_interrupted(thread_id, latest_id):
+            return
+        if await self._prune_thread(thread_id, report):
+            counts.threads_pruned += 1
+
+    async def _is_interrupted(self, thread_id: str, checkpoint_id: str) -> bool:
+        async with self.pool.acquire() as conn:
+            async with conn.cursor() as cursor:
+                await cursor.execute(
+                    "SELECT 1 FROM checkpoint_writes WHERE thread_id = %s AND checkpoint_id = %s "
+                    "AND channel = %s LIMIT 1",
+                    (thread_id, checkpoint_id, INTERRUPT_CHANNEL),
+                )
+                return await cursor.fetchone() is not None
+
+    async def _prune_thread(self, thread_id: str, report: RetentionReport) -> bool:
+        """只保留最近 keep_last 个 checkpoint，并回收只被旧 checkpoint 引用的 blob。"""
+        async with self.pool.acquire() as conn:
+            async with conn.cursor() as cursor:
+                await cursor.execute(
+                    "SELECT checkpoint_ns, checkpoint_id, "
+                    "JSON_EXTRACT(checkpoint, '$.channel_versions') AS channel_versions "
+                    "FROM checkpoints WHERE thread_id = %s ORDER BY checkpoint_id DESC",
+                    (thread_id,),
+                )
+                rows = await cursor.fetchall()
+
+        # 子图（checkpoint_ns 非空）与主图分开计数
+        kept: Dict[str, int] = {}
+        stale: List[Tuple[str, str]] = []
+        referenced: Set[Tuple[str, str, str]] = set()
+        for row in rows:
+            ns = row["checkpoint_ns"]
+            if kept.get(ns, 0) < self.policy.keep_last:
+                kept[ns] = kept.get(ns, 0) + 1
+                versions = row["channel_versions"]
+                if isinstance(versions, (str, bytes)):
+                    versions = json.loads(versions)
+                for channel, version in (versions or {}).items():
+                    referenced.add((ns, channel, str(version)))
+            else:
+                stale.append((ns, row["checkpoint_id"]))
+        if not stale:
+            return False
+
+        async with self.pool.acquire() as conn:
+            async with conn.cursor() as cursor:
+                await cursor.execute(
+                    "SELECT checkpoint_ns, channel, version FROM checkpoint_blobs WHERE thread_id = %s",
+                    (thread_id,),
+                )
+                blobs = await cursor.fetchall()
+        orphan_blobs = [
+            (row["checkpoint_ns"], row["channel"], row["version"])
+            for row in blobs
+            if (row["checkpoint_ns"], row["channel"], row["version"]) not in referenced
+        ]
+
+        counts = self._counts(report)
+        stale_ids = [checkpoint_id for _, checkpoint_id in stale]
+        counts.writes_deleted += await self._delete_in_batches(
+            "DELETE FROM checkpoint_writes WHERE thread_id = %s AND checkpoint_id IN ({})", thread_id, stale_ids
+        )
+        counts.checkpoints_deleted += await self._delete_in_batches(
+            "DELETE FROM checkpoints WHERE thread_id = %s AND checkpoint_id IN ({})", thread_id, stale_ids
+        )
+        for chunk in _chunks(orphan_blobs, self.policy.batch_size):
+            placeholders = ", ".join(["(%s, %s, %s)"] * len(chunk))
+            counts.blobs_deleted += await self._execute(
+                "DELETE FROM checkpoint_blobs WHERE thread_id = %s "
+                f"AND (checkpoint_ns, channel, version) IN ({placeholders})",
+                [thread_id] + [value for key in chunk for value in key],
+                planned=len(chunk),
+            )
+        return True
+
+    async def _delete_in_batches(self, template: str, thread_id: str, ids: Sequence[str]) -> int:
+        deleted = 0
+        for chunk in _chunks(list(ids), self.policy.batch_size):
+            query = template.format(", ".join(["%s"] * len(chunk)))
+            deleted += await self._execute(query, [thread_id, *chunk], planned=len(chunk))
+        return deleted
+
+    async def _delete_thread(self, thread_id: str, report: RetentionReport) -> None:
+        counts = self._counts(report)
+        for table, attr in (
+            ("checkpoint_writes", "writes_deleted"),
+            ("checkpoint_blobs", "blobs_deleted"),
+            ("checkpoints", "checkpoints_deleted"),
+        ):
+            while True:
+                if self.policy.dry_run:
+                    count = await self._count(table, thread_id)
+                    setattr(counts, attr, getattr(counts, attr) + count)
+                    break
+                deleted = await self._execute(
+                    f"DELETE FROM {table} WHERE thread_id = %s LIMIT %s",
+                    (thread_id, self.policy.batch_size),
+                )
+                setattr(counts, attr, getattr(counts, attr) + deleted)
+                if deleted < self.policy.batch_size:
+                    break
+
+        # 过期会话同时从注册表移除，否则 /threads 仍会列出一个没有历史的会话
+        if self.registry_pool is None:
+            return
+        if self.policy.dry_run:
+            counts.registry_deleted += 1
+            return
+        async with self.registry_pool.acquire() as conn:
+            async with conn.cursor() as cursor:
+                counts.registry_deleted += await cursor.execute("DELETE FROM threads WHERE thread_id = %s", (thread_id,))
+
+    async def _count(self, table: str, thread_id: str) -> int:
+        async with self.pool.acquire() as conn:
+            async with conn.cursor() as cursor:
+                await cursor.execute(f"SELECT COUNT(*) AS n FROM {table} WHERE thread_id = %s", (thread_id,))
+                return (await cursor.fetchone())["n"]
+
+    async def _execute(self, query: str, params, planned: int = 0) -> int:
+        """执行一批删除并让出事件循环；dry_run 时只返回计划删除的行数。"""
+        if self.policy.dry_run:
+            return planned
+        async with self.pool.acquire() as conn:
+            async with conn.cursor() as cursor:
+                deleted = await cursor.execute(query, params)
+        if self.policy.pause_seconds:
+            await asyncio.sleep(self.policy.pause_seconds)
+        return deleted
+
+    async def _archive_thread(self, thread_id: str) -> Optional[Path]:
+        """把 thread 的全部行写成 `<archive_dir>/<日期>/<thread_id>.jsonl.gz`（blob 以 base64 保存）。"""
+        if self.policy.dry_run:
+            return None
+        target_dir = Path(self.policy.archive_dir) / datetime.now().strftime("%Y%m%d")
+        target_dir.mkdir(parents=True, exist_ok=True)
+        target = target_dir / f"{thread_id.replace('/', '_')}.jsonl.gz"
+
+        with gzip.open(target, "wt", encoding="utf-8") as f:
+            for table in ("checkpoints", "checkpoint_blobs", "checkpoint_writes"):
+                async with self.pool.acquire() as conn:
+                    async with conn.cursor() as cursor:
+                        await cursor.execute(f"SELECT * FROM {table} WHERE thread_id = %s", (thread_id,))
+                        rows = await cursor.fetchall()
+                for row in rows:
+                    f.write(json.dumps({"table": table, "row": _archive_row(row)}, ensure_ascii=False) + "\n")
+        logger.info("Archived thread %s to %s", thread_id, target)
+        return target
+
+
+def _archive_row(row: Dict[str, Any]) -> Dict[str, Any]:
+    archived = {}
+    for key, value in row.items():
+        if isinstance(value, (bytes, bytearray)):
+            archived[key] = {"base64": base64.b64encode(value).decode("ascii")}
+        elif isinstance(value, datetime):
+            archived[key] = value.isoformat()
+        else:
+            archived[key] = value
+    return archived
+
+
+async def _get_pools() -> Tuple[list, Any]:
+    """返回 (checkpoint 所在的主库连接池列表, 注册表连接池)"""
+    # 分片部署时逐个分片主库执行（GET_LOCK 也是按实例生效的）；注册表始终在默认库
+    pools = await get_primary_pools() if is_sharding_enabled() else [await get_aio_pool()]
+    registry_pool = await get_aio_pool() if is_registry_enabled() else None
+    return pools, registry_pool
+
+
+async def run_retention(policy: Optional[RetentionPolicy] = None) -> List[Optional[RetentionReport]]:
+    """对所有 checkpoint 库各执行一轮清理，返回每个库的报告（其他进程正在清理的库为 None）"""
+    pools, registry_pool = await _get_pools()
+    return [await CheckpointRetention(pool, policy, registry_pool).run_once() for pool in pools]
+
+
+async def run_retention_loop(interval: Optional[float] = None, policy: Optional[RetentionPolicy] = None):
+    """后台定期执行保留策略（FastAPI 启动时创建，CHECKPOINT_RETENTION_INTERVAL_SECONDS=0 表示关闭）。"""
+    interval = interval or float(os.getenv("CHECKPOINT_RETENTION_INTERVAL_SECONDS", 3600))
+    while True:
+        try:
+            await run_retention(policy)
+        except Exception as e:
+            logger.warning("Checkpoint retention failed: %s", e)
+        await asyncio.sleep(interval)
+
+
+if __name__ == "__main__":
+    import argparse
+
+    from src.config.mysql import close_aio_pool
+
+    defaults = RetentionPolicy()
+    parser = argparse.ArgumentParser(description="Prune / archive LangGraph checkpoints")
+    parser.add_argument("--keep-last", type=int, default=defaults.keep_last, help="已完成 thread 保留的 checkpoint 数，0 表示不裁剪")
+    parser.add_argument("--idle-days", type=int, default=defaults.idle_days, help="超过该天数未活动的 thread 整体删除，0 表示不过期")
+    parser.add_argument("--archive-dir", default=defaults.archive_dir, help="删除前归档的目录")
+    parser.add_argument("--batch-size", type=int, default=defaults.batch_size, help="每批删除的行数")
+    parser.add_argument("--dry-run", action="store_true", help="只统计，不删除")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+
+    async def main():
+        policy = RetentionPolicy(
+            keep_last=args.keep_last,
+            idle_days=args.idle_days,
+            archive_dir=args.archive_dir,
+            batch_size=args.batch_size,
+            dry_run=args.dry_run,
+        )
+        try:
+            reports = await run_retention(policy)
+            print(json.dumps([asdict(report) if report else {"skipped": True} for report in reports], indent=2))
+        finally:
+            await close_aio_pool()
+
+    asyncio.run(main())
@@ -0,0 +1,171 @@
+"""
+紧凑的 checkpoint 序列化
+
+每个 super-step 都会把 AgentState 中变化的 channel（messages / step_results / execution_summary ...）
+写入 checkpoint_blobs。默认的 JsonPlusSerializer 对每个 pydantic 对象都会带上完整的模块名、类名
+和全部字段（包括默认值），`agent_response` 这类长文本也不做压缩。
+
+CompactSerializer 在其之上做两件事：
+
+1. 项目自己的模型（StepExecutionResult 等）用自定义 msgpack 扩展编码：
+   只写一个短类型编号 + 非默认字段，读取时用 model_validate 还原
+2. 编码结果超过阈值时用 zstd 压缩，类型标记为 `msgpack+zstd`
+
+读取时兼容旧数据：`msgpack` / `json` / `bytes` / `null` 等类型照常交给 JsonPlusSerializer 处理。
+"""
+import logging
+import os
+import threading
+from dataclasses import dataclass, field
+from typing import Any, Dict, Optional, Tuple
+
+import ormsgpack
+from langgraph.checkpoint.serde.jsonplus import (
+    JsonPlusSerializer,
+    _msgpack_default,
+    _msgpack_ext_hook,
+    _option,
+)
+
+from src.graph_state import Plan
+from src.models.execution_result import PlanExecutionSummary, StepExecutionResult, TokenUsage, ToolCall
+
+try:
+    import zstandard
+except ImportError:
+    # zstandard 未安装时只做紧凑编码，不压缩（仍可读取未压缩的数据）
+    zstandard = None
+
+logger = logging.getLogger(__name__)
+
+# LangGraph 自身使用 0~6，留出足够空间
+EXT_COMPACT_MODEL = 64
+ZSTD_SUFFIX = "+zstd"
+DEFAULT_COMPRESS_THRESHOLD = 1024
+DEFAULT_COMPRESS_LEVEL = 3
+
+# 类型编号会写进 checkpoint，只能在末尾追加，不能调整已有顺序
+COMPACT_MODELS = (
+    StepExecutionResult,
+    PlanExecutionSummary,
+    TokenUsage,
+    ToolCall,
+    Plan,
+)
+_MODEL_IDS = {cls: i for i, cls in enumerate(COMPACT_MODELS)}
+
+
+def _compact_default(obj: Any) -> Any:
+    model_id = _MODEL_IDS.get(type(obj))
+    if model_id is not None:
+        try:
+            data = obj.model_dump(mode="json", exclude_defaults=True)
+        except Exception:
+            # 字段里有无法转成 JSON 的任意对象时退回 LangGraph 的通用编码
+            return _msgpack_default(obj)
+        return ormsgpack.Ext(EXT_COMPACT_MODEL, ormsgpack.packb((model_id, data), option=_option))
+    return _msgpack_default(obj)
+
+
+def _compact_ext_hook(code: int, data: bytes) -> Any:
+    if code == EXT_COMPACT_MODEL:
+        model_id, payload = ormsgpack.unpackb(data, option=ormsgpack.OPT_NON_STR_KEYS)
+        cls = COMPACT_MODELS[model_id]
+        try:
+            return cls.model_validate(payload)
+        except Exception:
+            return cls.model_construct(**payload)
+    return _msgpack_ext_hook(code, data)
+
+
+@dataclass
+class SerdeStats:
+    """序列化体积统计（进程级累计）"""
+    blobs: int = 0
+    raw_bytes: int = 0
+    stored_bytes: int = 0
+    compressed_blobs: int = 0
+    checkpoints: int = 0
+    _lock: threading.Lock = field(default_factory=threading.Lock, repr=False)
+
+    def record_blob(self, raw: int, stored: int, compressed: bool) -> None:
+        with self._lock:
+            self.blobs += 1
+            self.raw_bytes += raw
+            self.stored_bytes += stored
+            self.compressed_blobs += int(compressed)
+
+    def record_checkpoint(self) -> None:
+        with self._lock:
+            self.checkpoints += 1
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "checkpoints": self.checkpoints,
+                "blobs": self.blobs,
+                "compressed_blobs": self.compressed_blobs,
+                "raw_bytes": self.raw_bytes,
+                "stored_bytes": self.stored_bytes,
+                "compression_ratio": round(self.stored_bytes / self.raw_bytes, 4) if self.raw_bytes else None,
+                "bytes_per_checkpoint": round(self.stored_bytes / self.checkpoints, 1) if self.checkpoints else None,
+            }
+
+
+class CompactSerializer(JsonPlusSerializer):
+    """JsonPlusSerializer + 项目模型紧凑编码 + zstd 压缩"""
+
+    def __init__(self, compress_threshold: Optional[int] = None, compress_level: Optional[int] = None, **kwargs):
+        super().__init__(**kwargs)
+        self.compress_threshold = (
+            compress_threshold
+            if compress_threshold is not None
+            else int(os.getenv("CHECKPOINT_COMPRESS_THRESHOLD", DEFAULT_COMPRESS_THRESHOLD))
+        )
+        level = compress_level or int(os.getenv("CHECKPOINT_COMPRESS_LEVEL", DEFAULT_COMPRESS_LEVEL))
+        self._compressor = zstandard.ZstdCompressor(level=level) if zstandard is not None else None
+        self._decompressor = zstandard.ZstdDecompressor() if zstandard is not None else None
+        self.stats = SerdeStats()
+
+    def dumps_typed(self, obj: Any) -> Tuple[str, bytes]:
+        if obj is None or isinstance(obj, (bytes, bytearray)):
+            return super().dumps_typed(obj)
+        try:
+            data = ormsgpack.packb(obj, default=_compact_default, option=_option)
+        except ormsgpack.MsgpackEncodeError:
+            return super().dumps_typed(obj)
+
+        raw_size = len(data)
+        type_ = "msgpack"
+        if self._compressor is not None and raw_size >= self.compress_threshold:
+            compressed = self._compressor.compress(data)
+            if len(compressed) < raw_size:
+                type_, data = type_ + ZSTD_SUFFIX, compressed
+        self.stats.record_blob(raw_size, len(data), type_.endswith(ZSTD_SUFFIX))
+        return type_, data
+
+    def loads_typed(self, data: Tuple[str, bytes]) -> Any:
+        type_, payload = data
+        if type_.endswith(ZSTD_SUFFIX):
+            if self._decompressor is None:
+                raise RuntimeError("zstandard is required to read compressed checkpoints")
+            type_ = type_[: -len(ZSTD_SUFFIX)]
+            payload = self._decompressor.decompress(payload)
+        if type_ == "msgpack":
+            return ormsgpack.unpackb(payload, ext_hook=_compact_ext_hook, option=ormsgpack.OPT_NON_STR_KEYS)
+        return super().loads_typed((type_, payload))
+
+
+_serializer: Optional[CompactSerializer] = None
+
+
+def get_checkpoint_serializer() -> CompactSerializer:
+    """进程内共享的 checkpoint 序列化器（统计数据也在这里累计）。"""
+    global _serializer
+    if _serializer is None:
+        _serializer = CompactSerializer()
+    return _serializer
+
+
+def get_serde_stats() -> Dict[str, Any]:
+    return get_checkpoint_serializer().stats.snapshot()
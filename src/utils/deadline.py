@@ -0,0 +1,148 @@
+"""
+请求级截止时间
+
+每个请求在入口处确定一个绝对截止时间（`ChatRequest.timeout_seconds` / `X-Request-Timeout` 头 /
+REQUEST_TIMEOUT_SECONDS），写入 config["configurable"]["deadline"] 随图执行传递。
+节点内每次 LLM 调用、工具调用和检索调用都通过 `with_deadline` / `run_sync_with_deadline` 执行，
+超时时间取「请求剩余时间」和「该类调用的默认上限」中较小的一个；超时抛出 DeadlineExceeded，
+由节点自行降级（跳过剩余步骤、用已有结果生成回答等）。
+
+没有 deadline 的 config（单测、time travel 等直接调用）只受单次调用上限约束。
+"""
+import asyncio
+import json
+import logging
+import os
+import time
+from typing import Any, Awaitable, Callable, Dict, Optional, TypeVar
+
+from langchain_core.runnables import RunnableConfig
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+DEADLINE_KEY = "deadline"
+DEFAULT_REQUEST_TIMEOUT_SECONDS = 300
+
+# 各类调用的默认上限（秒），可用 CALL_TIMEOUTS（JSON）覆盖部分键
+DEFAULT_CALL_TIMEOUTS: Dict[str, float] = {
+    "query_rewrite": 20,
+    "sop_match": 15,
+    "planning": 30,
+    "executor_llm": 60,
+    "tool": 30,
+    "replan": 30,
+    "response": 60,
+    "retrieval": 5,
+}
+
+
+class DeadlineExceeded(asyncio.TimeoutError):
+    """请求截止时间已到，或单次调用超过上限"""
+
+    def __init__(self, kind: str, timeout: float):
+        super().__init__(f"{kind} timed out after {timeout:.1f}s")
+        self.kind = kind
+        self.timeout = timeout
+
+
+_call_timeouts: Optional[Dict[str, float]] = None
+
+
+def get_call_timeouts() -> Dict[str, float]:
+    global _call_timeouts
+    if _call_timeouts is None:
+        timeouts = dict(DEFAULT_CALL_TIMEOUTS)
+        raw = os.getenv("CALL_TIMEOUTS")
+        if raw:
+            try:
+                timeouts.update({key: float(value) for key, value in json.loads(raw).items()})
+            except (ValueError, AttributeError) as exc:
+                logger.warning("Invalid CALL_TIMEOUTS, using defaults: %s", exc)
+        _call_timeouts = timeouts
+    return _call_timeouts
+
+
+def resolve_request_timeout(*candidates: Any) -> float:
+    """按顺序取第一个有效的超时秒数，都没有时使用 REQUEST_TIMEOUT_SECONDS"""
+    for value in candidates:
+        if value in (None, ""):
+            continue
+        try:
+            seconds = float(value)
+        except (TypeError, ValueError):
+            logger.warning("Ignoring invalid request timeout: %r", value)
+            continue
+        if seconds > 0:
+            return seconds
+    return float(os.getenv("REQUEST_TIMEOUT_SECONDS", DEFAULT_REQUEST_TIMEOUT_SECONDS))
+
+
+def make_deadline(timeout_seconds: float) -> float:
+    # 用墙上时间而不是 monotonic：config 会出现在 checkpoint metadata 里，换进程后仍可比较
+    return time.time() + timeout_seconds
+
+
+def get_deadline(config: Optional[RunnableConfig]) -> Optional[float]:
+    if not config:
+        return None
+    return (config.get("configurable") or {}).get(DEADLINE_KEY)
+
+
+def remaining_seconds(config: Optional[RunnableConfig]) -> Optional[float]:
+    """请求剩余时间；没有 deadline 时返回 None"""
+    deadline = get_deadline(config)
+    if deadline is None:
+        return None
+    return deadline - time.time()
+
+
+def is_expiring(config: Optional[RunnableConfig], reserve: Optional[float] = None) -> bool:
+    """
+    剩余时间是否已不足以继续执行（预留 reserve 秒给最终回答生成）
+
+    reserve 默认取 DEADLINE_RESPONSE_RESERVE_SECONDS。
+    """
+    remaining = remaining_seconds(config)
+    if remaining is None:
+        return False
+    if reserve is None:
+        reserve = float(os.getenv("DEADLINE_RESPONSE_RESERVE_SECONDS", 15))
+    return remaining <= reserve
+
+
+def call_timeout(config: Optional[RunnableConfig], kind: str) -> float:
+    limit = get_call_timeouts().get(kind, DEFAULT_REQUEST_TIMEOUT_SECONDS)
+    remaining = remaining_seconds(config)
+    if remaining is None:
+        return limit
+    return min(limit, remaining)
+
+
+async def with_deadline(awaitable: Awaitable[T], config: Optional[RunnableConfig], kind: str) -> T:
+    """在截止时间内等待 awaitable；超时取消它并抛出 DeadlineExceeded"""
+    timeout = call_timeout(config, kind)
+    if timeout <= 0:
+        # 已经过期：不发起调用
+        if asyncio.iscoroutine(awaitable):
+            awaitable.close()
+        raise DeadlineExceeded(kind, 0)
+    try:
+        return await asyncio.wait_for(awaitable, timeout)
+    except asyncio.TimeoutError as exc:
+        if isinstance(exc, DeadlineExceeded):
+            raise
+        logger.warning("%s call exceeded %.1fs", kind, timeout)
+        raise DeadlineExceeded(kind, timeout) from exc
+
+
+async def run_sync_with_deadline(
+    func: Callable[..., T], *args: Any, config: Optional[RunnableConfig], kind: str, **kwargs: Any
+) -> T:
+    """
+    在线程池中执行同步调用（Qdrant 客户端等），不阻塞事件循环
+
+    超时后立即返回 DeadlineExceeded；线程本身无法中断，会在后台结束，所以底层客户端也应配置自己的超时。
+    """
+    return await with_deadline(asyncio.to_thread(func, *args, **kwargs), config, kind)
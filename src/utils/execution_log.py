@@ -0,0 +1,297 @@
+"""
+执行日志表
+
+step_results / execution_summary 原本只存在于 checkpoint blob 里，做统计（哪些 SOP 步骤最慢、
+各 intent 的 token 成本）只能逐个反序列化 checkpoint。这里在节点执行完时额外追加一行到专用表：
+
+- execution_steps:     每个计划步骤一行（耗时、工具、token、状态）
+- execution_summaries: 每次计划执行结束一行
+
+写入走进程内队列 + 后台批量 INSERT，节点本身不等待数据库；
+写入器由 FastAPI 生命周期启动，未启动时（单测、脚本）记录调用直接忽略。
+"""
+import asyncio
+import logging
+import os
+from datetime import datetime, timedelta
+from typing import Any, Dict, List, Optional, Tuple
+
+from src.config.mysql import get_aio_pool
+
+logger = logging.getLogger(__name__)
+
+CREATE_TABLES_SQL = (
+    """
+    CREATE TABLE IF NOT EXISTS execution_steps (
+        id BIGINT NOT NULL AUTO_INCREMENT,
+        thread_id VARCHAR(150) NOT NULL,
+        intent VARCHAR(64) NULL,
+        is_sop TINYINT(1) NOT NULL DEFAULT 0,
+        step_index INT NOT NULL,
+        step_description VARCHAR(512) NOT NULL,
+        status VARCHAR(16) NOT NULL,
+        tool_names VARCHAR(512) NOT NULL DEFAULT '',
+        duration_ms DOUBLE NULL,
+        prompt_tokens INT NOT NULL DEFAULT 0,
+        completion_tokens INT NOT NULL DEFAULT 0,
+        total_tokens INT NOT NULL DEFAULT 0,
+        created_at DATETIME(6) NOT NULL,
+        PRIMARY KEY (id),
+        INDEX idx_execution_steps_thread (thread_id, step_index),
+        INDEX idx_execution_steps_intent (intent, created_at),
+        INDEX idx_execution_steps_created (created_at)
+    ) CHARACTER SET utf8mb4 COLLATE utf8mb4_unicode_ci
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS execution_summaries (
+        id BIGINT NOT NULL AUTO_INCREMENT,
+        thread_id VARCHAR(150) NOT NULL,
+        intent VARCHAR(64) NULL,
+        is_sop TINYINT(1) NOT NULL DEFAULT 0,
+        total_steps INT NOT NULL,
+        completed_steps INT NOT NULL,
+        failed_steps INT NOT NULL,
+        overall_status VARCHAR(16) NOT NULL,
+        total_duration_ms DOUBLE NULL,
+        prompt_tokens INT NOT NULL DEFAULT 0,
+        completion_tokens INT NOT NULL DEFAULT 0,
+        total_tokens INT NOT NULL DEFAULT 0,
+        created_at DATETIME(6) NOT NULL,
+        PRIMARY KEY (id),
+        INDEX idx_execution_summaries_thread (thread_id, created_at),
+        INDEX idx_execution_summaries_intent (intent, created_at)
+    ) CHARACTER SET utf8mb4 COLLATE utf8mb4_unicode_ci
+    """,
+)
+
+STEP_COLUMNS = (
+    "thread_id", "intent", "is_sop", "step_index", "step_description", "status", "tool_names",
+    "duration_ms", "prompt_tokens", "completion_tokens", "total_tokens", "created_at",
+)
+SUMMARY_COLUMNS = (
+    "thread_id", "intent", "is_sop", "total_steps", "completed_steps", "failed_steps", "overall_status",
+    "total_duration_ms", "prompt_tokens", "completion_tokens", "total_tokens", "created_at",
+)
+TABLE_COLUMNS = {"execution_steps": STEP_COLUMNS, "execution_summaries": SUMMARY_COLUMNS}
+
+
+def _enum_value(value: Any) -> str:
+    return getattr(value, "value", value) or ""
+
+
+def _token_counts(usage: Any) -> Tuple[int, int, int]:
+    if usage is None:
+        return 0, 0, 0
+    return usage.prompt_tokens, usage.completion_tokens, usage.total_tokens
+
+
+def step_row(thread_id: str, intent: Optional[str], is_sop: bool, result: Any) -> tuple:
+    tool_names = ",".join(call.tool_name for call in getattr(result, "tool_calls", []) or [])
+    return (
+        thread_id,
+        intent,
+        int(is_sop),
+        result.step_index,
+        (result.step_description or "")[:512],
+        _enum_value(result.status),
+        tool_names[:512],
+        result.duration_ms,
+        *_token_counts(result.token_usage),
+        result.end_time or datetime.now(),
+    )
+
+
+def summary_row(thread_id: str, summary: Any) -> tuple:
+    return (
+        thread_id,
+        summary.intent,
+        int(summary.is_sop),
+        summary.total_steps,
+        summary.completed_steps,
+        summary.failed_steps,
+        _enum_value(summary.overall_status),
+        summary.total_duration_ms,
+        *_token_counts(summary.total_token_usage),
+        summary.end_time or datetime.now(),
+    )
+
+
+def build_insert(table: str, rows: List[tuple]) -> Tuple[str, list]:
+    columns = TABLE_COLUMNS[table]
+    placeholders = ", ".join(["(" + ", ".join(["%s"] * len(columns)) + ")"] * len(rows))
+    return (
+        f"INSERT INTO {table} ({', '.join(columns)}) VALUES {placeholders}",
+        [value for row in rows for value in row],
+    )
+
+
+# close() 放入队列的结束标记：后台任务写完手上的批次后退出
+_STOP = object()
+
+
+class ExecutionLogWriter:
+    """进程内批量写入器：攒够 batch_size 行或每 flush_interval 秒写一次"""
+
+    def __init__(self, batch_size: int = 200, flush_interval: float = 1.0, max_queue: int = 10000):
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self._queue: Optional[asyncio.Queue] = None
+        self._max_queue = max_queue
+        self._task: Optional[asyncio.Task] = None
+
+    @property
+    def running(self) -> bool:
+        return self._task is not None and not self._task.done()
+
+    async def start(self) -> None:
+        if self.running:
+            return
+        pool = await get_aio_pool()
+        async with pool.acquire() as conn:
+            async with conn.cursor() as cursor:
+                for statement in CREATE_TABLES_SQL:
+                    await cursor.execute(statement)
+        self._queue = asyncio.Queue(maxsize=self._max_queue)
+        self._task = asyncio.create_task(self._run())
+
+    def submit(self, table: str, row: tuple) -> None:
+        if not self.running:
+            return
+        try:
+            self._queue.put_nowait((table, row))
+        except asyncio.QueueFull:
+            logger.warning("Execution log queue is full, dropping %s row", table)
+
+    async def _run(self) -> None:
+        while True:
+            item = await self._queue.get()
+            if item is _STOP:
+                return
+            batch = [item]
+            stopping = False
+            deadline = asyncio.get_running_loop().time() + self.flush_interval
+            while len(batch) < self.batch_size:
+                timeout = deadline - asyncio.get_running_loop().time()
+                if timeout <= 0:
+                    break
+                try:
+                    item = await asyncio.wait_for(self._queue.get(), timeout)
+                except asyncio.TimeoutError:
+                    break
+                if item is _STOP:
+                    stopping = True
+                    break
+                batch.append(item)
+            await self._flush(batch)
+            if stopping:
+                return
+
+    async def _flush(self, batch: List[Tuple[str, tuple]]) -> None:
+        grouped: Dict[str, List[tuple]] = {}
+        for table, row in batch:
+            grouped.setdefault(table, []).append(row)
+        try:
+            pool = await get_aio_pool()
+            async with pool.acquire() as conn:
+                async with conn.cursor() as cursor:
+                    for table, rows in grouped.items():
+                        await cursor.execute(*build_insert(table, rows))
+        except Exception as e:
+            logger.warning("Failed to write %s execution log rows: %s", len(batch), e)
+
+    async def close(self) -> None:
+        """通知后台任务写完当前批次后退出，再把队列里剩余的行写完"""
+        if self._task is None:
+            return
+        if not self._task.done():
+            await self._queue.put(_STOP)
+        await asyncio.gather(self._task, return_exceptions=True)
+        self._task = None
+        remaining = []
+        while not self._queue.empty():
+            item = self._queue.get_nowait()
+            if item is not _STOP:
+                remaining.append(item)
+        if remaining:
+            await self._flush(remaining)
+
+
+_writer: Optional[ExecutionLogWriter] = None
+
+
+def get_execution_log_writer() -> ExecutionLogWriter:
+    global _writer
+    if _writer is None:
+        _writer = ExecutionLogWriter(
+            batch_size=int(os.getenv("EXECUTION_LOG_BATCH_SIZE", 200)),
+            flush_interval=float(os.getenv("EXECUTION_LOG_FLUSH_SECONDS", 1.0)),
+        )
+    return _writer
+
+
+def is_execution_log_enabled() -> bool:
+    if os.getenv("EXECUTION_LOG_ENABLED", "true").lower() != "true":
+        return False
+    return os.getenv("LANGGRAPH_CHECKPOINTER", "mysql").lower() == "mysql"
+
+
+def _thread_id(config: Optional[dict]) -> Optional[str]:
+    return ((config or {}).get("configurable") or {}).get("thread_id")
+
+
+def log_step_result(config: Optional[dict], intent: Optional[str], is_sop: bool, result: Any) -> None:
+    """节点内调用：只入队，不等待数据库"""
+    thread_id = _thread_id(config)
+    if thread_id:
+        get_execution_log_writer().submit("execution_steps", step_row(thread_id, intent, is_sop, result))
+
+
+def log_execution_summary(config: Optional[dict], summary: Any) -> None:
+    thread_id = _thread_id(config)
+    if thread_id:
+        get_execution_log_writer().submit("execution_summaries", summary_row(thread_id, summary))
+
+
+# ---- 查询 ----
+
+async def _fetchall(query: str, params: list) -> List[Dict[str, Any]]:
+    pool = await get_aio_pool()
+    async with pool.acquire() as conn:
+        async with conn.cursor() as cursor:
+            await cursor.execute(query, params)
+            return list(await cursor.fetchall())
+
+
+async def get_thread_steps(thread_id: str) -> List[Dict[str, Any]]:
+    return await _fetchall(
+        "SELECT step_index, step_description, status, tool_names, duration_ms, prompt_tokens, "
+        "completion_tokens, total_tokens, created_at FROM execution_steps "
+        "WHERE thread_id = %s ORDER BY step_index, id",
+        [thread_id],
+    )
+
+
+async def get_slowest_steps(since_hours: int = 24, intent: Optional[str] = None, limit: int = 20) -> List[Dict[str, Any]]:
+    """按 (intent, 步骤描述) 聚合，平均耗时倒序"""
+    clauses, params = ["created_at >= %s"], [datetime.now() - timedelta(hours=since_hours)]
+    if intent:
+        clauses.insert(0, "intent = %s")
+        params.insert(0, intent)
+    return await _fetchall(
+        "SELECT intent, step_description, COUNT(*) AS runs, AVG(duration_ms) AS avg_duration_ms, "
+        "MAX(duration_ms) AS max_duration_ms, SUM(status = 'failed') AS failures "
+        f"FROM execution_steps WHERE {' AND '.join(clauses)} "
+        "GROUP BY intent, step_description ORDER BY avg_duration_ms DESC LIMIT %s",
+        params + [limit],
+    )
+
+
+async def get_token_usage_by_intent(since_hours: int = 24) -> List[Dict[str, Any]]:
+    return await _fetchall(
+        "SELECT intent, COUNT(*) AS runs, SUM(total_tokens) AS total_tokens, "
+        "AVG(total_tokens) AS avg_tokens_per_run, SUM(prompt_tokens) AS prompt_tokens, "
+        "SUM(completion_tokens) AS completion_tokens, AVG(total_duration_ms) AS avg_duration_ms "
+        "FROM execution_summaries WHERE created_at >= %s "
+        "GROUP BY intent ORDER BY total_tokens DESC",
+        [datetime.now() - timedelta(hours=since_hours)],
+    )
@@ -0,0 +1,252 @@
+"""
+进程内 FAQ 向量索引
+
+FAQ 语料规模很小（千级以内），每次查询都走一次 Qdrant 网络往返并不划算。
+这里把 Qdrant 集合导出为本地快照，加载成归一化后的 float32 矩阵，
+查询时用一次矩阵向量点积 + argpartition 取 top-k，完全在进程内完成。
+
+快照采用 `src.utils.vector_snapshot` 的 mmap 格式，同机多个 worker 共享同一份 page cache。
+
+- `export_snapshot`: 从 Qdrant 导出快照（定时任务 / 启动时调用）
+- `get_faq_index`:  获取进程内索引单例，快照代号变化后自动切换
+- `faq_select`:     与 `qdrant_select` 同签名、同返回结构，供 faq_retrieve_node 使用
+
+通过 `FAQ_RETRIEVAL_BACKEND=local` 切换到进程内检索；Qdrant 维护期间本地快照仍可继续服务。
+"""
+import asyncio
+import logging
+import os
+import threading
+import time
+from pathlib import Path
+from typing import Any, List, Optional, Sequence, Tuple
+
+import numpy as np
+from qdrant_client.http.models import QueryResponse, ScoredPoint
+
+from src.constants import DEFAULT_RETRIEVAL_LIMIT, DEFAULT_SCORE_THRESHOLD
+from src.utils.qdrant_utils import _get_client, embed_query, qdrant_select
+from src.utils.vector_snapshot import (
+    MappedVectorSnapshot,
+    exclusive_writer,
+    read_current_generation,
+    snapshot_age_seconds,
+    write_snapshot,
+)
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_FAQ_COLLECTION = "dz_channel_faq"
+DEFAULT_SNAPSHOT_DIR = Path(__file__).resolve().parents[2] / "data" / "vector_snapshots"
+
+
+def get_snapshot_dir(collection_name: str) -> Path:
+    base_dir = Path(os.getenv("FAQ_SNAPSHOT_DIR") or DEFAULT_SNAPSHOT_DIR)
+    return base_dir / collection_name
+
+
+class LocalVectorIndex:
+    """归一化 float32 矩阵 + payload 列表的内存索引（余弦相似度）"""
+
+    def __init__(self, vectors: np.ndarray, ids: List[Any], payloads: List[dict]):
+        if len(vectors) != len(ids) or len(ids) != len(payloads):
+            raise ValueError("vectors / ids / payloads length mismatch")
+        vectors = np.asarray(vectors, dtype=np.float32)
+        norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+        norms[norms == 0] = 1.0
+        self.vectors = vectors / norms
+        self._records: Sequence[Tuple[Any, dict]] = list(zip(ids, payloads))
+
+    def __len__(self) -> int:
+        return len(self.vectors)
+
+    @classmethod
+    def from_snapshot(cls, snapshot: MappedVectorSnapshot) -> "LocalVectorIndex":
+        """基于 mmap 快照构建索引：向量已归一化，直接引用映射内存，不做拷贝。"""
+        index = cls.__new__(cls)
+        index.vectors = snapshot.vectors
+        index._records = snapshot
+        index.generation = snapshot.generation
+        return index
+
+    def search(
+        self,
+        query_vector: List[float],
+        limit: int = DEFAULT_RETRIEVAL_LIMIT,
+        score_threshold: Optional[float] = None,
+    ) -> QueryResponse:
+        if not len(self):
+            return QueryResponse(points=[])
+
+        query = np.asarray(query_vector, dtype=np.float32)
+        norm = np.linalg.norm(query)
+        if norm:
+            query = query / norm
+
+        scores = self.vectors @ query
+        k = min(limit, len(scores))
+        top = np.argpartition(-scores, k - 1)[:k]
+        top = top[np.argsort(-scores[top])]
+
+        points = []
+        for idx in top:
+            score = float(scores[idx])
+            if score_threshold is not None and score < score_threshold:
+                break
+            point_id, payload = self._records[int(idx)]
+            points.append(ScoredPoint(
+                id=point_id,
+                version=0,
+                score=score,
+                payload=payload,
+            ))
+        return QueryResponse(points=points)
+
+
+def export_snapshot(collection_name: str = DEFAULT_FAQ_COLLECTION, snapshot_dir: Optional[Path] = None) -> int:
+    """
+    从 Qdrant 导出集合快照
+
+    新快照写成新的一代文件后通过 rename 原子切换，读端不会看到写了一半的数据。
+    同机多个 worker 同时刷新时只有拿到文件锁的那个进程会真正导出。
+
+    Returns:
+        int: 导出的点数；未拿到写锁时返回 0
+    """
+    snapshot_dir = snapshot_dir or get_snapshot_dir(collection_name)
+    with exclusive_writer(snapshot_dir) as acquired:
+        if not acquired:
+            logger.debug("Another process is exporting %s, skip", collection_name)
+            return 0
+
+        client = _get_client()
+        ids, payloads, vectors = [], [], []
+        offset = None
+        while True:
+            records, offset = client.scroll(
+                collection_name=collection_name,
+                limit=256,
+                offset=offset,
+                with_payload=True,
+                with_vectors=True,
+            )
+            for record in records:
+                ids.append(record.id)
+                payloads.append(record.payload or {})
+                vectors.append(record.vector)
+            if offset is None:
+                break
+
+        if not ids:
+            logger.warning("Collection %s is empty, keep existing snapshot", collection_name)
+            return 0
+
+        write_snapshot(snapshot_dir, np.asarray(vectors, dtype=np.float32), ids, payloads)
+
+    logger.info("Exported %s points from %s to %s", len(ids), collection_name, snapshot_dir)
+    return len(ids)
+
+
+class _IndexHolder:
+    """按 CURRENT 代号懒加载 / 热切换索引"""
+
+    def __init__(self, snapshot_dir: Path):
+        self.snapshot_dir = snapshot_dir
+        self._index: Optional[LocalVectorIndex] = None
+        self._generation: Optional[str] = None
+        self._checked_at = 0.0
+        self._lock = threading.Lock()
+
+    def get(self, check_interval: float) -> Optional[LocalVectorIndex]:
+        now = time.monotonic()
+        if self._index is not None and now - self._checked_at < check_interval:
+            return self._index
+
+        with self._lock:
+            self._checked_at = now
+            generation = read_current_generation(self.snapshot_dir)
+            if generation is None or generation == self._generation:
+                return self._index
+            try:
+                self._index = LocalVectorIndex.from_snapshot(
+                    MappedVectorSnapshot(self.snapshot_dir, generation)
+                )
+                self._generation = generation
+                logger.info(
+                    "Mapped FAQ snapshot %s/%s (%s points)", self.snapshot_dir, generation, len(self._index)
+                )
+            except Exception as e:
+                logger.warning("Failed to map FAQ snapshot %s, keep previous index: %s", self.snapshot_dir, e)
+            return self._index
+
+
+_holders: dict = {}
+
+
+def get_faq_index(collection_name: str = DEFAULT_FAQ_COLLECTION) -> Optional[LocalVectorIndex]:
+    """获取进程内索引；快照不存在时返回 None。"""
+    holder = _holders.get(collection_name)
+    if holder is None:
+        holder = _holders.setdefault(collection_name, _IndexHolder(get_snapshot_dir(collection_name)))
+    check_interval = float(os.getenv("FAQ_SNAPSHOT_CHECK_SECONDS", 10))
+    return holder.get(check_interval)
+
+
+def get_retrieval_backend() -> str:
+    return os.getenv("FAQ_RETRIEVAL_BACKEND", "qdrant").lower()
+
+
+def faq_select(
+    query: str,
+    score_threshold: float = DEFAULT_SCORE_THRESHOLD,
+    collection_name: str = DEFAULT_FAQ_COLLECTION,
+) -> QueryResponse:
+    """
+    FAQ 检索入口，与 `qdrant_select` 保持相同签名和返回结构
+
+    - backend=local: 只查进程内索引；快照缺失时退回 Qdrant
+    - backend=qdrant: 查 Qdrant；Qdrant 不可用且有本地快照时用快照兜底
+    """
+    if get_retrieval_backend() == "local":
+        index = get_faq_index(collection_name)
+        if index is not None:
+            return index.search(embed_query(query), score_threshold=score_threshold)
+        logger.warning("FAQ snapshot for %s not found, falling back to Qdrant", collection_name)
+        return qdrant_select(query, score_threshold=score_threshold, collection_name=collection_name)
+
+    try:
+        return qdrant_select(query, score_threshold=score_threshold, collection_name=collection_name)
+    except Exception as e:
+        index = get_faq_index(collection_name)
+        if index is None:
+            raise
+        logger.warning("Qdrant query failed, serving FAQ from local snapshot: %s", e)
+        return index.search(embed_query(query), score_threshold=score_threshold)
+
+
+async def run_snapshot_refresher(collection_name: str = DEFAULT_FAQ_COLLECTION, interval: Optional[float] = None):
+    """
+    周期性从 Qdrant 导出快照的后台任务（在 FastAPI 启动时创建）
+
+    导出失败（例如 Qdrant 维护中）只记录日志，继续使用上一份快照。
+    同机其他 worker 刚刷新过的快照不会被重复导出。
+    """
+    interval = interval or float(os.getenv("FAQ_SNAPSHOT_REFRESH_SECONDS", 300))
+    snapshot_dir = get_snapshot_dir(collection_name)
+    while True:
+        try:
+            age = snapshot_age_seconds(snapshot_dir)
+            if age is None or age >= interval:
+                await asyncio.to_thread(export_snapshot, collection_name)
+        except Exception as e:
+            logger.warning("FAQ snapshot refresh failed for %s: %s", collection_name, e)
+        await asyncio.sleep(interval)
+
+
+if __name__ == "__main__":
+    import sys
+
+    logging.basicConfig(level=logging.INFO)
+    target = sys.argv[1] if len(sys.argv) > 1 else DEFAULT_FAQ_COLLECTION
+    count = export_snapshot(target)
+    print(f"Exported {count} points to {get_snapshot_dir(target)}")
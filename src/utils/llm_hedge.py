@@ -0,0 +1,179 @@
+"""
+LLM 请求对冲（hedging）
+
+代理的 LLM 延迟长尾明显，一次诊断串行 8 次以上调用，尾延迟会叠加。开启后：
+主请求超过该 (节点, 模型) 最近延迟的 LLM_HEDGE_PERCENTILE 分位仍未返回时，再发一个相同请求
+（LLM_HEDGE_ALTERNATE=true 时发往备用端点），取先成功的结果并取消另一个。
+
+- 样本不足 LLM_HEDGE_MIN_SAMPLES 时不对冲
+- 每个节点有对冲预算：每次调用积累 budget 个额度（如 0.05 表示最多约 5% 的调用会对冲），对冲消耗 1 个
+- 流式输出的调用（最终回答）不对冲，否则会推送两份 token
+"""
+import asyncio
+import json
+import logging
+import os
+import time
+from collections import defaultdict, deque
+from typing import Any, Awaitable, Callable, Deque, Dict, Optional, Tuple, TypeVar
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+DEFAULT_PERCENTILE = 0.95
+DEFAULT_MIN_SAMPLES = 20
+DEFAULT_BUDGET = 0.05
+# 预算最多攒到的额度，避免长时间空闲后集中对冲
+MAX_BUDGET_BURST = 3.0
+
+
+class LatencyTracker:
+    """最近 N 次调用的延迟"""
+
+    def __init__(self, window: int = 200):
+        self._samples: Deque[float] = deque(maxlen=window)
+
+    def record(self, seconds: float) -> None:
+        self._samples.append(seconds)
+
+    def percentile(self, p: float, min_samples: int) -> Optional[float]:
+        if len(self._samples) < min_samples:
+            return None
+        ordered = sorted(self._samples)
+        return ordered[min(len(ordered) - 1, int(len(ordered) * p))]
+
+
+class HedgeBudget:
+    def __init__(self, ratio: float):
+        self.ratio = ratio
+        self.credits = 0.0
+
+    def on_call(self) -> None:
+        self.credits = min(MAX_BUDGET_BURST, self.credits + self.ratio)
+
+    def try_spend(self) -> bool:
+        if self.credits >= 1:
+            self.credits -= 1
+            return True
+        return False
+
+
+class Hedger:
+    def __init__(
+        self,
+        percentile: float = DEFAULT_PERCENTILE,
+        min_samples: int = DEFAULT_MIN_SAMPLES,
+        default_budget: float = DEFAULT_BUDGET,
+        budgets: Optional[Dict[str, float]] = None,
+    ):
+        self.percentile = percentile
+        self.min_samples = min_samples
+        self.default_budget = default_budget
+        self.budgets = budgets or {}
+        self._latency: Dict[Tuple[str, str], LatencyTracker] = defaultdict(LatencyTracker)
+        self._budget: Dict[str, HedgeBudget] = {}
+        self._stats: Dict[str, Dict[str, int]] = defaultdict(lambda: {"calls": 0, "hedged": 0, "hedge_wins": 0})
+
+    def budget(self, node: str) -> HedgeBudget:
+        budget = self._budget.get(node)
+        if budget is None:
+            budget = self._budget[node] = HedgeBudget(self.budgets.get(node, self.default_budget))
+        return budget
+
+    async def call(self, node: str, model: str, make_call: Callable[[bool], Awaitable[T]]) -> T:
+        """make_call(alternate) 返回一次 LLM 调用；alternate=True 表示对冲请求"""
+        stats = self._stats[node]
+        stats["calls"] += 1
+        budget = self.budget(node)
+        budget.on_call()
+        tracker = self._latency[(node, model)]
+        delay = tracker.percentile(self.percentile, self.min_samples)
+
+        started = time.monotonic()
+        primary = asyncio.ensure_future(make_call(False))
+        if delay is None:
+            result = await primary
+            tracker.record(time.monotonic() - started)
+            return result
+
+        try:
+            done, _ = await asyncio.wait({primary}, timeout=delay)
+            if done or not budget.try_spend():
+                result = await primary
+                tracker.record(time.monotonic() - started)
+                return result
+
+            stats["hedged"] += 1
+            logger.info("Hedging %s/%s after %.2fs", node, model, delay)
+            hedge = asyncio.ensure_future(make_call(True))
+            return await self._first_success(stats, tracker, started, primary, hedge)
+        except asyncio.CancelledError:
+            primary.cancel()
+            raise
+
+    async def _first_success(self, stats, tracker, started, primary, hedge):
+        pending = {primary, hedge}
+        error: Optional[BaseException] = None
+        try:
+            while pending:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    if task.exception() is None:
+                        if task is hedge:
+                            stats["hedge_wins"] += 1
+                        tracker.record(time.monotonic() - started)
+                        return task.result()
+                    error = task.exception()
+            raise error
+        finally:
+            for task in (primary, hedge):
+                if not task.done():
+                    task.cancel()
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            node: {**stats, "budget_credits": round(self.budget(node).credits, 2)}
+            for node, stats in self._stats.items()
+        }
+
+
+def _load_budgets() -> Dict[str, float]:
+    raw = os.getenv("LLM_HEDGE_BUDGETS")
+    if not raw:
+        return {}
+    try:
+        return {node: float(value) for node, value in json.loads(raw).items()}
+    except (ValueError, AttributeError) as exc:
+        logger.warning("Invalid LLM_HEDGE_BUDGETS, ignoring: %s", exc)
+        return {}
+
+
+_hedger: Optional[Hedger] = None
+
+
+def is_hedging_enabled() -> bool:
+    return os.getenv("LLM_HEDGE_ENABLED", "false").lower() == "true"
+
+
+def get_hedger() -> Hedger:
+    global _hedger
+    if _hedger is None:
+        _hedger = Hedger(
+            percentile=float(os.getenv("LLM_HEDGE_PERCENTILE", DEFAULT_PERCENTILE)),
+            min_samples=int(os.getenv("LLM_HEDGE_MIN_SAMPLES", DEFAULT_MIN_SAMPLES)),
+            default_budget=float(os.getenv("LLM_HEDGE_BUDGET", DEFAULT_BUDGET)),
+            budgets=_load_budgets(),
+        )
+    return _hedger
+
+
+async def hedged(node: str, model: str, make_call: Callable[[bool], Awaitable[T]]) -> T:
+    """节点调用 LLM 的入口；未开启对冲时直接执行主请求"""
+    if not is_hedging_enabled():
+        return await make_call(False)
+    return await get_hedger().call(node, model, make_call)
+
+
+def get_hedge_stats() -> Optional[Dict[str, Any]]:
+    return _hedger.stats() if _hedger is not None else None
@@ -0,0 +1,312 @@
+"""
+多端点 LLM 池
+
+原来 get_gpt_model 固定打 OpenAI 兼容代理，代理故障或变慢时所有请求一起卡住。
+配置 LLM_ENDPOINTS 后，get_gpt_model 从池中按健康状况选端点：
+
+- 每个端点声明可提供的模型（列表，或 逻辑模型名 -> 端点侧模型名 的映射；"*" 表示全部）和权重
+- 按滚动延迟（EWMA）× (1 + 在途数) / 权重 选最优端点，其余健康端点作为同一次调用内的 fallback
+- 熔断：滑动窗口内错误率超过阈值或连续失败达到上限时打开；冷却后半开，只放一个探测请求，
+  成功则关闭，失败则重新打开
+- 全部端点都熔断时不直接失败，按最早熔断的顺序继续尝试（fail-open）
+
+请求参数错误（4xx，除 408 / 429）不算端点故障；调用被取消也不计入，在途数和半开探测名额在调用所在任务
+结束时归还（见 src/utils/task_runs.py）。
+
+LLM_ENDPOINTS 示例（api_key_env 指向保存密钥的环境变量）：
+[{"name": "proxy", "base_url": "https://api.openai-proxy.org/v1", "api_key_env": "OPENAI_COMPAT_API_KEY"},
+ {"name": "mt", "base_url": "https://aigc.sankuai.com/v1/openai/native", "api_key_env": "MT_OPENAI_API_KEY",
+  "models": ["gpt-4.1", "gpt-4.1-mini"], "weight": 0.5}]
+"""
+import asyncio
+import json
+import logging
+import os
+import time
+from collections import deque
+from dataclasses import dataclass, field
+from typing import Any, Deque, Dict, List, Optional, Tuple, Union
+from uuid import UUID
+
+from langchain_core.callbacks import AsyncCallbackHandler
+from langchain_core.outputs import LLMResult
+
+from src.utils.task_runs import TaskBoundRuns
+
+logger = logging.getLogger(__name__)
+
+STATE_CLOSED = "closed"
+STATE_OPEN = "open"
+STATE_HALF_OPEN = "half_open"
+
+DEFAULT_ERROR_RATE = 0.5
+DEFAULT_MIN_REQUESTS = 5
+DEFAULT_WINDOW_SECONDS = 60
+DEFAULT_COOLDOWN_SECONDS = 30
+DEFAULT_CONSECUTIVE_FAILURES = 3
+# 没有延迟样本的端点按该值（秒）估计，保证新端点 / 刚恢复的端点有机会被选中
+DEFAULT_PRIOR_LATENCY = 2.0
+
+
+class CircuitBreaker:
+    def __init__(
+        self,
+        error_rate: float = DEFAULT_ERROR_RATE,
+        min_requests: int = DEFAULT_MIN_REQUESTS,
+        window_seconds: float = DEFAULT_WINDOW_SECONDS,
+        cooldown_seconds: float = DEFAULT_COOLDOWN_SECONDS,
+        consecutive_failures: int = DEFAULT_CONSECUTIVE_FAILURES,
+    ):
+        self.error_rate = error_rate
+        self.min_requests = min_requests
+        self.window_seconds = window_seconds
+        self.cooldown_seconds = cooldown_seconds
+        self.consecutive_failures = consecutive_failures
+        self.state = STATE_CLOSED
+        self.opened_at = 0.0
+        self.trips = 0
+        self._outcomes: Deque[Tuple[float, bool]] = deque()
+        self._consecutive = 0
+        self._probe_started: Optional[float] = None
+
+    def _trim(self, now: float) -> None:
+        while self._outcomes and now - self._outcomes[0][0] > self.window_seconds:
+            self._outcomes.popleft()
+
+    def current_state(self) -> str:
+        if self.state == STATE_OPEN and time.monotonic() - self.opened_at >= self.cooldown_seconds:
+            self.state = STATE_HALF_OPEN
+            self._probe_started = None
+        return self.state
+
+    def available(self) -> bool:
+        """是否可以选用该端点（不占用半开状态的探测名额）"""
+        state = self.current_state()
+        if state == STATE_CLOSED:
+            return True
+        if state == STATE_OPEN:
+            return False
+        # 探测请求长时间没有结果时允许新的探测
+        return self._probe_started is None or time.monotonic() - self._probe_started > self.cooldown_seconds
+
+    def claim_probe(self) -> None:
+        """半开状态下请求真正发往该端点时占用探测名额"""
+        if self.current_state() == STATE_HALF_OPEN:
+            self._probe_started = time.monotonic()
+
+    def release_probe(self) -> None:
+        """探测请求被取消、没有结果时归还探测名额"""
+        if self.state == STATE_HALF_OPEN:
+            self._probe_started = None
+
+    def allow(self) -> bool:
+        """是否可以把请求发往该端点；半开状态下同时只放行一个探测"""
+        if not self.available():
+            return False
+        self.claim_probe()
+        return True
+
+    def record(self, ok: bool) -> None:
+        now = time.monotonic()
+        if self.current_state() == STATE_HALF_OPEN:
+            if ok:
+                logger.info("Circuit closed after successful probe")
+                self.state = STATE_CLOSED
+                self._outcomes.clear()
+                self._consecutive = 0
+            else:
+                self._open(now)
+            return
+
+        self._outcomes.append((now, ok))
+        self._trim(now)
+        self._consecutive = 0 if ok else self._consecutive + 1
+        if self.state != STATE_CLOSED:
+            return
+        failures = sum(1 for _, success in self._outcomes if not success)
+        if self._consecutive >= self.consecutive_failures or (
+            len(self._outcomes) >= self.min_requests and failures / len(self._outcomes) >= self.error_rate
+        ):
+            self._open(now)
+
+    def _open(self, now: float) -> None:
+        self.state = STATE_OPEN
+        self.opened_at = now
+        self.trips += 1
+        self._consecutive = 0
+        self._outcomes.clear()
+
+
+@dataclass
+class LLMEndpoint:
+    name: str
+    base_url: str
+    api_key: str
+    # None 表示提供所有模型；dict 为 逻辑模型名 -> 端点侧模型名
+    models: Optional[Union[List[str], Dict[str, str]]] = None
+    weight: float = 1.0
+    breaker: CircuitBreaker = field(default_factory=CircuitBreaker)
+    latency_ewma: Optional[float] = None
+    in_flight: int = 0
+    requests: int = 0
+    failures: int = 0
+
+    def serves(self, model: str) -> bool:
+        return self.models is None or model in self.models
+
+    def model_name(self, model: str) -> str:
+        if isinstance(self.models, dict):
+            return self.models.get(model, model)
+        return model
+
+    def score(self) -> float:
+        latency = self.latency_ewma if self.latency_ewma is not None else DEFAULT_PRIOR_LATENCY
+        return latency * (1 + self.in_flight) / max(self.weight, 1e-6)
+
+    def record(self, ok: bool, latency: Optional[float] = None) -> None:
+        self.requests += 1
+        if ok:
+            if latency is not None:
+                self.latency_ewma = latency if self.latency_ewma is None else 0.8 * self.latency_ewma + 0.2 * latency
+        else:
+            self.failures += 1
+        previous = self.breaker.state
+        self.breaker.record(ok)
+        if self.breaker.state != previous:
+            logger.warning("LLM endpoint %s circuit %s -> %s", self.name, previous, self.breaker.state)
+
+
+class LLMPool:
+    def __init__(self, endpoints: List[LLMEndpoint]):
+        self.endpoints = endpoints
+
+    def select(self, model: str) -> List[LLMEndpoint]:
+        """返回可用端点，最优在前；全部熔断时按最早熔断的顺序返回"""
+        candidates = [endpoint for endpoint in self.endpoints if endpoint.serves(model)]
+        healthy = sorted((e for e in candidates if e.breaker.available()), key=lambda e: e.score())
+        if healthy:
+            # 只有首选端点立即占用探测名额；fallback 端点在真正被调用时（PoolCallback）才占用
+            healthy[0].breaker.claim_probe()
+            return healthy
+        logger.warning("All LLM endpoints for %s are open, trying anyway", model)
+        return sorted(candidates, key=lambda e: e.breaker.opened_at)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            endpoint.name: {
+                "state": endpoint.breaker.current_state(),
+                "latency_ewma_seconds": round(endpoint.latency_ewma, 3) if endpoint.latency_ewma is not None else None,
+                "in_flight": endpoint.in_flight,
+                "requests": endpoint.requests,
+                "failures": endpoint.failures,
+                "trips": endpoint.breaker.trips,
+                "weight": endpoint.weight,
+            }
+            for endpoint in self.endpoints
+        }
+
+
+def is_endpoint_failure(error: BaseException) -> bool:
+    """参数错误等客户端问题不算端点故障"""
+    status = getattr(error, "status_code", None)
+    if status is None:
+        status = getattr(getattr(error, "response", None), "status_code", None)
+    if isinstance(status, int) and 400 <= status < 500 and status not in (408, 429):
+        return False
+    return True
+
+
+class PoolCallback(AsyncCallbackHandler):
+    """记录单个端点的调用结果；挂在调度回调之后，延迟不含排队时间"""
+
+    # 与调度回调一样在调用所在任务里执行，任务结束时才能归还被取消的调用
+    run_inline = True
+
+    def __init__(self, endpoint: LLMEndpoint):
+        self.endpoint = endpoint
+        self._runs = TaskBoundRuns(self._release_cancelled)
+
+    async def on_chat_model_start(self, serialized, messages, *, run_id: UUID, **kwargs: Any) -> None:
+        probe = self.endpoint.breaker.current_state() == STATE_HALF_OPEN
+        self._runs.add(run_id, (time.monotonic(), probe))
+        self.endpoint.in_flight += 1
+        self.endpoint.breaker.claim_probe()
+
+    async def on_llm_end(self, response: LLMResult, *, run_id: UUID, **kwargs: Any) -> None:
+        run = self._runs.pop(run_id)
+        if run is None:
+            return
+        self.endpoint.in_flight -= 1
+        self.endpoint.record(True, time.monotonic() - run[0])
+
+    async def on_llm_error(self, error: BaseException, *, run_id: UUID, **kwargs: Any) -> None:
+        run = self._runs.pop(run_id)
+        if run is None:
+            return
+        if isinstance(error, asyncio.CancelledError):
+            self._release_cancelled(run)
+            return
+        self.endpoint.in_flight -= 1
+        if is_endpoint_failure(error):
+            self.endpoint.record(False)
+        else:
+            self.endpoint.record(True)
+
+    def _release_cancelled(self, run: Tuple[float, bool]) -> None:
+        self.endpoint.in_flight -= 1
+        if run[1]:
+            self.endpoint.breaker.release_probe()
+
+
+def load_endpoints(raw: Optional[str] = None) -> List[LLMEndpoint]:
+    raw = raw if raw is not None else os.getenv("LLM_ENDPOINTS", "")
+    if not raw.strip():
+        return []
+    endpoints = []
+    for item in json.loads(raw):
+        api_key = item.get("api_key") or os.getenv(item.get("api_key_env", ""), "")
+        if not api_key:
+            logger.warning("LLM endpoint %s has no API key, skipped", item.get("name"))
+            continue
+        models = item.get("models")
+        if isinstance(models, list) and "*" in models:
+            models = None
+        endpoints.append(LLMEndpoint(
+            name=item["name"],
+            base_url=item["base_url"].rstrip("/"),
+            api_key=api_key,
+            models=models,
+            weight=float(item.get("weight", 1.0)),
+            breaker=CircuitBreaker(
+                error_rate=float(os.getenv("LLM_BREAKER_ERROR_RATE", DEFAULT_ERROR_RATE)),
+                min_requests=int(os.getenv("LLM_BREAKER_MIN_REQUESTS", DEFAULT_MIN_REQUESTS)),
+                window_seconds=float(os.getenv("LLM_BREAKER_WINDOW_SECONDS", DEFAULT_WINDOW_SECONDS)),
+                cooldown_seconds=float(os.getenv("LLM_BREAKER_COOLDOWN_SECONDS", DEFAULT_COOLDOWN_SECONDS)),
+                consecutive_failures=int(os.getenv("LLM_BREAKER_CONSECUTIVE_FAILURES", DEFAULT_CONSECUTIVE_FAILURES)),
+            ),
+        ))
+    return endpoints
+
+
+_pool: Optional[LLMPool] = None
+_pool_loaded = False
+
+
+def get_llm_pool() -> Optional[LLMPool]:
+    """未配置 LLM_ENDPOINTS 时返回 None，get_gpt_model 保持单端点行为"""
+    global _pool, _pool_loaded
+    if not _pool_loaded:
+        _pool_loaded = True
+        try:
+            endpoints = load_endpoints()
+        except (ValueError, KeyError, TypeError) as exc:
+            logger.error("Invalid LLM_ENDPOINTS, pool disabled: %s", exc)
+            endpoints = []
+        if endpoints:
+            _pool = LLMPool(endpoints)
+            logger.info("LLM pool initialized with endpoints: %s", [e.name for e in endpoints])
+    return _pool
+
+
+def get_llm_pool_stats() -> Optional[Dict[str, Any]]:
+    return _pool.stats() if _pool is not None else None
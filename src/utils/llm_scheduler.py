@@ -0,0 +1,348 @@
+"""
+进程级 LLM 调度
+
+各节点各自 new ChatOpenAI 直接打代理，进程不知道离 provider 的 RPM / TPM 上限还有多远，
+超限后每个调用各自重试，形成重试风暴。这里在 LLM 客户端上挂一个回调，所有调用在真正发出请求前
+（on_chat_model_start）先向调度器申请放行：
+
+- 每个模型两个令牌桶：请求数（RPM）和 token 数（TPM）；token 按 prompt 长度预估，结束后按实际用量补差
+- 优先级队列：interactive（最终回答）> normal（图内节点）> batch（SubAgent 等后台任务），同优先级 FIFO
+- AIMD 并发控制：遇到 429 并发上限减半；延迟超过目标时小幅下调；其余成功调用每轮 +1
+
+被取消的调用（请求截止时间到 / 对冲落败 / 客户端断开）会从队列中移除；已放行的在调用所在任务结束时
+归还并发名额（LangChain 不会为被取消的调用回调 on_llm_error，见 src/utils/task_runs.py）。
+"""
+import asyncio
+import heapq
+import itertools
+import json
+import logging
+import os
+import time
+from collections import deque
+from typing import Any, Deque, Dict, List, Optional, Tuple
+from uuid import UUID
+
+from langchain_core.callbacks import AsyncCallbackHandler
+from langchain_core.messages import BaseMessage
+from langchain_core.outputs import LLMResult
+
+from src.utils.task_runs import TaskBoundRuns
+
+logger = logging.getLogger(__name__)
+
+PRIORITY_INTERACTIVE = 0
+PRIORITY_NORMAL = 1
+PRIORITY_BATCH = 2
+PRIORITY_NAMES = {PRIORITY_INTERACTIVE: "interactive", PRIORITY_NORMAL: "normal", PRIORITY_BATCH: "batch"}
+# 调用方也可以通过 config={"metadata": {"llm_priority": ...}} 指定
+PRIORITY_METADATA_KEY = "llm_priority"
+
+DEFAULT_RPM = 500
+DEFAULT_TPM = 200000
+DEFAULT_MAX_CONCURRENCY = 32
+DEFAULT_MIN_CONCURRENCY = 2
+DEFAULT_LATENCY_TARGET_SECONDS = 20
+# 预估 token 时为输出预留的量
+DEFAULT_COMPLETION_TOKENS = 512
+
+
+class TokenBucket:
+    """容量为每分钟额度、按秒匀速补充的令牌桶；允许补差后短暂为负"""
+
+    def __init__(self, per_minute: float):
+        self.capacity = float(per_minute)
+        self.rate = per_minute / 60.0
+        self.tokens = float(per_minute)
+        self.updated = time.monotonic()
+
+    def _refill(self) -> None:
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def wait_time(self, amount: float) -> float:
+        """还需要等多久才能取出 amount；超过容量的请求按容量算，避免永远等不到"""
+        self._refill()
+        amount = min(amount, self.capacity)
+        if self.tokens >= amount:
+            return 0.0
+        return (amount - self.tokens) / self.rate if self.rate > 0 else float("inf")
+
+    def take(self, amount: float) -> None:
+        self._refill()
+        self.tokens -= amount
+
+    def adjust(self, delta: float) -> None:
+        """delta > 0 退还，< 0 补扣"""
+        self._refill()
+        self.tokens = min(self.capacity, self.tokens + delta)
+
+
+class ModelLimiter:
+    """单个模型的令牌桶 + 优先级队列 + AIMD 并发上限"""
+
+    def __init__(
+        self,
+        model: str,
+        rpm: float = DEFAULT_RPM,
+        tpm: float = DEFAULT_TPM,
+        max_concurrency: int = DEFAULT_MAX_CONCURRENCY,
+        min_concurrency: int = DEFAULT_MIN_CONCURRENCY,
+        latency_target: float = DEFAULT_LATENCY_TARGET_SECONDS,
+    ):
+        self.model = model
+        self.requests = TokenBucket(rpm)
+        self.tokens = TokenBucket(tpm)
+        self.max_concurrency = max_concurrency
+        self.min_concurrency = min_concurrency
+        self.latency_target = latency_target
+        self.concurrency_limit = float(max_concurrency)
+        self.in_flight = 0
+        self._queue: List[Tuple[int, int, asyncio.Future, int]] = []
+        self._seq = itertools.count()
+        self._timer: Optional[asyncio.TimerHandle] = None
+        self._wait_ms: Deque[float] = deque(maxlen=500)
+        self._latency: Deque[float] = deque(maxlen=500)
+        self.granted = 0
+        self.throttled = 0
+        self.errors = 0
+
+    async def acquire(self, priority: int, estimated_tokens: int) -> None:
+        loop = asyncio.get_running_loop()
+        waiter = loop.create_future()
+        heapq.heappush(self._queue, (priority, next(self._seq), waiter, estimated_tokens))
+        started = time.monotonic()
+        self._pump()
+        try:
+            await waiter
+        except asyncio.CancelledError:
+            if waiter.done() and not waiter.cancelled():
+                # 已放行但调用方被取消：归还并发名额
+                self.in_flight -= 1
+                self._pump()
+            else:
+                waiter.cancel()
+            raise
+        self._wait_ms.append((time.monotonic() - started) * 1000)
+
+    def _pump(self) -> None:
+        """按优先级放行，直到并发或令牌桶不足；令牌不足时定时重试"""
+        while self._queue:
+            priority, _, waiter, estimated_tokens = self._queue[0]
+            if waiter.done():
+                heapq.heappop(self._queue)
+                continue
+            if self.in_flight >= int(self.concurrency_limit):
+                return
+            wait = max(self.requests.wait_time(1), self.tokens.wait_time(estimated_tokens))
+            if wait > 0:
+                self._schedule(wait)
+                return
+            heapq.heappop(self._queue)
+            self.requests.take(1)
+            self.tokens.take(estimated_tokens)
+            self.in_flight += 1
+            self.granted += 1
+            waiter.set_result(None)
+
+    def _schedule(self, delay: float) -> None:
+        if self._timer is not None and not self._timer.cancelled():
+            return
+        loop = asyncio.get_running_loop()
+
+        def fire():
+            self._timer = None
+            self._pump()
+
+        self._timer = loop.call_later(delay, fire)
+
+    def release(
+        self,
+        latency: float,
+        estimated_tokens: int,
+        used_tokens: Optional[int] = None,
+        throttled: bool = False,
+        failed: bool = False,
+        cancelled: bool = False,
+    ) -> None:
+        self.in_flight -= 1
+        if used_tokens is not None:
+            self.tokens.adjust(estimated_tokens - used_tokens)
+        if cancelled:
+            # 被取消的调用不代表 provider 的状况，不参与 AIMD
+            pass
+        elif throttled:
+            self.throttled += 1
+            self.concurrency_limit = max(self.min_concurrency, self.concurrency_limit / 2)
+            logger.warning("LLM %s throttled, concurrency limit -> %.1f", self.model, self.concurrency_limit)
+        elif failed:
+            self.errors += 1
+        else:
+            self._latency.append(latency)
+            if latency > self.latency_target:
+                self.concurrency_limit = max(self.min_concurrency, self.concurrency_limit * 0.9)
+            else:
+                # 加性增：大约每放满一轮并发 +1
+                self.concurrency_limit = min(
+                    self.max_concurrency, self.concurrency_limit + 1 / max(self.concurrency_limit, 1)
+                )
+        self._pump()
+
+    def stats(self) -> Dict[str, Any]:
+        waiting: Dict[str, int] = {}
+        for priority, _, waiter, _ in self._queue:
+            if not waiter.done():
+                name = PRIORITY_NAMES.get(priority, str(priority))
+                waiting[name] = waiting.get(name, 0) + 1
+        wait_ms = sorted(self._wait_ms)
+        latency = sorted(self._latency)
+        return {
+            "in_flight": self.in_flight,
+            "concurrency_limit": round(self.concurrency_limit, 2),
+            "queue_depth": sum(waiting.values()),
+            "queue_by_priority": waiting,
+            "request_tokens_available": round(self.requests.tokens, 1),
+            "llm_tokens_available": round(self.tokens.tokens, 1),
+            "granted": self.granted,
+            "throttled": self.throttled,
+            "errors": self.errors,
+            "wait_ms_p99": round(wait_ms[int(len(wait_ms) * 0.99)], 2) if wait_ms else None,
+            "latency_p50_seconds": round(latency[len(latency) // 2], 3) if latency else None,
+        }
+
+
+def estimate_tokens(messages: List[List[BaseMessage]]) -> int:
+    """粗略预估：中英文混合按每 2 个字符 1 个 token，另加输出预留"""
+    chars = 0
+    for batch in messages:
+        for message in batch:
+            content = message.content
+            chars += len(content) if isinstance(content, str) else len(str(content))
+    return chars // 2 + DEFAULT_COMPLETION_TOKENS
+
+
+def is_rate_limit_error(error: BaseException) -> bool:
+    if getattr(error, "status_code", None) == 429:
+        return True
+    return type(error).__name__ == "RateLimitError" or "429" in str(error)
+
+
+def _load_limits(env_key: str) -> Dict[str, float]:
+    raw = os.getenv(env_key)
+    if not raw:
+        return {}
+    try:
+        return {model: float(value) for model, value in json.loads(raw).items()}
+    except (ValueError, AttributeError) as exc:
+        logger.warning("Invalid %s, ignoring: %s", env_key, exc)
+        return {}
+
+
+class LLMScheduler:
+    """按模型名管理 ModelLimiter"""
+
+    def __init__(self):
+        self._limiters: Dict[str, ModelLimiter] = {}
+        self._rpm = _load_limits("LLM_RPM_LIMITS")
+        self._tpm = _load_limits("LLM_TPM_LIMITS")
+
+    def limiter(self, model: str) -> ModelLimiter:
+        limiter = self._limiters.get(model)
+        if limiter is None:
+            limiter = ModelLimiter(
+                model,
+                rpm=self._rpm.get(model, float(os.getenv("LLM_DEFAULT_RPM", DEFAULT_RPM))),
+                tpm=self._tpm.get(model, float(os.getenv("LLM_DEFAULT_TPM", DEFAULT_TPM))),
+                max_concurrency=int(os.getenv("LLM_MAX_CONCURRENCY", DEFAULT_MAX_CONCURRENCY)),
+                min_concurrency=int(os.getenv("LLM_MIN_CONCURRENCY", DEFAULT_MIN_CONCURRENCY)),
+                latency_target=float(os.getenv("LLM_LATENCY_TARGET_SECONDS", DEFAULT_LATENCY_TARGET_SECONDS)),
+            )
+            self._limiters[model] = limiter
+        return limiter
+
+    def stats(self) -> Dict[str, Any]:
+        return {model: limiter.stats() for model, limiter in self._limiters.items()}
+
+
+class SchedulerCallback(AsyncCallbackHandler):
+    """挂在 ChatOpenAI 上的回调：开始前申请放行，结束 / 出错时归还"""
+
+    # 申请放行时被取消需要传出去，不能被回调管理器吞掉
+    raise_error = True
+    # 先于其他回调执行，其他回调看到的开始时间不含排队等待
+    run_inline = True
+
+    def __init__(self, scheduler: LLMScheduler, model: str, priority: int = PRIORITY_NORMAL):
+        self.scheduler = scheduler
+        self.model = model
+        self.priority = priority
+        self._runs = TaskBoundRuns(self._release_cancelled)
+
+    async def on_chat_model_start(
+        self,
+        serialized: Dict[str, Any],
+        messages: List[List[BaseMessage]],
+        *,
+        run_id: UUID,
+        metadata: Optional[Dict[str, Any]] = None,
+        **kwargs: Any,
+    ) -> None:
+        priority = (metadata or {}).get(PRIORITY_METADATA_KEY, self.priority)
+        estimated = estimate_tokens(messages)
+        await self.scheduler.limiter(self.model).acquire(priority, estimated)
+        self._runs.add(run_id, (time.monotonic(), estimated))
+
+    async def on_llm_end(self, response: LLMResult, *, run_id: UUID, **kwargs: Any) -> None:
+        run = self._runs.pop(run_id)
+        if run is None:
+            return
+        started, estimated = run
+        usage = (response.llm_output or {}).get("token_usage") or {}
+        self.scheduler.limiter(self.model).release(
+            time.monotonic() - started, estimated, used_tokens=usage.get("total_tokens")
+        )
+
+    async def on_llm_error(self, error: BaseException, *, run_id: UUID, **kwargs: Any) -> None:
+        run = self._runs.pop(run_id)
+        if run is None:
+            return
+        if isinstance(error, asyncio.CancelledError):
+            self._release_cancelled(run)
+            return
+        started, estimated = run
+        self.scheduler.limiter(self.model).release(
+            time.monotonic() - started,
+            estimated,
+            throttled=is_rate_limit_error(error),
+            failed=True,
+        )
+
+    def _release_cancelled(self, run: Tuple[float, int]) -> None:
+        started, estimated = run
+        self.scheduler.limiter(self.model).release(time.monotonic() - started, estimated, cancelled=True)
+
+
+_scheduler: Optional[LLMScheduler] = None
+
+
+def is_llm_scheduler_enabled() -> bool:
+    return os.getenv("LLM_SCHEDULER_ENABLED", "true").lower() == "true"
+
+
+def get_llm_scheduler() -> LLMScheduler:
+    global _scheduler
+    if _scheduler is None:
+        _scheduler = LLMScheduler()
+    return _scheduler
+
+
+def get_scheduler_callbacks(model: str, priority: int = PRIORITY_NORMAL) -> List[AsyncCallbackHandler]:
+    """给 LLM 工厂函数用；调度关闭时返回空列表"""
+    if not is_llm_scheduler_enabled():
+        return []
+    return [SchedulerCallback(get_llm_scheduler(), model, priority)]
+
+
+def get_llm_scheduler_stats() -> Optional[Dict[str, Any]]:
+    return _scheduler.stats() if _scheduler is not None else None
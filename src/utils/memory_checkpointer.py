@@ -0,0 +1,238 @@
+"""
+有界的内存 checkpointer
+
+`LANGGRAPH_CHECKPOINTER=memory` 原来每次构图都 new 一个 MemorySaver：跨请求拿不到状态（澄清后无法 resume），
+单个实例内部又会无限增长。这里提供进程级单例 BoundedMemorySaver，在 InMemorySaver 之上增加：
+
+- 每个 thread 只保留最近 keep_last 个 checkpoint，淘汰旧 checkpoint 时一并清理其 writes 和不再被引用的 blob
+- thread 数量上限 / 总字节数上限，超出时按 LRU 淘汰整个 thread
+- 空闲超过 TTL 的 thread 视为过期
+- 内存占用统计（按序列化后的字节数估算）
+
+适用于压测和无状态 API 副本；需要持久化和时间旅行完整历史时仍应使用 MySQL。
+"""
+import logging
+import os
+import threading
+import time
+from collections import OrderedDict, defaultdict
+from typing import Any, Dict, Optional, Sequence, Set, Tuple
+
+from langchain_core.runnables import RunnableConfig
+from langgraph.checkpoint.base import ChannelVersions, Checkpoint, CheckpointMetadata, CheckpointTuple
+from langgraph.checkpoint.memory import InMemorySaver
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_MAX_THREADS = 10000
+DEFAULT_MAX_MB = 512
+DEFAULT_TTL_SECONDS = 3600
+DEFAULT_KEEP_LAST = 10
+
+
+def _typed_size(typed: Any) -> int:
+    if not typed:
+        return 0
+    return len(typed[1] or b"")
+
+
+class BoundedMemorySaver(InMemorySaver):
+    """带容量限制、LRU/TTL 淘汰和历史裁剪的 InMemorySaver"""
+
+    def __init__(
+        self,
+        max_threads: int = DEFAULT_MAX_THREADS,
+        max_bytes: int = DEFAULT_MAX_MB * 1024 * 1024,
+        ttl_seconds: float = DEFAULT_TTL_SECONDS,
+        keep_last: int = DEFAULT_KEEP_LAST,
+        **kwargs,
+    ):
+        super().__init__(**kwargs)
+        self.max_threads = max_threads
+        self.max_bytes = max_bytes
+        self.ttl_seconds = ttl_seconds
+        self.keep_last = keep_last
+        self._lock = threading.RLock()
+        # thread_id -> 最近访问时间（monotonic），顺序即 LRU 顺序
+        self._last_access: "OrderedDict[str, float]" = OrderedDict()
+        self._thread_bytes: Dict[str, int] = defaultdict(int)
+        self._blob_keys: Dict[str, Set[tuple]] = defaultdict(set)
+        # (thread_id, ns, checkpoint_id) -> 该 checkpoint 引用的 (channel, version)
+        self._refs: Dict[Tuple[str, str, str], Set[tuple]] = {}
+        self.evictions = 0
+        self.expirations = 0
+        self.truncated_checkpoints = 0
+
+    # ---- 读 ----
+
+    def get_tuple(self, config: RunnableConfig) -> Optional[CheckpointTuple]:
+        with self._lock:
+            thread_id = config["configurable"]["thread_id"]
+            if not self._touch(thread_id, create=False):
+                return None
+            return super().get_tuple(config)
+
+    def list(self, config, *, filter=None, before=None, limit=None):
+        with self._lock:
+            if config is not None:
+                self._touch(config["configurable"]["thread_id"], create=False)
+            # 在锁内物化，避免迭代过程中被淘汰修改
+            items = list(super().list(config, filter=filter, before=before, limit=limit))
+        yield from items
+
+    # ---- 写 ----
+
+    def put(
+        self,
+        config: RunnableConfig,
+        checkpoint: Checkpoint,
+        metadata: CheckpointMetadata,
+        new_versions: ChannelVersions,
+    ) -> RunnableConfig:
+        thread_id = config["configurable"]["thread_id"]
+        checkpoint_ns = config["configurable"]["checkpoint_ns"]
+        with self._lock:
+            self._touch(thread_id)
+            blob_keys = [(thread_id, checkpoint_ns, channel, version) for channel, version in new_versions.items()]
+            delta = -sum(_typed_size(self.blobs.get(key)) for key in blob_keys)
+            previous = self.storage[thread_id][checkpoint_ns].get(checkpoint["id"])
+            if previous is not None:
+                delta -= _typed_size(previous[0]) + _typed_size(previous[1])
+
+            next_config = super().put(config, checkpoint, metadata, new_versions)
+
+            saved = self.storage[thread_id][checkpoint_ns][checkpoint["id"]]
+            delta += _typed_size(saved[0]) + _typed_size(saved[1])
+            delta += sum(_typed_size(self.blobs.get(key)) for key in blob_keys)
+            self._blob_keys[thread_id].update(blob_keys)
+            self._refs[(thread_id, checkpoint_ns, checkpoint["id"])] = set(checkpoint["channel_versions"].items())
+            self._thread_bytes[thread_id] += delta
+
+            self._truncate(thread_id, checkpoint_ns)
+            self._enforce_limits(keep=thread_id)
+            return next_config
+
+    def put_writes(
+        self,
+        config: RunnableConfig,
+        writes: Sequence[Tuple[str, Any]],
+        task_id: str,
+        task_path: str = "",
+    ) -> None:
+        configurable = config["configurable"]
+        thread_id = configurable["thread_id"]
+        outer_key = (thread_id, configurable.get("checkpoint_ns", ""), configurable["checkpoint_id"])
+        with self._lock:
+            self._touch(thread_id)
+            before = self._writes_size(outer_key)
+            super().put_writes(config, writes, task_id, task_path)
+            self._thread_bytes[thread_id] += self._writes_size(outer_key) - before
+            self._enforce_limits(keep=thread_id)
+
+    def delete_thread(self, thread_id: str) -> None:
+        with self._lock:
+            self._drop_thread(thread_id)
+
+    # ---- 内部 ----
+
+    def _writes_size(self, outer_key: tuple) -> int:
+        return sum(_typed_size(value[2]) for value in self.writes.get(outer_key, {}).values())
+
+    def _touch(self, thread_id: str, create: bool = True) -> bool:
+        """刷新访问时间；已过期的 thread 会被清掉并返回 False。只读访问（create=False）不登记新 thread"""
+        now = time.monotonic()
+        last = self._last_access.get(thread_id)
+        if last is not None and self.ttl_seconds > 0 and now - last > self.ttl_seconds:
+            self._drop_thread(thread_id)
+            self.expirations += 1
+            last = None
+        if last is None and not create:
+            return False
+        self._last_access[thread_id] = now
+        self._last_access.move_to_end(thread_id)
+        return last is not None
+
+    def _truncate(self, thread_id: str, checkpoint_ns: str) -> None:
+        if self.keep_last <= 0:
+            return
+        checkpoints = self.storage[thread_id][checkpoint_ns]
+        if len(checkpoints) <= self.keep_last:
+            return
+        # checkpoint_id 是 uuid6，字典序即时间序
+        stale_ids = sorted(checkpoints)[: len(checkpoints) - self.keep_last]
+        freed = 0
+        for checkpoint_id in stale_ids:
+            saved = checkpoints.pop(checkpoint_id)
+            freed += _typed_size(saved[0]) + _typed_size(saved[1])
+            outer_key = (thread_id, checkpoint_ns, checkpoint_id)
+            freed += self._writes_size(outer_key)
+            self.writes.pop(outer_key, None)
+            self._refs.pop(outer_key, None)
+
+        referenced = set()
+        for checkpoint_id in checkpoints:
+            referenced |= self._refs.get((thread_id, checkpoint_ns, checkpoint_id), set())
+        for key in [k for k in self._blob_keys[thread_id] if k[1] == checkpoint_ns and (k[2], k[3]) not in referenced]:
+            freed += _typed_size(self.blobs.pop(key, None))
+            self._blob_keys[thread_id].discard(key)
+
+        self._thread_bytes[thread_id] -= freed
+        self.truncated_checkpoints += len(stale_ids)
+
+    def _drop_thread(self, thread_id: str) -> None:
+        for checkpoint_ns, checkpoints in self.storage.pop(thread_id, {}).items():
+            for checkpoint_id in checkpoints:
+                self.writes.pop((thread_id, checkpoint_ns, checkpoint_id), None)
+                self._refs.pop((thread_id, checkpoint_ns, checkpoint_id), None)
+        for key in self._blob_keys.pop(thread_id, set()):
+            self.blobs.pop(key, None)
+        self._thread_bytes.pop(thread_id, None)
+        self._last_access.pop(thread_id, None)
+
+    def _enforce_limits(self, keep: str) -> None:
+        total = sum(self._thread_bytes.values())
+        while self._last_access and (
+            len(self._last_access) > self.max_threads or (self.max_bytes > 0 and total > self.max_bytes)
+        ):
+            oldest = next(iter(self._last_access))
+            if oldest == keep:
+                # 只剩当前正在写的 thread 时不淘汰它
+                break
+            total -= self._thread_bytes.get(oldest, 0)
+            self._drop_thread(oldest)
+            self.evictions += 1
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "threads": len(self._last_access),
+                "checkpoints": sum(len(c) for by_ns in self.storage.values() for c in by_ns.values()),
+                "bytes": sum(self._thread_bytes.values()),
+                "max_threads": self.max_threads,
+                "max_bytes": self.max_bytes,
+                "ttl_seconds": self.ttl_seconds,
+                "keep_last": self.keep_last,
+                "evictions": self.evictions,
+                "expirations": self.expirations,
+                "truncated_checkpoints": self.truncated_checkpoints,
+            }
+
+
+_memory_saver: Optional[BoundedMemorySaver] = None
+
+
+def get_memory_saver() -> BoundedMemorySaver:
+    """进程内共享的内存 checkpointer（图按请求编译，状态需要跨请求保留）。"""
+    global _memory_saver
+    if _memory_saver is None:
+        _memory_saver = BoundedMemorySaver(
+            max_threads=int(os.getenv("MEMORY_CHECKPOINTER_MAX_THREADS", DEFAULT_MAX_THREADS)),
+            max_bytes=int(float(os.getenv("MEMORY_CHECKPOINTER_MAX_MB", DEFAULT_MAX_MB)) * 1024 * 1024),
+            ttl_seconds=float(os.getenv("MEMORY_CHECKPOINTER_TTL_SECONDS", DEFAULT_TTL_SECONDS)),
+            keep_last=int(os.getenv("MEMORY_CHECKPOINTER_KEEP_LAST", DEFAULT_KEEP_LAST)),
+        )
+    return _memory_saver
+
+
+def get_memory_saver_stats() -> Optional[Dict[str, Any]]:
+    return _memory_saver.stats() if _memory_saver is not None else None
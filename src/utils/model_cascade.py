@@ -0,0 +1,84 @@
+"""
+模型梯队执行（快模型优先，未通过校验时升级）
+
+节点把「用某个模型调用一次并解析」写成 call(model)，把结果校验写成 validate(result)：
+- call 抛出 ValueError（JSON / OutputParser 解析失败）或 validate 返回失败原因时，换下一级模型重试
+- 截止时间到（DeadlineExceeded）和其他异常不升级，直接抛给节点处理
+- 所有梯队都未通过时返回最后一个解析成功的结果（节点自行兜底），都没解析成功则抛出最后的解析异常
+
+每次升级会发出 model_escalated 进度事件（流式客户端据此丢弃上一级已推送的 token），
+并按节点统计各模型承接的调用数和升级原因。
+"""
+import logging
+from collections import defaultdict
+from typing import Any, Awaitable, Callable, Dict, Optional, TypeVar
+
+from src.config.model_router import ModelRoute
+from src.utils.progress import emit_progress
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+REASON_PARSE_ERROR = "parse_error"
+_MISSING = object()
+
+# node -> 统计
+_stats: Dict[str, Dict[str, Any]] = defaultdict(
+    lambda: {"calls": 0, "served_by": defaultdict(int), "escalations": defaultdict(int), "exhausted": 0}
+)
+
+
+async def run_cascade(
+    route: ModelRoute,
+    call: Callable[[str], Awaitable[T]],
+    validate: Optional[Callable[[T], Optional[str]]] = None,
+) -> T:
+    stats = _stats[route.node]
+    stats["calls"] += 1
+    last_result: Any = _MISSING
+    last_error: Optional[Exception] = None
+
+    for tier, model in enumerate(route.tiers):
+        try:
+            result = await call(model)
+        except ValueError as exc:
+            reason = REASON_PARSE_ERROR
+            last_error = exc
+        else:
+            reason = validate(result) if validate else None
+            if reason is None:
+                stats["served_by"][model] += 1
+                return result
+            last_result = result
+
+        stats["escalations"][reason] += 1
+        if tier + 1 < len(route.tiers):
+            next_model = route.tiers[tier + 1]
+            logger.info("Escalating %s from %s to %s: %s", route.node, model, next_model, reason)
+            emit_progress(
+                "model_escalated",
+                f"🔁 {route.node} 结果未通过校验（{reason}），改用 {next_model}",
+                node=route.node,
+                from_model=model,
+                to_model=next_model,
+                reason=reason,
+            )
+
+    stats["exhausted"] += 1
+    logger.warning("All model tiers failed validation for %s", route.node)
+    if last_result is not _MISSING:
+        return last_result
+    raise last_error
+
+
+def get_cascade_stats() -> Dict[str, Any]:
+    result = {}
+    for node, stats in _stats.items():
+        result[node] = {
+            "calls": stats["calls"],
+            "served_by": dict(stats["served_by"]),
+            "escalations": dict(stats["escalations"]),
+            "exhausted": stats["exhausted"],
+        }
+    return result
@@ -1,115 +1,641 @@
 import asyncio
 import json
 import logging
-from typing import Any, AsyncIterator, Dict, Iterable, List, Optional, Sequence, Tuple, Union
+import os
+import re
+import threading
+import unicodedata
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple
 
-from langgraph.store.base import BaseStore, GetOp, IndexConfig, Item, Op, PutOp, SearchOp
+from langgraph.store.base import (
+    BaseStore,
+    GetOp,
+    IndexConfig,
+    Item,
+    ListNamespacesOp,
+    Op,
+    PutOp,
+    SearchItem,
+    SearchOp,
+)
 from pymysql.connections import Connection
 
-from src.config.mysql import get_connection
+from src.config.mysql import get_aio_pool, get_connection
 
 logger = logging.getLogger(__name__)
 
-class MySQLStore(BaseStore):
+NAMESPACE_SEPARATOR = "/"
+# 单条批量语句最多携带的行数，避免超出 max_allowed_packet
+MAX_ROWS_PER_STATEMENT = 500
+
+# 主键 (namespace, key) 已覆盖按 namespace 的前缀查询，不再单独建 idx_namespace
+CREATE_TABLE_SQL = """
+CREATE TABLE IF NOT EXISTS store_items (
+    namespace VARCHAR(255) NOT NULL,
+    `key` VARCHAR(255) NOT NULL,
+    value JSON,
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP,
+    PRIMARY KEY (namespace, `key`)
+) CHARACTER SET utf8mb4 COLLATE utf8mb4_unicode_ci;
+"""
+SELECT_COLUMNS_SQL = (
+    "SELECT COLUMN_NAME AS name FROM information_schema.COLUMNS "
+    "WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = 'store_items'"
+)
+SELECT_INDEXES_SQL = (
+    "SELECT DISTINCT INDEX_NAME AS name FROM information_schema.STATISTICS "
+    "WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = 'store_items'"
+)
+
+SELECT_COLUMNS = "namespace, `key`, value, created_at, updated_at"
+
+# 可建生成列的字段类型 -> (列类型, 生成表达式模板)
+INDEXED_FIELD_TYPES = {
+    "string": ("VARCHAR(191)", "JSON_UNQUOTE(JSON_EXTRACT(value, '{path}'))"),
+    "int": ("BIGINT", "CAST(JSON_UNQUOTE(JSON_EXTRACT(value, '{path}')) AS SIGNED)"),
+    "float": ("DOUBLE", "CAST(JSON_UNQUOTE(JSON_EXTRACT(value, '{path}')) AS DOUBLE)"),
+}
+FILTER_OPERATORS = {"$eq": "=", "$ne": "<>", "$gt": ">", "$gte": ">=", "$lt": "<", "$lte": "<="}
+
+
+def _namespace_to_str(namespace: tuple) -> str:
+    return NAMESPACE_SEPARATOR.join(namespace)
+
+
+def _str_to_namespace(namespace: str) -> tuple:
+    return tuple(namespace.split(NAMESPACE_SEPARATOR))
+
+
+def _escape_like(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+
+
+def _chunks(items: Sequence, size: int = MAX_ROWS_PER_STATEMENT) -> Iterable[Sequence]:
+    for i in range(0, len(items), size):
+        yield items[i:i + size]
+
+
+def _json_path(field: str) -> str:
+    """`a.b` -> `$."a"."b"`"""
+    return "$." + ".".join('"' + part.replace('"', '\\"') + '"' for part in field.split("."))
+
+
+def _load_value(value: Any) -> Any:
+    return json.loads(value) if isinstance(value, (str, bytes)) else value
+
+
+def _row_to_item(row: Dict[str, Any]) -> Item:
+    return Item(
+        value=_load_value(row["value"]),
+        key=row["key"],
+        namespace=_str_to_namespace(row["namespace"]),
+        created_at=row["created_at"],
+        updated_at=row["updated_at"],
+    )
+
+
+def _row_to_search_item(row: Dict[str, Any], score: Optional[float] = None) -> SearchItem:
+    return SearchItem(
+        namespace=_str_to_namespace(row["namespace"]),
+        key=row["key"],
+        value=_load_value(row["value"]),
+        created_at=row["created_at"],
+        updated_at=row["updated_at"],
+        score=score,
+    )
+
+
+def _group_ops(ops: Iterable[Op]) -> Tuple[Dict[type, List[Tuple[int, Op]]], int]:
+    """按操作类型分组，保留原始下标以便按调用顺序回填结果。"""
+    grouped: Dict[type, List[Tuple[int, Op]]] = {}
+    total = 0
+    for idx, op in enumerate(ops):
+        grouped.setdefault(type(op), []).append((idx, op))
+        total += 1
+    return grouped, total
+
+
+def _key_in_clause(keys: Sequence[Tuple[str, str]]) -> Tuple[str, list]:
+    placeholders = ", ".join(["(%s, %s)"] * len(keys))
+    return f"(namespace, `key`) IN ({placeholders})", [value for pair in keys for value in pair]
+
+
+def _collation_key(namespace: str, key: str) -> Tuple[str, str]:
+    """
+    近似 utf8mb4_unicode_ci 的比较规则：忽略大小写、重音和尾部空格。
+
+    `(namespace, key) IN (...)` 按表的排序规则匹配，回填结果时也要按同样的规则对应，
+    否则 get("foo") 查到了 "Foo" 这一行却对不上。
+    """
+    def fold(value: str) -> str:
+        decomposed = unicodedata.normalize("NFKD", value.casefold())
+        return "".join(ch for ch in decomposed if not unicodedata.combining(ch)).rstrip(" ")
+
+    return fold(namespace), fold(key)
+
+
+def _build_get_queries(get_ops: Sequence[Tuple[int, GetOp]]) -> List[Tuple[str, list]]:
+    """把所有 GetOp 合并成 `(namespace, key) IN (...)` 查询（按主键去重）。"""
+    keys = list(dict.fromkeys((_namespace_to_str(op.namespace), op.key) for _, op in get_ops))
+    queries = []
+    for chunk in _chunks(keys):
+        clause, params = _key_in_clause(chunk)
+        queries.append((f"SELECT {SELECT_COLUMNS} FROM store_items WHERE {clause}", params))
+    return queries
+
+
+def _latest_puts(put_ops: Sequence[Tuple[int, PutOp]]) -> Dict[Tuple[str, str], PutOp]:
+    """同一主键以批次内最后一次写入为准。"""
+    latest: Dict[Tuple[str, str], PutOp] = {}
+    for _, op in put_ops:
+        latest[(_namespace_to_str(op.namespace), op.key)] = op
+    return latest
+
+
+def _build_put_queries(put_ops: Sequence[Tuple[int, PutOp]]) -> List[Tuple[str, list]]:
+    """
+    合并 PutOp：value=None 的写入合并为一条 DELETE，
+    其余合并为多行 INSERT ... ON DUPLICATE KEY UPDATE。
+    """
+    latest = _latest_puts(put_ops)
+    deletes = [pk for pk, op in latest.items() if op.value is None]
+    upserts = [
+        (ns, key, json.dumps(op.value, ensure_ascii=False))
+        for (ns, key), op in latest.items() if op.value is not None
+    ]
+
+    queries = []
+    for chunk in _chunks(deletes):
+        clause, params = _key_in_clause(chunk)
+        queries.append((f"DELETE FROM store_items WHERE {clause}", params))
+    for chunk in _chunks(upserts):
+        placeholders = ", ".join(["(%s, %s, %s)"] * len(chunk))
+        queries.append((
+            f"INSERT INTO store_items (namespace, `key`, value) VALUES {placeholders} "
+            "ON DUPLICATE KEY UPDATE value = VALUES(value)",
+            [value for row in chunk for value in row],
+        ))
+    return queries
+
+
+def _build_list_namespaces_query(op: ListNamespacesOp) -> Tuple[str, list]:
+    """前缀条件（不含通配符）下推为主键范围查询，其余条件在 Python 中过滤。"""
+    for condition in op.match_conditions or ():
+        if condition.match_type == "prefix" and "*" not in condition.path:
+            clause, params = _prefix_clause(_namespace_to_str(condition.path))
+            return f"SELECT DISTINCT namespace FROM store_items WHERE {clause}", params
+    return "SELECT DISTINCT namespace FROM store_items", []
+
+
+def _prefix_clause(prefix: str) -> Tuple[str, list]:
+    # 按 namespace 段匹配（("user",) 不会匹配到 "user1/..."），两个分支都是主键上的范围扫描
+    return "(namespace = %s OR namespace LIKE %s)", [prefix, f"{_escape_like(prefix)}{NAMESPACE_SEPARATOR}%"]
+
+
+def _path_matches(namespace: tuple, path: tuple) -> bool:
+    if len(namespace) < len(path):
+        return False
+    return all(expected == "*" or expected == actual for expected, actual in zip(path, namespace))
+
+
+def _filter_namespaces(rows: Iterable[Dict[str, Any]], op: ListNamespacesOp) -> List[tuple]:
+    namespaces = set()
+    for row in rows:
+        namespace = _str_to_namespace(row["namespace"])
+        matched = True
+        for condition in op.match_conditions or ():
+            path = tuple(condition.path)
+            if condition.match_type == "prefix":
+                matched = _path_matches(namespace, path)
+            else:
+                matched = _path_matches(namespace[::-1], path[::-1])
+            if not matched:
+                break
+        if not matched:
+            continue
+        if op.max_depth is not None:
+            namespace = namespace[:op.max_depth]
+        namespaces.add(namespace)
+    return sorted(namespaces)[op.offset:op.offset + op.limit]
+
+
+def _fill_get_results(
+    get_ops: Sequence[Tuple[int, GetOp]],
+    rows: Iterable[Dict[str, Any]],
+    results: List[Any],
+) -> None:
+    by_key = {_collation_key(row["namespace"], row["key"]): row for row in rows}
+    for idx, op in get_ops:
+        row = by_key.get(_collation_key(_namespace_to_str(op.namespace), op.key))
+        results[idx] = _row_to_item(row) if row else None
+
+
+def parse_indexed_fields(spec: Optional[str]) -> Dict[str, str]:
+    """解析 `STORE_INDEXED_FIELDS`，格式 `status:string,priority:int`（类型缺省为 string）。"""
+    fields = {}
+    for part in (spec or "").split(","):
+        part = part.strip()
+        if not part:
+            continue
+        name, _, field_type = part.partition(":")
+        fields[name.strip()] = (field_type.strip() or "string").lower()
+    return fields
+
+
+class _BaseMySQLStore(BaseStore):
+    """
+    同步 / 异步 Store 共用的 SQL 构造
+
+    - filter 下推：`indexed_fields` 中的字段走生成列 + 二级索引 `(列, namespace)`，
+      其余字段用 JSON_EXTRACT 谓词在 MySQL 内过滤，不再把整个 namespace 拉回 Python
+    - 分页：按主键 (namespace, key) 排序，支持 offset 与 keyset（`search_page`）两种方式
+    - 语义检索：传入 `IndexConfig` 时，带 query 的 SearchOp 先查 Qdrant 旁路索引，再回表取行
+    """
+
+    def _configure(self, indexed_fields: Optional[Dict[str, str]], index: Optional[IndexConfig]) -> None:
+        if indexed_fields is None:
+            indexed_fields = parse_indexed_fields(os.getenv("STORE_INDEXED_FIELDS"))
+        for field, field_type in indexed_fields.items():
+            if field_type not in INDEXED_FIELD_TYPES:
+                raise ValueError(
+                    f"Unsupported indexed field type {field_type!r} for {field!r}; "
+                    f"expected one of {', '.join(INDEXED_FIELD_TYPES)}"
+                )
+        self.indexed_fields = indexed_fields
+        self.index_config = index
+        self.vector_index = None
+        if index is not None:
+            from src.utils.store_vector_index import QdrantStoreIndex
+
+            self.vector_index = QdrantStoreIndex(index)
+
+    @staticmethod
+    def _column_name(field: str) -> str:
+        return "f_" + re.sub(r"\W", "_", field)
+
+    def _migration_statements(self, columns: Iterable[str], indexes: Iterable[str]) -> List[str]:
+        """根据现有表结构生成需要补齐的 DDL（生成列、二级索引、去掉冗余索引）。"""
+        columns, indexes = set(columns), set(indexes)
+        statements = []
+        if "idx_namespace" in indexes:
+            statements.append("ALTER TABLE store_items DROP INDEX idx_namespace")
+        for field, field_type in self.indexed_fields.items():
+            column = self._column_name(field)
+            column_type, expression = INDEXED_FIELD_TYPES[field_type]
+            if column not in columns:
+                statements.append(
+                    f"ALTER TABLE store_items ADD COLUMN `{column}` {column_type} "
+                    f"GENERATED ALWAYS AS ({expression.format(path=_json_path(field))}) VIRTUAL"
+                )
+            if f"idx_{column}" not in indexes:
+                statements.append(f"ALTER TABLE store_items ADD INDEX `idx_{column}` (`{column}`, namespace)")
+        return statements
+
+    def _filter_clause(self, filter: Optional[Dict[str, Any]]) -> Tuple[List[str], list]:
+        """
+        把 filter 转成 SQL 谓词
+
+        支持 `{"field": value}`（等值）和 `{"field": {"$gte": 3, "$lt": 10}}`，
+        字段可以用 `a.b` 访问嵌套 JSON。
+        """
+        clauses, params = [], []
+        for field, condition in (filter or {}).items():
+            if isinstance(condition, dict) and condition and all(k.startswith("$") for k in condition):
+                items = condition.items()
+            else:
+                items = [("$eq", condition)]
+            for operator, expected in items:
+                sql_operator = FILTER_OPERATORS.get(operator)
+                if sql_operator is None:
+                    raise ValueError(f"Unsupported filter operator {operator!r} for {field!r}")
+                clause, clause_params = self._filter_predicate(field, sql_operator, expected)
+                clauses.append(clause)
+                params.extend(clause_params)
+        return clauses, params
+
+    def _filter_predicate(self, field: str, sql_operator: str, expected: Any) -> Tuple[str, list]:
+        field_type = self.indexed_fields.get(field)
+        if self._matches_column_type(field_type, expected):
+            column = f"`{self._column_name(field)}`"
+            if sql_operator == "<>":
+                return f"({column} IS NULL OR {column} <> %s)", [expected]
+            return f"{column} {sql_operator} %s", [expected]
+
+        path = _json_path(field)
+        expected_json = json.dumps(expected, ensure_ascii=False)
+        if sql_operator == "<>":
+            return (
+                "(JSON_EXTRACT(value, %s) IS NULL OR JSON_EXTRACT(value, %s) <> CAST(%s AS JSON))",
+                [path, path, expected_json],
+            )
+        return f"JSON_EXTRACT(value, %s) {sql_operator} CAST(%s AS JSON)", [path, expected_json]
+
+    @staticmethod
+    def _matches_column_type(field_type: Optional[str], expected: Any) -> bool:
+        if field_type is None or isinstance(expected, bool):
+            return False
+        if field_type == "string":
+            return isinstance(expected, str)
+        return isinstance(expected, (int, float))
+
+    def _build_search_query(
+        self,
+        namespace_prefix: tuple,
+        filter: Optional[Dict[str, Any]],
+        limit: int,
+        offset: int = 0,
+        after: Optional[Tuple[str, str]] = None,
+    ) -> Tuple[str, list]:
+        clauses, params = self._filter_clause(filter)
+        if namespace_prefix:
+            prefix_clause, prefix_params = _prefix_clause(_namespace_to_str(namespace_prefix))
+            clauses.insert(0, prefix_clause)
+            params[:0] = prefix_params
+        if after is not None:
+            clauses.append("(namespace > %s OR (namespace = %s AND `key` > %s))")
+            params.extend([after[0], after[0], after[1]])
+
+        where = f"WHERE {' AND '.join(clauses)} " if clauses else ""
+        query = f"SELECT {SELECT_COLUMNS} FROM store_items {where}ORDER BY namespace, `key` LIMIT %s"
+        params.append(limit)
+        if offset:
+            query += " OFFSET %s"
+            params.append(offset)
+        return query, params
+
+    def _build_candidate_query(
+        self,
+        candidates: Sequence[Tuple[str, str, float]],
+        filter: Optional[Dict[str, Any]],
+    ) -> Tuple[str, list]:
+        """语义检索命中的候选按主键回表，同时应用 filter。"""
+        clause, params = _key_in_clause([(namespace, key) for namespace, key, _ in candidates])
+        filter_clauses, filter_params = self._filter_clause(filter)
+        where = " AND ".join([clause] + filter_clauses)
+        return f"SELECT {SELECT_COLUMNS} FROM store_items WHERE {where}", params + filter_params
+
+    @staticmethod
+    def _rank_candidates(
+        candidates: Sequence[Tuple[str, str, float]],
+        rows: Iterable[Dict[str, Any]],
+        op: SearchOp,
+    ) -> List[SearchItem]:
+        by_key = {_collation_key(row["namespace"], row["key"]): row for row in rows}
+        ranked = [
+            _row_to_search_item(by_key[_collation_key(namespace, key)], score)
+            for namespace, key, score in candidates if _collation_key(namespace, key) in by_key
+        ]
+        return ranked[op.offset:op.offset + op.limit]
+
+    def _vector_changes(self, put_ops: Sequence[Tuple[int, PutOp]]):
+        """拆分出需要写入 / 移除向量的条目。"""
+        upserts, deletes = [], []
+        for (namespace, key), op in _latest_puts(put_ops).items():
+            if op.value is None or op.index is False:
+                deletes.append((namespace, key))
+            else:
+                fields = op.index if isinstance(op.index, list) else None
+                upserts.append((namespace, key, op.value, fields))
+        return upserts, deletes
+
+    @staticmethod
+    def _next_cursor(items: Sequence[SearchItem], limit: int) -> Optional[Tuple[str, str]]:
+        if len(items) < limit:
+            return None
+        last = items[-1]
+        return _namespace_to_str(last.namespace), last.key
+
+
+class MySQLStore(_BaseMySQLStore):
     """
     A LangGraph Store implementation using MySQL.
+
+    同一批次内的读操作（Get / Search / ListNamespaces）先执行，写操作（Put）最后合并提交，
+    与 LangGraph 官方 Store 的批处理语义一致。
     """
 
-    def __init__(self, conn: Optional[Connection] = None):
+    def __init__(
+        self,
+        conn: Optional[Connection] = None,
+        indexed_fields: Optional[Dict[str, str]] = None,
+        index: Optional[IndexConfig] = None,
+    ):
         """
         Initialize the MySQLStore.
-        
+
         Args:
             conn: A pymysql connection object. If None, a new connection will be created using config.
+            indexed_fields: 需要建生成列 + 索引的 JSON 字段 {path: "string" | "int" | "float"}，
+                默认读取环境变量 STORE_INDEXED_FIELDS
+            index: 语义检索配置，启用后向量写入 Qdrant 旁路索引
         """
         self.conn = conn or get_connection()
+        # pymysql 连接不是线程安全的，abatch 在线程池里执行时可能与其他批次重叠
+        self._lock = threading.Lock()
+        self._configure(indexed_fields, index)
         self.setup()
 
     def setup(self):
         """
         Create the necessary table if it doesn't exist.
         """
-        with self.conn.cursor() as cursor:
-            # Create table for store items
-            create_table_query = """
-            CREATE TABLE IF NOT EXISTS store_items (
-                namespace VARCHAR(255) NOT NULL,
-                `key` VARCHAR(255) NOT NULL,
-                value JSON,
-                created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-                updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP ON UPDATE CURRENT_TIMESTAMP,
-                PRIMARY KEY (namespace, `key`),
-                INDEX idx_namespace (namespace)
-            ) CHARACTER SET utf8mb4 COLLATE utf8mb4_unicode_ci;
-            """
-            cursor.execute(create_table_query) 
-
-    def _get_namespace_str(self, namespace: tuple) -> str:
-        return "/".join(namespace)
+        with self._lock, self.conn.cursor() as cursor:
+            cursor.execute(CREATE_TABLE_SQL)
+            cursor.execute(SELECT_COLUMNS_SQL)
+            columns = [row["name"] for row in cursor.fetchall()]
+            cursor.execute(SELECT_INDEXES_SQL)
+            indexes = [row["name"] for row in cursor.fetchall()]
+            for statement in self._migration_statements(columns, indexes):
+                logger.info("Migrating store_items: %s", statement)
+                cursor.execute(statement)
+        if self.vector_index is not None:
+            self.vector_index.setup()
 
     def batch(self, ops: Iterable[Op]) -> List[Any]:
-        results = []
-        with self.conn.cursor() as cursor:
-            for op in ops:
-                if isinstance(op, GetOp):
-                    namespace_str = self._get_namespace_str(op.namespace)
-                    cursor.execute(
-                        "SELECT * FROM store_items WHERE namespace = %s AND `key` = %s",
-                        (namespace_str, op.key)
+        grouped, total = _group_ops(ops)
+        results: List[Any] = [None] * total
+
+        with self._lock, self.conn.cursor() as cursor:
+            if GetOp in grouped:
+                rows = []
+                for query, params in _build_get_queries(grouped[GetOp]):
+                    cursor.execute(query, params)
+                    rows.extend(cursor.fetchall())
+                _fill_get_results(grouped[GetOp], rows, results)
+
+            for idx, op in grouped.get(SearchOp, []):
+                if op.query and self.vector_index is not None:
+                    candidates = self.vector_index.search(
+                        op.query, _namespace_to_str(op.namespace_prefix), op.offset + op.limit
                     )
-                    row = cursor.fetchone()
-                    if row:
-                        results.append(Item(
-                            value=json.loads(row['value']) if isinstance(row['value'], str) else row['value'],
-                            key=row['key'],
-                            namespace=op.namespace,
-                            created_at=row['created_at'],
-                            updated_at=row['updated_at']
-                        ))
-                    else:
-                        results.append(None)
-                        
-                elif isinstance(op, PutOp):
-                    namespace_str = self._get_namespace_str(op.namespace)
-                    value_json = json.dumps(op.value)
-                    
-                    query = """
-                    INSERT INTO store_items (namespace, `key`, value)
-                    VALUES (%s, %s, %s)
-                    ON DUPLICATE KEY UPDATE value = %s
-                    """
-                    cursor.execute(query, (namespace_str, op.key, value_json, value_json))
-                    results.append(None)
-                    
-                elif isinstance(op, SearchOp):
-                    namespace_str = self._get_namespace_str(op.namespace_prefix)
-                    if not op.namespace_prefix:
-                        query = "SELECT * FROM store_items LIMIT %s"
-                        params = (op.limit or 10,)
-                    else:
-                        query = "SELECT * FROM store_items WHERE namespace LIKE %s LIMIT %s"
-                        params = (f"{namespace_str}%", op.limit or 10)
-                        
+                    rows = []
+                    if candidates:
+                        cursor.execute(*self._build_candidate_query(candidates, op.filter))
+                        rows = cursor.fetchall()
+                    results[idx] = self._rank_candidates(candidates, rows, op)
+                    continue
+                cursor.execute(*self._build_search_query(op.namespace_prefix, op.filter, op.limit, op.offset))
+                results[idx] = [_row_to_search_item(row) for row in cursor.fetchall()]
+
+            for idx, op in grouped.get(ListNamespacesOp, []):
+                cursor.execute(*_build_list_namespaces_query(op))
+                results[idx] = _filter_namespaces(cursor.fetchall(), op)
+
+            if PutOp in grouped:
+                for query, params in _build_put_queries(grouped[PutOp]):
                     cursor.execute(query, params)
-                    rows = cursor.fetchall()
-                    items = []
-                    for row in rows:
-                        ns_tuple = tuple(row['namespace'].split('/'))
-                        items.append(Item(
-                            value=json.loads(row['value']) if isinstance(row['value'], str) else row['value'],
-                            key=row['key'],
-                            namespace=ns_tuple,
-                            created_at=row['created_at'],
-                            updated_at=row['updated_at']
-                        ))
-                    results.append(items)
-                
+
+        if PutOp in grouped and self.vector_index is not None:
+            self.vector_index.sync(*self._vector_changes(grouped[PutOp]))
         return results
 
     async def abatch(self, ops: Iterable[Op]) -> List[Any]:
         """
         Async batch operation using thread executor to avoid blocking the event loop.
         """
-        ops_list = list(ops)
-        loop = asyncio.get_event_loop()
-        return await loop.run_in_executor(None, self.batch, ops_list)
+        return await asyncio.to_thread(self.batch, list(ops))
+
+    def search_page(
+        self,
+        namespace_prefix: tuple,
+        *,
+        filter: Optional[Dict[str, Any]] = None,
+        limit: int = 10,
+        after: Optional[Tuple[str, str]] = None,
+    ) -> Tuple[List[SearchItem], Optional[Tuple[str, str]]]:
+        """
+        Keyset 分页：传入上一页返回的游标继续翻页，深翻页不会退化为 OFFSET 扫描
+
+        Returns:
+            (items, next_cursor)，没有下一页时 next_cursor 为 None
+        """
+        with self._lock, self.conn.cursor() as cursor:
+            cursor.execute(*self._build_search_query(namespace_prefix, filter, limit, after=after))
+            items = [_row_to_search_item(row) for row in cursor.fetchall()]
+        return items, self._next_cursor(items, limit)
+
+
+class AsyncMySQLStore(_BaseMySQLStore):
+    """
+    基于 aiomysql 连接池的原生异步 Store
+
+    每个批次从连接池借一条连接，并发批次互不干扰；
+    GetOp 合并为一次 IN 查询，PutOp 合并为多行 upsert / delete。
+
+    Usage:
+        store = await AsyncMySQLStore.from_pool()
+        await store.aput(("user", "123"), "profile", {"name": "..."})
+    """
+
+    def __init__(
+        self,
+        pool,
+        indexed_fields: Optional[Dict[str, str]] = None,
+        index: Optional[IndexConfig] = None,
+    ):
+        self.pool = pool
+        self._configure(indexed_fields, index)
+        try:
+            self.loop = asyncio.get_running_loop()
+        except RuntimeError:
+            self.loop = None
+
+    @classmethod
+    async def from_pool(
+        cls,
+        pool=None,
+        indexed_fields: Optional[Dict[str, str]] = None,
+        index: Optional[IndexConfig] = None,
+    ) -> "AsyncMySQLStore":
+        """使用共享连接池（默认 `get_aio_pool()`）创建 Store 并建表。"""
+        store = cls(pool or await get_aio_pool(), indexed_fields=indexed_fields, index=index)
+        await store.setup()
+        return store
+
+    async def setup(self):
+        async with self.pool.acquire() as conn:
+            async with conn.cursor() as cursor:
+                await cursor.execute(CREATE_TABLE_SQL)
+                await cursor.execute(SELECT_COLUMNS_SQL)
+                columns = [row["name"] for row in await cursor.fetchall()]
+                await cursor.execute(SELECT_INDEXES_SQL)
+                indexes = [row["name"] for row in await cursor.fetchall()]
+                for statement in self._migration_statements(columns, indexes):
+                    logger.info("Migrating store_items: %s", statement)
+                    await cursor.execute(statement)
+        if self.vector_index is not None:
+            await asyncio.to_thread(self.vector_index.setup)
+
+    async def abatch(self, ops: Iterable[Op]) -> List[Any]:
+        grouped, total = _group_ops(ops)
+        results: List[Any] = [None] * total
+
+        async with self.pool.acquire() as conn:
+            async with conn.cursor() as cursor:
+                if GetOp in grouped:
+                    rows = []
+                    for query, params in _build_get_queries(grouped[GetOp]):
+                        await cursor.execute(query, params)
+                        rows.extend(await cursor.fetchall())
+                    _fill_get_results(grouped[GetOp], rows, results)
+
+                for idx, op in grouped.get(SearchOp, []):
+                    if op.query and self.vector_index is not None:
+                        candidates = await asyncio.to_thread(
+                            self.vector_index.search,
+                            op.query,
+                            _namespace_to_str(op.namespace_prefix),
+                            op.offset + op.limit,
+                        )
+                        rows = []
+                        if candidates:
+                            await cursor.execute(*self._build_candidate_query(candidates, op.filter))
+                            rows = await cursor.fetchall()
+                        results[idx] = self._rank_candidates(candidates, rows, op)
+                        continue
+                    await cursor.execute(
+                        *self._build_search_query(op.namespace_prefix, op.filter, op.limit, op.offset)
+                    )
+                    results[idx] = [_row_to_search_item(row) for row in await cursor.fetchall()]
+
+                for idx, op in grouped.get(ListNamespacesOp, []):
+                    await cursor.execute(*_build_list_namespaces_query(op))
+                    results[idx] = _filter_namespaces(await cursor.fetchall(), op)
+
+                if PutOp in grouped:
+                    for query, params in _build_put_queries(grouped[PutOp]):
+                        await cursor.execute(query, params)
+
+        if PutOp in grouped and self.vector_index is not None:
+            await asyncio.to_thread(self.vector_index.sync, *self._vector_changes(grouped[PutOp]))
+        return results
+
+    def batch(self, ops: Iterable[Op]) -> List[Any]:
+        """同步入口：把批次提交到创建 Store 的事件循环上执行（不能在该循环内部调用）。"""
+        if self.loop is None:
+            raise RuntimeError("AsyncMySQLStore must be created inside a running event loop")
+        try:
+            if asyncio.get_running_loop() is self.loop:
+                raise asyncio.InvalidStateError(
+                    "Synchronous calls to AsyncMySQLStore are not allowed from the event loop thread; "
+                    "use the async methods (aget / aput / asearch) instead"
+                )
+        except RuntimeError:
+            pass
+        return asyncio.run_coroutine_threadsafe(self.abatch(ops), self.loop).result()
+
+    async def asearch_page(
+        self,
+        namespace_prefix: tuple,
+        *,
+        filter: Optional[Dict[str, Any]] = None,
+        limit: int = 10,
+        after: Optional[Tuple[str, str]] = None,
+    ) -> Tuple[List[SearchItem], Optional[Tuple[str, str]]]:
+        """Keyset 分页，语义同 `MySQLStore.search_page`。"""
+        async with self.pool.acquire() as conn:
+            async with conn.cursor() as cursor:
+                await cursor.execute(*self._build_search_query(namespace_prefix, filter, limit, after=after))
+                items = [_row_to_search_item(row) for row in await cursor.fetchall()]
+        return items, self._next_cursor(items, limit)
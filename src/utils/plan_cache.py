@@ -0,0 +1,198 @@
+"""
+非 SOP 问题的计划缓存
+
+没有匹配 SOP 的问题每次都要调用 planning 模型，但其中很多是重复出现的句式，
+例如「查询用户X在Y时间的访问记录」。这里把改写后的问题归一成模板：
+
+- 时间（日期、时刻、今天 / 昨天 / 最近3天等）替换为 <TIME>
+- ID（含数字、长度 >= 4 的字母数字串，如商户ID、trace-id、UUID）替换为 <ID>
+- 其余数字替换为 <NUM>
+
+以 (intent, 模板) 为键缓存计划。计划中出现的槽位值（原问题里的 ID / 时间 / 数字）替换为占位符，
+命中时按新问题的槽位值重新填回。
+
+- 只缓存执行结果为 SUCCESS、且执行过程中没有被 replan 改写过的计划
+- 计划里还残留无法对应到原问题槽位的时间或 ID 时不缓存，避免新问题带着旧的 ID 去排查
+- 命中的计划执行失败（或被 replan 改写）时删除该条缓存，下次重新规划
+- 按模板统计查找命中率和计划执行成功率
+
+缓存是进程级有界 LRU + TTL，多 worker 部署时各自积累。
+"""
+import logging
+import os
+import re
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_MAX_ENTRIES = 500
+DEFAULT_TTL_SECONDS = 86400
+DEFAULT_MIN_SUCCESSES = 1
+
+_TIME_PATTERN = (
+    r"\d{4}[-/.年]\d{1,2}[-/.月]\d{1,2}[日号]?(?:[ T]\d{1,2}:\d{2}(?::\d{2})?)?"
+    r"|\d{1,2}月\d{1,2}[日号]"
+    r"|\d{1,2}:\d{2}(?::\d{2})?"
+    r"|(?:最近|过去|近)\d+(?:个)?(?:分钟|小时|天|周|月)"
+    r"|\d+(?:个)?(?:分钟|小时|天|周)前"
+    r"|今天|昨天|前天|明天|上周|本周|这周|上个月|本月"
+)
+_ID_PATTERN = r"(?<![A-Za-z0-9])(?=[A-Za-z0-9_-]*\d)[A-Za-z0-9][A-Za-z0-9_-]{3,}(?![A-Za-z0-9])"
+_NUM_PATTERN = r"\d+(?:\.\d+)?"
+
+_SLOT_RE = re.compile(f"(?P<TIME>{_TIME_PATTERN})|(?P<ID>{_ID_PATTERN})|(?P<NUM>{_NUM_PATTERN})")
+_PLACEHOLDER_RE = re.compile(r"\{\{slot_(\d+)\}\}")
+
+
+def to_template(query: str) -> Tuple[str, List[str]]:
+    """返回 (模板, 按出现顺序的槽位值)"""
+    slots: List[str] = []
+
+    def mask(match: re.Match) -> str:
+        slots.append(match.group())
+        return f"<{match.lastgroup}>"
+
+    template = _SLOT_RE.sub(mask, " ".join(query.split()))
+    return template, slots
+
+
+def _value_pattern(value: str) -> re.Pattern:
+    # 只在字母数字边界上替换，避免 "10" 命中 "1002" 的一部分
+    return re.compile(r"(?<![A-Za-z0-9])" + re.escape(value) + r"(?![A-Za-z0-9])")
+
+
+def parameterize(steps: List[str], slots: List[str]) -> Optional[List[str]]:
+    """把计划中的槽位值换成占位符；仍残留时间 / ID 时返回 None（不可缓存）"""
+    # 长的值先替换；重复的值统一映射到第一次出现的位置
+    indexed = sorted({value: index for index, value in reversed(list(enumerate(slots)))}.items(),
+                     key=lambda item: -len(item[0]))
+    result = []
+    for step in steps:
+        for value, index in indexed:
+            step = _value_pattern(value).sub(f"{{{{slot_{index}}}}}", step)
+        residual = _SLOT_RE.search(_PLACEHOLDER_RE.sub("", step))
+        if residual and residual.lastgroup in ("TIME", "ID"):
+            return None
+        result.append(step)
+    return result
+
+
+def bind_slots(steps: List[str], slots: List[str]) -> List[str]:
+    return [_PLACEHOLDER_RE.sub(lambda m: slots[int(m.group(1))], step) for step in steps]
+
+
+def make_key(intent: Optional[str], template: str) -> str:
+    return f"{intent or 'default'}::{template}"
+
+
+@dataclass
+class _CachedPlan:
+    steps: List[str]
+    expires_at: float
+    successes: int = 1
+
+
+class PlanCache:
+    def __init__(
+        self,
+        max_entries: int = DEFAULT_MAX_ENTRIES,
+        ttl_seconds: float = DEFAULT_TTL_SECONDS,
+        min_successes: int = DEFAULT_MIN_SUCCESSES,
+    ):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.min_successes = min_successes
+        self._entries: "OrderedDict[str, _CachedPlan]" = OrderedDict()
+        # 统计只保留最近活跃的模板，数量为缓存上限的两倍
+        self._stats: "OrderedDict[str, Dict[str, int]]" = OrderedDict()
+
+    def _template_stats(self, key: str) -> Dict[str, int]:
+        stats = self._stats.get(key)
+        if stats is None:
+            stats = self._stats[key] = {"lookups": 0, "hits": 0, "executions": 0, "successes": 0, "invalidations": 0}
+            while len(self._stats) > self.max_entries * 2:
+                self._stats.popitem(last=False)
+        else:
+            self._stats.move_to_end(key)
+        return stats
+
+    def lookup(self, key: str, slots: List[str]) -> Optional[List[str]]:
+        stats = self._template_stats(key)
+        stats["lookups"] += 1
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        if entry.expires_at <= time.monotonic():
+            del self._entries[key]
+            return None
+        if entry.successes < self.min_successes:
+            return None
+        self._entries.move_to_end(key)
+        stats["hits"] += 1
+        return bind_slots(entry.steps, slots)
+
+    def record_outcome(self, key: str, slots: List[str], steps: List[str], success: bool, hit: bool) -> None:
+        stats = self._template_stats(key)
+        stats["executions"] += 1
+        if success:
+            stats["successes"] += 1
+
+        entry = self._entries.get(key)
+        if not success:
+            if hit and entry is not None:
+                del self._entries[key]
+                stats["invalidations"] += 1
+                logger.info("Cached plan for %s failed, invalidated", key)
+            return
+
+        if entry is not None:
+            entry.successes += 1
+            entry.expires_at = time.monotonic() + self.ttl_seconds
+            self._entries.move_to_end(key)
+            return
+        parameterized = parameterize(steps, slots)
+        if parameterized is None:
+            logger.debug("Plan for %s references values outside the query, not cached", key)
+            return
+        self._entries[key] = _CachedPlan(parameterized, time.monotonic() + self.ttl_seconds)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def stats(self) -> Dict[str, Any]:
+        templates = {}
+        for key, stats in self._stats.items():
+            templates[key] = {
+                **stats,
+                "cached": key in self._entries,
+                "hit_rate": round(stats["hits"] / stats["lookups"], 4) if stats["lookups"] else 0.0,
+                "success_rate": round(stats["successes"] / stats["executions"], 4) if stats["executions"] else 0.0,
+            }
+        return {"entries": len(self._entries), "templates": templates}
+
+
+_plan_cache: Optional[PlanCache] = None
+
+
+def is_plan_cache_enabled() -> bool:
+    return os.getenv("PLAN_CACHE_ENABLED", "true").lower() == "true"
+
+
+def get_plan_cache() -> Optional[PlanCache]:
+    """未开启时返回 None，planning_node 每次都调用模型"""
+    global _plan_cache
+    if not is_plan_cache_enabled():
+        return None
+    if _plan_cache is None:
+        _plan_cache = PlanCache(
+            max_entries=int(os.getenv("PLAN_CACHE_MAX_ENTRIES", DEFAULT_MAX_ENTRIES)),
+            ttl_seconds=float(os.getenv("PLAN_CACHE_TTL_SECONDS", DEFAULT_TTL_SECONDS)),
+            min_successes=int(os.getenv("PLAN_CACHE_MIN_SUCCESSES", DEFAULT_MIN_SUCCESSES)),
+        )
+    return _plan_cache
+
+
+def get_plan_cache_stats() -> Optional[Dict[str, Any]]:
+    return _plan_cache.stats() if _plan_cache is not None else None
@@ -0,0 +1,32 @@
+"""
+临时进度事件
+
+计划生成、步骤开始 / 完成、重新规划等进度提示只对正在看流式输出的客户端有意义。
+以前它们以 AIMessage 追加到 state["messages"]：每个 checkpoint 都要存一份，后续 prompt 里也会反复出现。
+现在通过 LangGraph 的 stream writer（stream_mode="custom"）发出，不进入 state、checkpoint 和 prompt。
+"""
+import logging
+from typing import Any
+
+from langgraph.config import get_stream_writer
+
+logger = logging.getLogger(__name__)
+
+PROGRESS_EVENT = "progress"
+
+
+def emit_progress(stage: str, message: str, **data: Any) -> None:
+    """
+    发出一条进度事件；未以 custom 模式流式运行（或直接调用节点函数）时静默忽略
+
+    Args:
+        stage: 事件类型，如 plan_created / step_started / step_completed / step_waiting / replanned / finalized
+        message: 面向用户的文案
+        data: 附加的结构化字段（步骤序号、计划列表等）
+    """
+    try:
+        writer = get_stream_writer()
+    except RuntimeError:
+        # 不在图的运行上下文中（单测里直接调用节点）
+        return
+    writer({"type": PROGRESS_EVENT, "stage": stage, "message": message, **data})
@@ -0,0 +1,221 @@
+"""
+Qdrant 集合配置档（Collection Profile）
+
+把“向量怎么存、索引怎么建、查询怎么搜”收敛成一个命名配置，
+创建新集合和迁移已有集合都走同一份定义：
+
+- baseline: 默认 float32 向量全量放内存，HNSW 使用 Qdrant 默认参数（与历史行为一致）；
+            参数显式写出，从其他配置档迁回 baseline 时才会恢复默认值
+- int8:     标量 int8 量化（量化向量常驻内存，原始向量落盘），rescore 保证精度
+- binary:   二值量化，内存最省，依赖 oversampling + rescore 找回召回率
+
+通过环境变量 `QDRANT_COLLECTION_PROFILE` 选择线上使用的配置档。
+"""
+import logging
+import os
+from dataclasses import dataclass
+from typing import Dict, Optional
+
+from qdrant_client import QdrantClient
+from qdrant_client.models import (
+    BinaryQuantization,
+    BinaryQuantizationConfig,
+    Disabled,
+    Distance,
+    HnswConfigDiff,
+    QuantizationSearchParams,
+    ScalarQuantization,
+    ScalarQuantizationConfig,
+    ScalarType,
+    SearchParams,
+    VectorParams,
+    VectorParamsDiff,
+)
+
+from src.constants import EMBEDDING_VECTOR_SIZE
+
+logger = logging.getLogger(__name__)
+
+QUANTIZATION_NONE = "none"
+QUANTIZATION_INT8 = "int8"
+QUANTIZATION_BINARY = "binary"
+
+# Qdrant 的 HNSW 默认参数
+DEFAULT_HNSW_M = 16
+DEFAULT_HNSW_EF_CONSTRUCT = 100
+
+
+@dataclass(frozen=True)
+class CollectionProfile:
+    """集合配置档"""
+    name: str
+    quantization: str = QUANTIZATION_NONE
+    # 原始向量是否落盘（量化向量仍可通过 always_ram 常驻内存）
+    on_disk: bool = False
+    # HNSW 构建参数；None 表示沿用 Qdrant 默认值
+    hnsw_m: Optional[int] = None
+    hnsw_ef_construct: Optional[int] = None
+    # 查询参数
+    search_ef: Optional[int] = None
+    oversampling: Optional[float] = None
+    rescore: bool = True
+    always_ram: bool = True
+
+    def vectors_config(self, vector_size: int = EMBEDDING_VECTOR_SIZE) -> VectorParams:
+        return VectorParams(
+            size=vector_size,
+            distance=Distance.COSINE,
+            on_disk=self.on_disk or None,
+        )
+
+    def hnsw_config(self) -> Optional[HnswConfigDiff]:
+        if self.hnsw_m is None and self.hnsw_ef_construct is None:
+            return None
+        return HnswConfigDiff(m=self.hnsw_m, ef_construct=self.hnsw_ef_construct)
+
+    def quantization_config(self):
+        if self.quantization == QUANTIZATION_INT8:
+            return ScalarQuantization(
+                scalar=ScalarQuantizationConfig(
+                    type=ScalarType.INT8,
+                    quantile=0.99,
+                    always_ram=self.always_ram,
+                )
+            )
+        if self.quantization == QUANTIZATION_BINARY:
+            return BinaryQuantization(
+                binary=BinaryQuantizationConfig(always_ram=self.always_ram)
+            )
+        return None
+
+    def search_params(self, exact: bool = False) -> Optional[SearchParams]:
+        """构造查询参数；baseline 且非精确检索时返回 None，保持 Qdrant 默认行为。"""
+        if exact:
+            # 精确检索绕过 HNSW 与量化，作为 recall 评估的基准
+            return SearchParams(exact=True, quantization=QuantizationSearchParams(ignore=True))
+
+        quantization = None
+        if self.quantization != QUANTIZATION_NONE:
+            quantization = QuantizationSearchParams(
+                rescore=self.rescore,
+                oversampling=self.oversampling,
+            )
+        if self.search_ef is None and quantization is None:
+            return None
+        return SearchParams(hnsw_ef=self.search_ef, quantization=quantization)
+
+
+PROFILES: Dict[str, CollectionProfile] = {
+    "baseline": CollectionProfile(
+        name="baseline",
+        hnsw_m=DEFAULT_HNSW_M,
+        hnsw_ef_construct=DEFAULT_HNSW_EF_CONSTRUCT,
+    ),
+    "int8": CollectionProfile(
+        name="int8",
+        quantization=QUANTIZATION_INT8,
+        on_disk=True,
+        hnsw_m=16,
+        hnsw_ef_construct=128,
+        search_ef=64,
+        oversampling=1.5,
+    ),
+    "binary": CollectionProfile(
+        name="binary",
+        quantization=QUANTIZATION_BINARY,
+        on_disk=True,
+        hnsw_m=16,
+        hnsw_ef_construct=128,
+        search_ef=96,
+        oversampling=3.0,
+    ),
+}
+
+DEFAULT_PROFILE = "baseline"
+
+
+def get_profile(name: Optional[str] = None) -> CollectionProfile:
+    """按名称获取配置档，未指定时读取 `QDRANT_COLLECTION_PROFILE`。"""
+    resolved = (name or os.getenv("QDRANT_COLLECTION_PROFILE") or DEFAULT_PROFILE).lower()
+    profile = PROFILES.get(resolved)
+    if profile is None:
+        raise ValueError(
+            f"Unknown Qdrant collection profile: {resolved}. Available: {', '.join(PROFILES)}"
+        )
+    return profile
+
+
+def create_collection(
+    client: QdrantClient,
+    collection_name: str,
+    profile: CollectionProfile,
+    vector_size: int = EMBEDDING_VECTOR_SIZE,
+) -> bool:
+    """
+    按配置档创建集合
+
+    Returns:
+        bool: 集合是新建的返回 True，已存在则跳过并返回 False
+    """
+    if client.collection_exists(collection_name):
+        logger.info("Collection %s already exists, skip creation", collection_name)
+        return False
+
+    client.create_collection(
+        collection_name=collection_name,
+        vectors_config=profile.vectors_config(vector_size),
+        hnsw_config=profile.hnsw_config(),
+        quantization_config=profile.quantization_config(),
+    )
+    logger.info("Created collection %s with profile=%s", collection_name, profile.name)
+    return True
+
+
+def apply_profile(client: QdrantClient, collection_name: str, profile: CollectionProfile) -> None:
+    """
+    将已有集合迁移到指定配置档（原地更新，不重新导入数据）
+
+    Qdrant 会在后台按新配置重建段与索引，期间集合保持可查询。
+    """
+    quantization_config = profile.quantization_config()
+    client.update_collection(
+        collection_name=collection_name,
+        vectors_config={
+            "": VectorParamsDiff(on_disk=profile.on_disk, hnsw_config=profile.hnsw_config()),
+        },
+        hnsw_config=profile.hnsw_config(),
+        quantization_config=quantization_config if quantization_config is not None else Disabled.DISABLED,
+    )
+    logger.info("Applied profile=%s to collection %s", profile.name, collection_name)
+
+
+def estimate_ram_bytes(profile: CollectionProfile, num_vectors: int, vector_size: int = EMBEDDING_VECTOR_SIZE) -> int:
+    """粗略估算集合常驻内存：原始向量 + 量化向量 + HNSW 图链接。"""
+    raw = 0 if profile.on_disk else num_vectors * vector_size * 4
+    quantized = 0
+    if profile.always_ram:
+        if profile.quantization == QUANTIZATION_INT8:
+            quantized = num_vectors * vector_size
+        elif profile.quantization == QUANTIZATION_BINARY:
+            quantized = num_vectors * vector_size // 8
+    # 每个点平均 2*m 条链接，每条链接 4 字节
+    graph = num_vectors * (profile.hnsw_m or DEFAULT_HNSW_M) * 2 * 4
+    return raw + quantized + graph
+
+
+if __name__ == "__main__":
+    import argparse
+
+    from src.config.qdrant import get_qdrant_client_kwargs
+
+    parser = argparse.ArgumentParser(description="Create or migrate a Qdrant collection with a profile")
+    parser.add_argument("collection", help="集合名，例如 dz_channel_faq")
+    parser.add_argument("--profile", default=None, help=f"配置档: {', '.join(PROFILES)}")
+    parser.add_argument("--migrate", action="store_true", help="集合已存在时原地迁移到该配置档")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+    qdrant = QdrantClient(**get_qdrant_client_kwargs())
+    target = get_profile(args.profile)
+    if not create_collection(qdrant, args.collection, target) and args.migrate:
+        apply_profile(qdrant, args.collection, target)
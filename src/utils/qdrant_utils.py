@@ -1,4 +1,5 @@
-from typing import List
+from functools import lru_cache
+from typing import List, Tuple
 from qdrant_client import QdrantClient
 from qdrant_client.models import PointStruct
 from dotenv import load_dotenv
@@ -6,6 +7,7 @@ from dotenv import load_dotenv
 from src.config.eb import TongyiEmbedding
 from src.config.qdrant import get_qdrant_client_kwargs
 from src.constants import EMBEDDING_VECTOR_SIZE
+from src.utils.qdrant_profile import get_profile
 
 load_dotenv()
 
@@ -26,14 +28,25 @@ def _get_eb():
         _eb = TongyiEmbedding()
     return _eb
 
+@lru_cache(maxsize=1024)
+def _embed_query_cached(query: str) -> Tuple[float, ...]:
+    return tuple(_get_eb().embed_query(query))
+
+
+def embed_query(query: str) -> List[float]:
+    """查询向量化；重复 query（如澄清后重跑）直接命中进程内缓存。"""
+    return list(_embed_query_cached(query))
+
+
 def qdrant_select(query: str, score_threshold: float = 0.75, collection_name: str = "dz_channel_faq"):
-    query_vector = _get_eb().embed_query(query)
+    query_vector = embed_query(query)
 
     results = _get_client().query_points(
         collection_name=collection_name,
         query=query_vector,
         limit=3,
         score_threshold=score_threshold,
+        search_params=get_profile().search_params(),
     )
     return results
 
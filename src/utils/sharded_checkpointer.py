@@ -0,0 +1,314 @@
+"""
+checkpoint 分片存储
+
+单个 MySQL 主库会成为并发诊断会话的瓶颈。配置 CHECKPOINT_SHARDS 后，checkpoint 按 thread_id 的
+一致性哈希分布到多个 MySQL 实例，每个分片可以挂只读副本：
+
+    CHECKPOINT_SHARDS='[
+        {"name": "s0", "primary": "mysql://u:p@db0:3306/tt", "replicas": ["mysql://u:p@db0-r:3306/tt"]},
+        {"name": "s1", "primary": "mysql://u:p@db1:3306/tt"}
+    ]'
+
+路由规则：
+- 写入（aput / aput_writes / adelete_thread）和读取最新状态都走 owner 分片的主库，保证读己之写
+- 历史查询（alist、按 checkpoint_id 读取）走副本；副本还没同步到指定 checkpoint 时回退主库
+
+在线扩缩容（双写）：
+1. 配置 CHECKPOINT_SHARDS_NEXT 为目标分片列表并滚动重启 —— 之后 owner 发生变化的 thread 同时写新旧两个分片
+2. 运行 `python -m src.utils.sharded_checkpointer reshard` 把这些 thread 的历史数据拷贝到新 owner
+3. 把 CHECKPOINT_SHARDS 替换为目标列表、删除 CHECKPOINT_SHARDS_NEXT 并滚动重启，读取切到新分片
+4. 可选：`reshard --delete-moved`（仍按步骤 2 的环境执行）清理旧分片上已迁走的数据
+"""
+import asyncio
+import bisect
+import hashlib
+import itertools
+import json
+import logging
+import os
+from dataclasses import dataclass, field
+from typing import Any, AsyncIterator, Callable, Dict, List, Optional, Sequence, Tuple
+
+from langchain_core.runnables import RunnableConfig
+from langgraph.checkpoint.base import (
+    BaseCheckpointSaver,
+    ChannelVersions,
+    Checkpoint,
+    CheckpointMetadata,
+    CheckpointTuple,
+    get_checkpoint_id,
+)
+
+from src.config.mysql import get_dsn_pool
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_VNODES = 160
+CHECKPOINT_TABLES = ("checkpoints", "checkpoint_blobs", "checkpoint_writes")
+
+
+@dataclass
+class ShardSpec:
+    name: str
+    primary: str
+    replicas: List[str] = field(default_factory=list)
+
+
+def load_shard_specs(env_var: str = "CHECKPOINT_SHARDS") -> List[ShardSpec]:
+    raw = os.getenv(env_var, "").strip()
+    if not raw:
+        return []
+    try:
+        return [
+            ShardSpec(name=item["name"], primary=item["primary"], replicas=list(item.get("replicas") or []))
+            for item in json.loads(raw)
+        ]
+    except (ValueError, KeyError, TypeError) as e:
+        raise ValueError(f"Invalid {env_var}: {e}") from e
+
+
+def is_sharding_enabled() -> bool:
+    return bool(os.getenv("CHECKPOINT_SHARDS", "").strip())
+
+
+class HashRing:
+    """带虚拟节点的一致性哈希环；增删一个分片只会迁移约 1/N 的 thread"""
+
+    def __init__(self, names: Sequence[str], vnodes: int = DEFAULT_VNODES):
+        if not names:
+            raise ValueError("HashRing requires at least one shard")
+        self.names = list(names)
+        points = sorted((self._hash(f"{name}#{i}"), name) for name in self.names for i in range(vnodes))
+        self._keys = [point for point, _ in points]
+        self._owners = [name for _, name in points]
+
+    @staticmethod
+    def _hash(value: str) -> int:
+        return int.from_bytes(hashlib.md5(value.encode("utf-8")).digest()[:8], "big")
+
+    def node_for(self, key: str) -> str:
+        idx = bisect.bisect(self._keys, self._hash(key)) % len(self._keys)
+        return self._owners[idx]
+
+
+class ShardedCheckpointer(BaseCheckpointSaver):
+    """按 thread_id 路由到各分片的 saver；next_ring 不为空时处于迁移期，对 owner 变化的 thread 双写"""
+
+    def __init__(
+        self,
+        ring: HashRing,
+        primaries: Dict[str, BaseCheckpointSaver],
+        replicas: Optional[Dict[str, List[BaseCheckpointSaver]]] = None,
+        next_ring: Optional[HashRing] = None,
+    ):
+        first = primaries[ring.names[0]]
+        super().__init__(serde=first.serde)
+        self.ring = ring
+        self.next_ring = next_ring
+        self.primaries = primaries
+        self._replica_cycles = {
+            name: itertools.cycle(savers) for name, savers in (replicas or {}).items() if savers
+        }
+
+    def get_next_version(self, current, channel):
+        return self.primaries[self.ring.names[0]].get_next_version(current, channel)
+
+    def _primary(self, thread_id: str) -> BaseCheckpointSaver:
+        return self.primaries[self.ring.node_for(thread_id)]
+
+    def _reader(self, thread_id: str) -> BaseCheckpointSaver:
+        replicas = self._replica_cycles.get(self.ring.node_for(thread_id))
+        return next(replicas) if replicas else self._primary(thread_id)
+
+    def _write_targets(self, thread_id: str) -> List[BaseCheckpointSaver]:
+        owner = self.ring.node_for(thread_id)
+        targets = [self.primaries[owner]]
+        if self.next_ring is not None:
+            next_owner = self.next_ring.node_for(thread_id)
+            if next_owner != owner:
+                targets.append(self.primaries[next_owner])
+        return targets
+
+    async def aget_tuple(self, config: RunnableConfig) -> Optional[CheckpointTuple]:
+        thread_id = config["configurable"]["thread_id"]
+        if get_checkpoint_id(config):
+            reader = self._reader(thread_id)
+            result = await reader.aget_tuple(config)
+            primary = self._primary(thread_id)
+            if result is not None or reader is primary:
+                return result
+            # 副本复制延迟：刚写入的 checkpoint 还读不到
+            return await primary.aget_tuple(config)
+        return await self._primary(thread_id).aget_tuple(config)
+
+    async def alist(
+        self,
+        config: Optional[RunnableConfig],
+        *,
+        filter: Optional[Dict[str, Any]] = None,
+        before: Optional[RunnableConfig] = None,
+        limit: Optional[int] = None,
+    ) -> AsyncIterator[CheckpointTuple]:
+        thread_id = ((config or {}).get("configurable") or {}).get("thread_id")
+        if thread_id is None:
+            raise ValueError("ShardedCheckpointer.alist requires a thread_id")
+        async for item in self._reader(thread_id).alist(config, filter=filter, before=before, limit=limit):
+            yield item
+
+    async def aput(
+        self,
+        config: RunnableConfig,
+        checkpoint: Checkpoint,
+        metadata: CheckpointMetadata,
+        new_versions: ChannelVersions,
+    ) -> RunnableConfig:
+        targets = self._write_targets(config["configurable"]["thread_id"])
+        results = await asyncio.gather(
+            *(saver.aput(config, checkpoint, metadata, new_versions) for saver in targets)
+        )
+        return results[0]
+
+    async def aput_writes(
+        self,
+        config: RunnableConfig,
+        writes: Sequence[Tuple[str, Any]],
+        task_id: str,
+        task_path: str = "",
+    ) -> None:
+        targets = self._write_targets(config["configurable"]["thread_id"])
+        await asyncio.gather(*(saver.aput_writes(config, writes, task_id, task_path) for saver in targets))
+
+    async def adelete_thread(self, thread_id: str) -> None:
+        await asyncio.gather(*(saver.adelete_thread(thread_id) for saver in self._write_targets(thread_id)))
+
+
+_ready_dsns = set()
+
+
+async def get_primary_pools() -> List[Any]:
+    """当前各分片主库的连接池（保留策略等维护任务逐个分片执行）"""
+    return [await get_dsn_pool(spec.primary) for spec in load_shard_specs("CHECKPOINT_SHARDS")]
+
+
+async def build_sharded_checkpointer(
+    saver_factory: Callable[[Any], BaseCheckpointSaver],
+) -> ShardedCheckpointer:
+    """
+    按 CHECKPOINT_SHARDS / CHECKPOINT_SHARDS_NEXT 构建分片 checkpointer
+
+    saver_factory 接收连接池返回具体的 saver（例如 MySQLSaver），连接池进程内共享。
+    """
+    current = load_shard_specs("CHECKPOINT_SHARDS")
+    upcoming = load_shard_specs("CHECKPOINT_SHARDS_NEXT")
+    specs: Dict[str, ShardSpec] = {}
+    for spec in current + upcoming:
+        existing = specs.setdefault(spec.name, spec)
+        if existing.primary != spec.primary:
+            raise ValueError(f"Shard {spec.name} has different primaries in CHECKPOINT_SHARDS and CHECKPOINT_SHARDS_NEXT")
+
+    primaries, replicas = {}, {}
+    for name, spec in specs.items():
+        primaries[name] = saver_factory(await get_dsn_pool(spec.primary))
+        if spec.primary not in _ready_dsns:
+            await primaries[name].setup()
+            _ready_dsns.add(spec.primary)
+        replicas[name] = [saver_factory(await get_dsn_pool(dsn)) for dsn in spec.replicas]
+
+    return ShardedCheckpointer(
+        HashRing([spec.name for spec in current]),
+        primaries,
+        replicas,
+        next_ring=HashRing([spec.name for spec in upcoming]) if upcoming else None,
+    )
+
+
+async def _copy_thread(source, target, thread_id: str) -> None:
+    async with source.acquire() as src_conn, target.acquire() as dst_conn:
+        async with src_conn.cursor() as src, dst_conn.cursor() as dst:
+            for table in CHECKPOINT_TABLES:
+                await src.execute(f"SELECT * FROM {table} WHERE thread_id = %s", (thread_id,))
+                rows = await src.fetchall()
+                if not rows:
+                    continue
+                columns = list(rows[0].keys())
+                placeholders = "(" + ", ".join(["%s"] * len(columns)) + ")"
+                column_sql = ", ".join(f"`{column}`" for column in columns)
+                await dst.executemany(
+                    f"INSERT IGNORE INTO {table} ({column_sql}) VALUES {placeholders}",
+                    [tuple(row[column] for column in columns) for row in rows],
+                )
+
+
+async def _delete_thread_rows(pool, thread_id: str) -> None:
+    async with pool.acquire() as conn:
+        async with conn.cursor() as cursor:
+            for table in CHECKPOINT_TABLES:
+                await cursor.execute(f"DELETE FROM {table} WHERE thread_id = %s", (thread_id,))
+
+
+async def reshard(batch_size: int = 200, delete_moved: bool = False) -> Dict[str, int]:
+    """
+    把 owner 变化的 thread 从当前分片拷贝到 CHECKPOINT_SHARDS_NEXT 中的新 owner
+
+    需要在双写已经生效之后运行；INSERT IGNORE 保证和双写写入的行不冲突，可以重复执行。
+    delete_moved=True 时删除旧分片上已迁走的数据（切换读取之后再执行）。
+    """
+    current = load_shard_specs("CHECKPOINT_SHARDS")
+    upcoming = load_shard_specs("CHECKPOINT_SHARDS_NEXT")
+    if not current or not upcoming:
+        raise ValueError("reshard requires both CHECKPOINT_SHARDS and CHECKPOINT_SHARDS_NEXT")
+    primaries = {spec.name: spec.primary for spec in current + upcoming}
+    ring, next_ring = HashRing([s.name for s in current]), HashRing([s.name for s in upcoming])
+
+    counts = {"scanned": 0, "moved": 0}
+    for spec in current:
+        source = await get_dsn_pool(spec.primary)
+        after = ""
+        while True:
+            async with source.acquire() as conn:
+                async with conn.cursor() as cursor:
+                    await cursor.execute(
+                        "SELECT DISTINCT thread_id FROM checkpoints WHERE thread_id > %s ORDER BY thread_id LIMIT %s",
+                        (after, batch_size),
+                    )
+                    thread_ids = [row["thread_id"] for row in await cursor.fetchall()]
+            for thread_id in thread_ids:
+                counts["scanned"] += 1
+                # 只处理当前属于本分片、且目标 owner 不同的 thread
+                if ring.node_for(thread_id) != spec.name:
+                    continue
+                target_name = next_ring.node_for(thread_id)
+                if target_name == spec.name:
+                    continue
+                if delete_moved:
+                    await _delete_thread_rows(source, thread_id)
+                else:
+                    await _copy_thread(source, await get_dsn_pool(primaries[target_name]), thread_id)
+                counts["moved"] += 1
+            if len(thread_ids) < batch_size:
+                break
+            after = thread_ids[-1]
+        logger.info("Reshard scanned shard %s: %s", spec.name, counts)
+    return counts
+
+
+if __name__ == "__main__":
+    import argparse
+
+    from src.config.mysql import close_aio_pool
+
+    parser = argparse.ArgumentParser(description="Checkpoint resharding")
+    parser.add_argument("command", choices=["reshard"])
+    parser.add_argument("--batch-size", type=int, default=200)
+    parser.add_argument("--delete-moved", action="store_true", help="删除旧分片上已迁走的 thread（读取切换之后执行）")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+
+    async def main():
+        try:
+            print(await reshard(batch_size=args.batch_size, delete_moved=args.delete_moved))
+        finally:
+            await close_aio_pool()
+
+    asyncio.run(main())
@@ -0,0 +1,152 @@
+"""
+/chat/stream 的增量 SSE 编码
+
+原来每个 updates chunk 都要经过 make_json_safe 递归遍历、重建 StreamMessageResponse、对每个 pydantic
+对象 model_dump，再用标准库 json.dumps 编码。这里换成：
+
+- orjson 直接编码；项目模型按类型查表，用 pydantic 预编译的 serializer 输出 JSON 兼容结构
+- 每个流维护已发送的 message id / step_result，只推送增量
+  （messages 模式已经逐 token 推过的消息，不会在 updates 里再完整发送一遍）
+- 客户端可以通过 stream_fields 只订阅 updates payload 中需要的字段
+
+输出结构与原来保持一致：消息为 {"id", "type", "content"}，datetime 为 ISO 字符串，枚举为值。
+"""
+import json
+import logging
+from typing import Any, Callable, Dict, Iterable, Optional, Set, Tuple
+
+from langchain_core.messages import BaseMessage
+from pydantic import BaseModel
+
+from src.graph_state import Plan
+from src.models.execution_result import PlanExecutionSummary, StepExecutionResult, TokenUsage, ToolCall
+
+try:
+    import orjson
+except ImportError:
+    # 未安装 orjson 时退回标准库（功能一致，只是慢一些）
+    orjson = None
+
+logger = logging.getLogger(__name__)
+
+
+def normalize_message_content(content: Any) -> str:
+    if isinstance(content, str):
+        return content
+    if isinstance(content, list):
+        parts = []
+        for item in content:
+            if isinstance(item, str):
+                parts.append(item)
+            elif isinstance(item, dict):
+                text = item.get("text")
+                if isinstance(text, str):
+                    parts.append(text)
+        return "".join(parts)
+    return str(content) if content is not None else ""
+
+
+def encode_message(message: BaseMessage) -> Dict[str, Any]:
+    return {"id": message.id, "type": message.type, "content": normalize_message_content(message.content)}
+
+
+def _model_encoder(cls) -> Callable[[Any], Any]:
+    serializer = cls.__pydantic_serializer__
+    return lambda obj: serializer.to_python(obj, mode="json", fallback=str)
+
+
+# 类型 -> 编码函数；按精确类型查表，避免逐个 isinstance
+_ENCODERS: Dict[type, Callable[[Any], Any]] = {
+    cls: _model_encoder(cls)
+    for cls in (StepExecutionResult, PlanExecutionSummary, TokenUsage, ToolCall, Plan)
+}
+
+
+def _default(obj: Any) -> Any:
+    encoder = _ENCODERS.get(type(obj))
+    if encoder is not None:
+        return encoder(obj)
+    if isinstance(obj, BaseMessage):
+        return encode_message(obj)
+    if isinstance(obj, BaseModel):
+        return obj.model_dump(mode="json", fallback=str)
+    if isinstance(obj, (set, frozenset, tuple)):
+        return list(obj)
+    return str(obj)
+
+
+def dumps(data: Any) -> str:
+    if orjson is not None:
+        return orjson.dumps(data, default=_default, option=orjson.OPT_NON_STR_KEYS).decode("utf-8")
+    return json.dumps(data, default=_default, ensure_ascii=False)
+
+
+def encode_sse(event: str, data: Dict[str, Any]) -> str:
+    return f"event: {event}\ndata: {dumps(data)}\n\n"
+
+
+def _step_key(result: Any) -> Tuple[Any, Any]:
+    # 重新规划后 step_index 会从 0 重新开始，用开始时间区分
+    return getattr(result, "step_index", None), getattr(result, "start_time", None)
+
+
+class StreamEncoder:
+    """单个 SSE 流的编码器：记录已发送内容，只输出增量"""
+
+    def __init__(self, thread_id: str, fields: Optional[Iterable[str]] = None):
+        self.thread_id = thread_id
+        self.fields: Optional[Set[str]] = set(fields) if fields else None
+        self._sent_message_ids: Set[str] = set()
+        self._sent_steps: Set[Tuple[Any, Any]] = set()
+
+    def event(self, mode: str, data: Dict[str, Any]) -> str:
+        return encode_sse(mode, {"thread_id": self.thread_id, "mode": mode, "data": data})
+
+    def _new_messages(self, messages: Any) -> list:
+        if not isinstance(messages, (list, tuple)):
+            messages = [messages]
+        fresh = []
+        for message in messages:
+            message_id = getattr(message, "id", None)
+            if message_id is not None:
+                if message_id in self._sent_message_ids:
+                    continue
+                self._sent_message_ids.add(message_id)
+            fresh.append(message)
+        return fresh
+
+    def _new_steps(self, results: Any) -> list:
+        fresh = []
+        for result in results or []:
+            key = _step_key(result)
+            if key in self._sent_steps:
+                continue
+            self._sent_steps.add(key)
+            fresh.append(result)
+        return fresh
+
+    def updates(self, node: str, payload: Any) -> Optional[str]:
+        """返回 None 表示投影 / 去重之后没有需要推送的内容"""
+        if isinstance(payload, dict):
+            delta = {}
+            for key, value in payload.items():
+                if self.fields is not None and key not in self.fields:
+                    continue
+                if key == "messages":
+                    value = self._new_messages(value)
+                    if not value:
+                        continue
+                elif key == "step_results":
+                    value = self._new_steps(value)
+                    if not value:
+                        continue
+                delta[key] = value
+            if not delta and payload:
+                return None
+            payload = delta
+        return self.event("updates", {"node": node, "payload": payload})
+
+    def messages(self, message: BaseMessage, metadata: Dict[str, Any]) -> str:
+        if message.id is not None:
+            self._sent_message_ids.add(message.id)
+        return self.event("messages", {"message": encode_message(message), "metadata": metadata})
@@ -0,0 +1,150 @@
+"""
+只读的执行状态读取器
+
+`/execution/{thread_id}` 只需要 plan / step_results / execution_summary 几个 channel，
+不需要编译整张图、也不需要 `aget_state` 把 messages 等所有 channel 都反序列化一遍。
+
+这里直接读 checkpointer 的表：
+1. 按主键取该 thread 主图（checkpoint_ns=''）最新的 checkpoint_id —— 也作为 ETag
+2. 只取请求的 channel：基本类型直接内联在 checkpoint JSON 里，其余按 (channel, version) 去 blobs 表取
+
+轮询方带上 If-None-Match 且 checkpoint 未变化时，第 1 步之后就可以直接返回 304。
+"""
+import json
+import logging
+import os
+from dataclasses import dataclass, field
+from typing import Any, Dict, Iterable, Optional, Sequence
+
+from src.config.mysql import get_aio_pool
+from src.utils.checkpoint_serde import get_checkpoint_serializer
+from src.utils.sharded_checkpointer import is_sharding_enabled
+
+logger = logging.getLogger(__name__)
+
+EXECUTION_CHANNELS = ("original_query", "plan", "step_results", "execution_summary")
+
+# 主图的 checkpoint_ns 为空串，checkpoint_ns_hash = UNHEX(MD5(''))
+LATEST_CHECKPOINT_SQL = """
+SELECT checkpoint_id FROM checkpoints
+WHERE thread_id = %s AND checkpoint_ns_hash = UNHEX(MD5(''))
+ORDER BY checkpoint_id DESC LIMIT 1
+"""
+
+CHECKPOINT_CHANNELS_SQL = """
+SELECT JSON_EXTRACT(checkpoint, '$.channel_values') AS inline_values,
+       JSON_EXTRACT(checkpoint, '$.channel_versions') AS channel_versions
+FROM checkpoints
+WHERE thread_id = %s AND checkpoint_ns_hash = UNHEX(MD5('')) AND checkpoint_id = %s
+"""
+
+
+@dataclass
+class StateView:
+    checkpoint_id: str
+    values: Dict[str, Any] = field(default_factory=dict)
+    not_modified: bool = False
+
+    @property
+    def etag(self) -> str:
+        return make_etag(self.checkpoint_id)
+
+
+def make_etag(checkpoint_id: str) -> str:
+    return f'"{checkpoint_id}"'
+
+
+def etag_matches(if_none_match: Optional[str], checkpoint_id: str) -> bool:
+    """解析 If-None-Match（可能是逗号分隔的多个值、带 W/ 前缀或为 *）。"""
+    if not if_none_match:
+        return False
+    for candidate in if_none_match.split(","):
+        candidate = candidate.strip()
+        if candidate == "*":
+            return True
+        if candidate.startswith("W/"):
+            candidate = candidate[2:]
+        if candidate.strip('"') == checkpoint_id:
+            return True
+    return False
+
+
+def _load_json(value: Any) -> Any:
+    if isinstance(value, (str, bytes)):
+        return json.loads(value)
+    return value or {}
+
+
+class MySQLStateReader:
+    """直接读 AIOMySQLSaver 表结构的只读状态读取器"""
+
+    def __init__(self, pool, serde=None):
+        self.pool = pool
+        self.serde = serde or get_checkpoint_serializer()
+
+    async def latest_checkpoint_id(self, thread_id: str) -> Optional[str]:
+        async with self.pool.acquire() as conn:
+            async with conn.cursor() as cursor:
+                await cursor.execute(LATEST_CHECKPOINT_SQL, (thread_id,))
+                row = await cursor.fetchone()
+        return row["checkpoint_id"] if row else None
+
+    async def read(
+        self,
+        thread_id: str,
+        channels: Sequence[str] = EXECUTION_CHANNELS,
+        if_none_match: Optional[str] = None,
+    ) -> Optional[StateView]:
+        """
+        读取最新 checkpoint 中指定的 channel
+
+        Returns:
+            StateView；thread 不存在时返回 None；ETag 命中时返回 not_modified=True 且不加载数据
+        """
+        checkpoint_id = await self.latest_checkpoint_id(thread_id)
+        if checkpoint_id is None:
+            return None
+        if etag_matches(if_none_match, checkpoint_id):
+            return StateView(checkpoint_id=checkpoint_id, not_modified=True)
+
+        async with self.pool.acquire() as conn:
+            async with conn.cursor() as cursor:
+                await cursor.execute(CHECKPOINT_CHANNELS_SQL, (thread_id, checkpoint_id))
+                row = await cursor.fetchone()
+                if row is None:
+                    # 刚好被清理任务删掉，按不存在处理
+                    return None
+
+                inline_values = _load_json(row["inline_values"])
+                versions = _load_json(row["channel_versions"])
+                values = {name: inline_values[name] for name in channels if name in inline_values}
+                wanted = [(name, str(versions[name])) for name in channels if name not in values and name in versions]
+
+                if wanted:
+                    placeholders = ", ".join(["(%s, %s)"] * len(wanted))
+                    await cursor.execute(
+                        "SELECT channel, type, `blob` FROM checkpoint_blobs "
+                        "WHERE thread_id = %s AND checkpoint_ns_hash = UNHEX(MD5('')) "
+                        f"AND (channel, version) IN ({placeholders})",
+                        [thread_id] + [value for pair in wanted for value in pair],
+                    )
+                    for blob_row in await cursor.fetchall():
+                        if blob_row["type"] == "empty" or blob_row["blob"] is None:
+                            continue
+                        values[blob_row["channel"]] = self.serde.loads_typed((blob_row["type"], blob_row["blob"]))
+
+        return StateView(checkpoint_id=checkpoint_id, values=values)
+
+
+def find_step(step_results: Optional[Iterable[Any]], step_index: int) -> Optional[Any]:
+    for result in step_results or []:
+        if getattr(result, "step_index", None) == step_index:
+            return result
+    return None
+
+
+async def get_state_reader() -> Optional[MySQLStateReader]:
+    """MySQL checkpointer 下返回读取器；其他后端（含分片部署）返回 None，由调用方走 aget_state 的通用路径。"""
+    if os.getenv("LANGGRAPH_CHECKPOINTER", "mysql").lower() != "mysql" or is_sharding_enabled():
+        return None
+    return MySQLStateReader(await get_aio_pool())
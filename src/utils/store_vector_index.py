@@ -0,0 +1,150 @@
+"""
+MySQLStore 的向量检索旁路索引（Qdrant）
+
+Store 的权威数据仍在 MySQL `store_items`，这里只保存需要语义检索的字段向量：
+
+- 每个 (namespace, key, field) 对应一个 Qdrant 点，点 ID 由三者确定性生成，重复写入即覆盖
+- payload 记录 namespace / key 以及 namespace 的全部前缀（`ns_prefixes`），
+  按 namespace 前缀检索时走 keyword 索引过滤，而不是扫描整个集合
+- 检索只返回 (namespace, key, score)，行数据再回 MySQL 按主键批量取
+
+通过 `IndexConfig(dims=..., embed=..., fields=[...])` 传给 MySQLStore 启用；
+未指定 embed 时沿用项目默认的 DashScope Embedding。
+"""
+import logging
+import uuid
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple
+
+from langgraph.store.base import IndexConfig
+from langgraph.store.base.embed import ensure_embeddings, get_text_at_path, tokenize_path
+from qdrant_client.models import (
+    FieldCondition,
+    Filter,
+    FilterSelector,
+    MatchValue,
+    PayloadSchemaType,
+    PointStruct,
+)
+
+from src.utils.qdrant_profile import create_collection, get_profile
+from src.utils.qdrant_utils import _get_client, _get_eb
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_STORE_VECTOR_COLLECTION = "store_items_vectors"
+NAMESPACE_SEPARATOR = "/"
+# 同一个 key 可能有多个字段命中，多取一些候选再按 key 去重
+CANDIDATE_OVERSAMPLING = 3
+
+
+def _namespace_prefixes(namespace: str) -> List[str]:
+    parts = namespace.split(NAMESPACE_SEPARATOR)
+    return [NAMESPACE_SEPARATOR.join(parts[:i]) for i in range(1, len(parts) + 1)]
+
+
+def _point_id(namespace: str, key: str, field: str, i: int) -> str:
+    return str(uuid.uuid5(uuid.NAMESPACE_URL, f"store://{namespace}\x1f{key}\x1f{field}\x1f{i}"))
+
+
+def _key_filter(keys: Sequence[Tuple[str, str]]) -> Filter:
+    return Filter(should=[
+        Filter(must=[
+            FieldCondition(key="namespace", match=MatchValue(value=namespace)),
+            FieldCondition(key="key", match=MatchValue(value=key)),
+        ])
+        for namespace, key in keys
+    ])
+
+
+class QdrantStoreIndex:
+    """Store 向量索引；所有方法都是同步的，异步 Store 通过 asyncio.to_thread 调用。"""
+
+    def __init__(self, index: IndexConfig, collection_name: str = DEFAULT_STORE_VECTOR_COLLECTION, client=None):
+        self.dims = index["dims"]
+        self.fields = list(index.get("fields") or ["$"])
+        self.embeddings = ensure_embeddings(index.get("embed") or _get_eb())
+        self.collection_name = collection_name
+        self.client = client or _get_client()
+        self._paths = {field: tokenize_path(field) for field in self.fields}
+
+    def setup(self) -> None:
+        if create_collection(self.client, self.collection_name, get_profile(), vector_size=self.dims):
+            for field_name in ("namespace", "key", "ns_prefixes"):
+                self.client.create_payload_index(
+                    collection_name=self.collection_name,
+                    field_name=field_name,
+                    field_schema=PayloadSchemaType.KEYWORD,
+                )
+
+    def _texts(self, value: Dict[str, Any], fields: Optional[Sequence[str]]) -> List[Tuple[str, str]]:
+        texts = []
+        for field in fields or self.fields:
+            path = self._paths.get(field) or tokenize_path(field)
+            texts.extend((field, text) for text in get_text_at_path(value, path) if text)
+        return texts
+
+    def sync(
+        self,
+        upserts: Iterable[Tuple[str, str, Dict[str, Any], Optional[Sequence[str]]]],
+        deletes: Iterable[Tuple[str, str]],
+    ) -> None:
+        """
+        同步一批写入
+
+        Args:
+            upserts: (namespace, key, value, fields) 列表，fields 为 None 时使用 IndexConfig.fields
+            deletes: 需要移除向量的 (namespace, key) 列表（包括被删除或以 index=False 覆盖的条目）
+        """
+        upserts = list(upserts)
+        stale = list(deletes) + [(namespace, key) for namespace, key, _, _ in upserts]
+        if stale:
+            self.client.delete(
+                collection_name=self.collection_name,
+                points_selector=FilterSelector(filter=_key_filter(stale)),
+            )
+
+        pending = []
+        for namespace, key, value, fields in upserts:
+            for i, (field, text) in enumerate(self._texts(value, fields)):
+                pending.append((namespace, key, field, i, text))
+        if not pending:
+            return
+
+        vectors = self.embeddings.embed_documents([text for *_, text in pending])
+        points = [
+            PointStruct(
+                id=_point_id(namespace, key, field, i),
+                vector=vector,
+                payload={
+                    "namespace": namespace,
+                    "key": key,
+                    "field": field,
+                    "ns_prefixes": _namespace_prefixes(namespace),
+                },
+            )
+            for (namespace, key, field, i, _), vector in zip(pending, vectors)
+        ]
+        self.client.upsert(collection_name=self.collection_name, points=points)
+
+    def search(self, query: str, namespace_prefix: str, limit: int) -> List[Tuple[str, str, float]]:
+        """返回按相似度降序、按 (namespace, key) 去重后的候选。"""
+        query_filter = None
+        if namespace_prefix:
+            query_filter = Filter(must=[
+                FieldCondition(key="ns_prefixes", match=MatchValue(value=namespace_prefix)),
+            ])
+        response = self.client.query_points(
+            collection_name=self.collection_name,
+            query=self.embeddings.embed_query(query),
+            query_filter=query_filter,
+            limit=limit * CANDIDATE_OVERSAMPLING,
+            search_params=get_profile().search_params(),
+            with_payload=["namespace", "key"],
+        )
+
+        best: Dict[Tuple[str, str], float] = {}
+        for point in response.points:
+            pk = (point.payload["namespace"], point.payload["key"])
+            if pk not in best:
+                best[pk] = point.score
+        return [(namespace, key, score) for (namespace, key), score in best.items()][:limit]
@@ -0,0 +1,149 @@
+"""
+结构化输出
+
+planning / query_rewrite / replan 原来让模型在文本里输出 JSON，再用 JsonOutputParser、正则提取、
+去注释去尾逗号等方式兜底解析，解析失败就整条链重试或静默当作 continue。
+现在统一把 Pydantic schema 交给模型的原生结构化输出：
+
+- function_calling（默认）：把 schema 绑定为唯一工具并强制调用，参数即结果
+- json_schema：通过 response_format 约束回复内容为符合 schema 的 JSON
+  （LLM_STRUCTURED_METHOD=json_schema，代理不支持工具调用时使用）
+
+传入 on_partial 时改为流式调用，每收到一段参数就用 parse_partial_json 解析出当前的部分结果回调，
+供节点提前推送进度（如逐步展示计划步骤）。
+
+结果不符合 schema 时抛出 StructuredOutputError（ValueError 子类，run_cascade 会据此升级模型），
+并按节点记录解析失败次数和原因。
+"""
+import json
+import logging
+import os
+from collections import defaultdict
+from typing import Any, Callable, Dict, List, Optional, Type, TypeVar
+
+from langchain_core.messages import BaseMessage
+from langchain_core.utils.json import parse_json_markdown, parse_partial_json
+from pydantic import BaseModel, ValidationError
+
+logger = logging.getLogger(__name__)
+
+M = TypeVar("M", bound=BaseModel)
+
+METHOD_FUNCTION_CALLING = "function_calling"
+METHOD_JSON_SCHEMA = "json_schema"
+
+# node -> 统计
+_stats: Dict[str, Dict[str, Any]] = defaultdict(
+    lambda: {"calls": 0, "parse_failures": 0, "reasons": defaultdict(int), "via": defaultdict(int)}
+)
+
+
+class StructuredOutputError(ValueError):
+    def __init__(self, node: str, reason: str, detail: str = ""):
+        super().__init__(f"{node} structured output {reason}: {detail}"[:500])
+        self.node = node
+        self.reason = reason
+
+
+def get_structured_method() -> str:
+    method = os.getenv("LLM_STRUCTURED_METHOD", METHOD_FUNCTION_CALLING)
+    return method if method in (METHOD_FUNCTION_CALLING, METHOD_JSON_SCHEMA) else METHOD_FUNCTION_CALLING
+
+
+def bind_schema(llm, schema: Type[BaseModel], method: Optional[str] = None):
+    method = method or get_structured_method()
+    if method == METHOD_JSON_SCHEMA:
+        return llm.bind(response_format={
+            "type": "json_schema",
+            "json_schema": {"name": schema.__name__, "schema": schema.model_json_schema()},
+        })
+    return llm.bind_tools([schema], tool_choice=schema.__name__)
+
+
+def _raw_payload(message: BaseMessage) -> str:
+    """流式过程中已收到的原始 JSON 文本：优先工具参数，其次回复内容"""
+    chunks = getattr(message, "tool_call_chunks", None) or []
+    if chunks:
+        return chunks[0].get("args") or ""
+    content = getattr(message, "content", "")
+    return content if isinstance(content, str) else ""
+
+
+def parse_partial(message: BaseMessage) -> Optional[Dict[str, Any]]:
+    raw = _raw_payload(message).strip()
+    if not raw:
+        return None
+    try:
+        payload = parse_partial_json(raw)
+    except json.JSONDecodeError:
+        return None
+    return payload if isinstance(payload, dict) else None
+
+
+def parse_structured(message: BaseMessage, schema: Type[M], node: str) -> M:
+    stats = _stats[node]
+    stats["calls"] += 1
+
+    tool_calls = getattr(message, "tool_calls", None) or []
+    invalid_calls = getattr(message, "invalid_tool_calls", None) or []
+    try:
+        if tool_calls:
+            stats["via"]["tool_call"] += 1
+            payload = tool_calls[0]["args"]
+        elif invalid_calls:
+            raise StructuredOutputError(node, "invalid_tool_call", invalid_calls[0].get("error") or "")
+        else:
+            # json_schema 模式，或代理忽略了 tool_choice 直接回复文本
+            stats["via"]["content"] += 1
+            content = message.content if isinstance(message.content, str) else ""
+            try:
+                payload = parse_json_markdown(content)
+            except json.JSONDecodeError as exc:
+                raise StructuredOutputError(node, "invalid_json", content[:200]) from exc
+        try:
+            return schema.model_validate(payload)
+        except ValidationError as exc:
+            raise StructuredOutputError(node, "schema_mismatch", str(exc)) from exc
+    except StructuredOutputError as exc:
+        stats["parse_failures"] += 1
+        stats["reasons"][exc.reason] += 1
+        logger.warning("Structured output parse failed for %s: %s", node, exc.reason)
+        raise
+
+
+async def ainvoke_structured(
+    llm,
+    messages: List[Any],
+    schema: Type[M],
+    node: str,
+    on_partial: Optional[Callable[[Dict[str, Any]], None]] = None,
+) -> M:
+    """按 schema 调用模型并返回校验后的 Pydantic 对象"""
+    bound = bind_schema(llm, schema)
+    if on_partial is None:
+        return parse_structured(await bound.ainvoke(messages), schema, node)
+
+    message = None
+    last_partial = None
+    async for chunk in bound.astream(messages):
+        message = chunk if message is None else message + chunk
+        partial = parse_partial(message)
+        if partial and partial != last_partial:
+            last_partial = partial
+            on_partial(partial)
+    if message is None:
+        raise StructuredOutputError(node, "empty_response")
+    return parse_structured(message, schema, node)
+
+
+def get_structured_output_stats() -> Dict[str, Any]:
+    result = {}
+    for node, stats in _stats.items():
+        result[node] = {
+            "calls": stats["calls"],
+            "parse_failures": stats["parse_failures"],
+            "failure_rate": round(stats["parse_failures"] / stats["calls"], 4) if stats["calls"] else 0.0,
+            "reasons": dict(stats["reasons"]),
+            "via": dict(stats["via"]),
+        }
+    return result
@@ -0,0 +1,43 @@
+"""
+跟随调用任务的 LLM run 记录
+
+调度（llm_scheduler）和端点池（llm_pool）的回调在 on_chat_model_start 占用名额 / 在途数，
+在 on_llm_end / on_llm_error 归还。但调用被取消时（请求截止时间到、对冲的落败请求、SSE 客户端断开）
+LangChain 的 ainvoke 不会回调 on_llm_error，名额就一直不归还。
+
+这里在登记 run 时给当前任务挂一个 done callback：任务结束时仍未收到 end / error 的 run
+交给 on_abandoned 处理。回调需要 run_inline，否则 on_chat_model_start 跑在 gather 出来的子任务里。
+"""
+import asyncio
+from typing import Any, Callable, Dict, Optional, Tuple
+from uuid import UUID
+
+
+class TaskBoundRuns:
+    def __init__(self, on_abandoned: Callable[[Any], None]):
+        self._on_abandoned = on_abandoned
+        self._runs: Dict[UUID, Tuple[Any, Optional[asyncio.Task], Optional[Callable[[asyncio.Task], None]]]] = {}
+
+    def add(self, run_id: UUID, info: Any) -> None:
+        task = asyncio.current_task()
+        callback = None
+        if task is not None:
+            def callback(_task: asyncio.Task) -> None:
+                entry = self._runs.pop(run_id, None)
+                if entry is not None:
+                    self._on_abandoned(entry[0])
+
+            task.add_done_callback(callback)
+        self._runs[run_id] = (info, task, callback)
+
+    def pop(self, run_id: UUID) -> Optional[Any]:
+        entry = self._runs.pop(run_id, None)
+        if entry is None:
+            return None
+        info, task, callback = entry
+        if callback is not None:
+            task.remove_done_callback(callback)
+        return info
+
+    def __len__(self) -> int:
+        return len(self._runs)
@@ -0,0 +1,227 @@
+"""
+会话（thread）注册表
+
+之前列出会话靠 `SELECT DISTINCT thread_id FROM checkpoints`，会扫完整个 checkpoint 历史。
+这里维护一张小表 `threads`，在会话创建 / 每次运行结束时 upsert 一行，
+列表查询按 (last_active, thread_id) 做 keyset 分页，可以按 status / intent 过滤，始终走索引范围扫描。
+
+status 取值：running / interrupted / completed / failed / cancelled
+"""
+import base64
+import json
+import logging
+import os
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Tuple
+
+from src.config.mysql import get_aio_pool
+
+logger = logging.getLogger(__name__)
+
+STATUS_RUNNING = "running"
+STATUS_INTERRUPTED = "interrupted"
+STATUS_COMPLETED = "completed"
+STATUS_FAILED = "failed"
+# 流式请求的客户端断开，运行被取消；可以用 resume_cancelled 从最后一个 checkpoint 继续
+STATUS_CANCELLED = "cancelled"
+
+CREATE_TABLE_SQL = """
+CREATE TABLE IF NOT EXISTS threads (
+    thread_id VARCHAR(150) NOT NULL,
+    created_at DATETIME(6) NOT NULL DEFAULT CURRENT_TIMESTAMP(6),
+    last_active DATETIME(6) NOT NULL DEFAULT CURRENT_TIMESTAMP(6),
+    intent VARCHAR(64) NULL,
+    status VARCHAR(32) NOT NULL,
+    last_checkpoint_id VARCHAR(150) NULL,
+    PRIMARY KEY (thread_id),
+    INDEX idx_threads_last_active (last_active, thread_id),
+    INDEX idx_threads_status (status, last_active, thread_id),
+    INDEX idx_threads_intent (intent, last_active, thread_id)
+) CHARACTER SET utf8mb4 COLLATE utf8mb4_unicode_ci;
+"""
+
+UPSERT_SQL = """
+INSERT INTO threads (thread_id, status, intent, last_checkpoint_id)
+VALUES (%s, %s, %s, %s)
+ON DUPLICATE KEY UPDATE
+    status = VALUES(status),
+    intent = COALESCE(VALUES(intent), intent),
+    last_checkpoint_id = COALESCE(VALUES(last_checkpoint_id), last_checkpoint_id),
+    last_active = CURRENT_TIMESTAMP(6)
+"""
+
+_table_ready = False
+
+
+def is_registry_enabled() -> bool:
+    """只有 MySQL checkpointer 下才维护注册表（内存模式没有持久化会话）。"""
+    if os.getenv("THREAD_REGISTRY_ENABLED", "true").lower() != "true":
+        return False
+    return os.getenv("LANGGRAPH_CHECKPOINTER", "mysql").lower() == "mysql"
+
+
+async def ensure_registry_table(pool=None) -> None:
+    global _table_ready
+    if _table_ready:
+        return
+    pool = pool or await get_aio_pool()
+    async with pool.acquire() as conn:
+        async with conn.cursor() as cursor:
+            await cursor.execute(CREATE_TABLE_SQL)
+    _table_ready = True
+
+
+async def upsert_thread(
+    thread_id: str,
+    status: str,
+    intent: Optional[str] = None,
+    last_checkpoint_id: Optional[str] = None,
+    pool=None,
+) -> None:
+    pool = pool or await get_aio_pool()
+    await ensure_registry_table(pool)
+    async with pool.acquire() as conn:
+        async with conn.cursor() as cursor:
+            await cursor.execute(UPSERT_SQL, (thread_id, status, intent, last_checkpoint_id))
+
+
+async def record_thread(
+    thread_id: str,
+    status: str,
+    intent: Optional[str] = None,
+    last_checkpoint_id: Optional[str] = None,
+) -> None:
+    """请求链路上调用：注册表写失败只记日志，不影响对话本身。"""
+    if not is_registry_enabled():
+        return
+    try:
+        await upsert_thread(thread_id, status, intent=intent, last_checkpoint_id=last_checkpoint_id)
+    except Exception as e:
+        logger.warning("Failed to record thread %s (%s): %s", thread_id, status, e)
+
+
+def encode_cursor(last_active: datetime, thread_id: str) -> str:
+    raw = json.dumps([last_active.isoformat(), thread_id], ensure_ascii=False).encode("utf-8")
+    return base64.urlsafe_b64encode(raw).decode("ascii")
+
+
+def decode_cursor(cursor: str) -> Tuple[datetime, str]:
+    try:
+        last_active, thread_id = json.loads(base64.urlsafe_b64decode(cursor.encode("ascii")))
+        return datetime.fromisoformat(last_active), thread_id
+    except Exception as e:
+        raise ValueError(f"Invalid cursor: {cursor}") from e
+
+
+def build_list_query(
+    status: Optional[str] = None,
+    intent: Optional[str] = None,
+    limit: int = 20,
+    cursor: Optional[str] = None,
+) -> Tuple[str, list]:
+    clauses, params = [], []
+    if status:
+        clauses.append("status = %s")
+        params.append(status)
+    if intent:
+        clauses.append("intent = %s")
+        params.append(intent)
+    if cursor:
+        last_active, thread_id = decode_cursor(cursor)
+        clauses.append("(last_active < %s OR (last_active = %s AND thread_id < %s))")
+        params.extend([last_active, last_active, thread_id])
+
+    where = f"WHERE {' AND '.join(clauses)} " if clauses else ""
+    # 多取一行用来判断是否还有下一页
+    params.append(limit + 1)
+    return (
+        "SELECT thread_id, created_at, last_active, intent, status, last_checkpoint_id "
+        f"FROM threads {where}ORDER BY last_active DESC, thread_id DESC LIMIT %s",
+        params,
+    )
+
+
+async def list_threads(
+    status: Optional[str] = None,
+    intent: Optional[str] = None,
+    limit: int = 20,
+    cursor: Optional[str] = None,
+    pool=None,
+) -> Dict[str, Any]:
+    """
+    按最近活跃时间倒序分页列出会话
+
+    Returns:
+        {"items": [...], "next_cursor": str | None}
+    """
+    pool = pool or await get_aio_pool()
+    await ensure_registry_table(pool)
+    query, params = build_list_query(status=status, intent=intent, limit=limit, cursor=cursor)
+    async with pool.acquire() as conn:
+        async with conn.cursor() as cur:
+            await cur.execute(query, params)
+            rows: List[Dict[str, Any]] = list(await cur.fetchall())
+
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        next_cursor = encode_cursor(rows[-1]["last_active"], rows[-1]["thread_id"])
+    return {"items": rows, "next_cursor": next_cursor}
+
+
+async def backfill_from_checkpoints(batch_size: int = 500, pool=None) -> int:
+    """
+    一次性从 checkpoints 表回填注册表（上线注册表之前产生的历史会话）
+
+    按 thread_id 分页扫描，已存在的行不覆盖。
+    """
+    from src.utils.checkpoint_retention import checkpoint_time
+
+    pool = pool or await get_aio_pool()
+    await ensure_registry_table(pool)
+    after, total = "", 0
+    while True:
+        async with pool.acquire() as conn:
+            async with conn.cursor() as cursor:
+                await cursor.execute(
+                    "SELECT thread_id, MIN(checkpoint_id) AS first_id, MAX(checkpoint_id) AS latest_id "
+                    "FROM checkpoints WHERE thread_id > %s GROUP BY thread_id ORDER BY thread_id LIMIT %s",
+                    (after, batch_size),
+                )
+                rows = await cursor.fetchall()
+                if rows:
+                    values = []
+                    for row in rows:
+                        values.extend([
+                            row["thread_id"],
+                            checkpoint_time(row["first_id"]).astimezone().replace(tzinfo=None),
+                            checkpoint_time(row["latest_id"]).astimezone().replace(tzinfo=None),
+                            STATUS_COMPLETED,
+                            row["latest_id"],
+                        ])
+                    placeholders = ", ".join(["(%s, %s, %s, %s, %s)"] * len(rows))
+                    await cursor.execute(
+                        "INSERT IGNORE INTO threads (thread_id, created_at, last_active, status, last_checkpoint_id) "
+                        f"VALUES {placeholders}",
+                        values,
+                    )
+        total += len(rows)
+        if len(rows) < batch_size:
+            return total
+        after = rows[-1]["thread_id"]
+
+
+if __name__ == "__main__":
+    import asyncio
+
+    from src.config.mysql import close_aio_pool
+
+    logging.basicConfig(level=logging.INFO)
+
+    async def main():
+        try:
+            print(f"Backfilled {await backfill_from_checkpoints()} threads")
+        finally:
+            await close_aio_pool()
+
+    asyncio.run(main())
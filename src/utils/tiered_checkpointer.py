@@ -0,0 +1,314 @@
+"""
+分层 checkpointer：进程内热层 + MySQL 持久层
+
+追问 / 澄清（resume_input）往往在上一轮写完几秒后就到达，同一进程却还是要从 MySQL 把整个
+checkpoint（连同 messages 等 blob）重新读一遍。这里在 MySQLSaver 前面加一层有界的 LRU + TTL 缓存：
+
+- 每个 (thread_id, checkpoint_ns) 只缓存最新的一个 checkpoint 及其 pending writes
+- 写入是 write-through：先写 MySQL，成功后再更新热层，热层永远不会比持久层新
+- 读取最新 checkpoint（或恰好是缓存中的 checkpoint_id）时命中热层，其余（时间旅行、list）直接走 MySQL
+
+一致性前提与 LangGraph 本身一致：同一 thread 同一时刻只有一个写入方。
+多 worker 部署时需要按 thread_id 粘性路由，否则其他 worker 写入后本地热层最多会在 TTL 内读到旧状态。
+
+图按请求编译，热层是进程级单例，跨请求共享；缓存内容用独立的序列化器保存副本，
+避免和运行中的图共享可变对象，也不会计入 checkpoint 序列化统计。
+"""
+import logging
+import os
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from typing import Any, AsyncIterator, Dict, Optional, Sequence, Tuple
+
+from langchain_core.runnables import RunnableConfig
+from langgraph.checkpoint.base import (
+    WRITES_IDX_MAP,
+    BaseCheckpointSaver,
+    ChannelVersions,
+    Checkpoint,
+    CheckpointMetadata,
+    CheckpointTuple,
+    get_checkpoint_id,
+    get_checkpoint_metadata,
+)
+from langgraph.checkpoint.serde.jsonplus import JsonPlusSerializer
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_MAX_THREADS = 1000
+DEFAULT_TTL_SECONDS = 300
+
+
+@dataclass
+class _HotEntry:
+    checkpoint_id: str
+    checkpoint: Tuple[str, bytes]
+    metadata: Tuple[str, bytes]
+    parent_checkpoint_id: Optional[str]
+    expires_at: float
+    # (task_id, idx) -> (task_id, channel, typed value)
+    writes: Dict[Tuple[str, int], Tuple[str, str, Tuple[str, bytes]]] = field(default_factory=dict)
+
+
+class HotCheckpointTier:
+    """按 (thread_id, checkpoint_ns) 缓存最新 checkpoint 的有界 LRU，条目超过 TTL 视为不存在"""
+
+    def __init__(self, max_threads: int = DEFAULT_MAX_THREADS, ttl_seconds: float = DEFAULT_TTL_SECONDS):
+        self.max_threads = max_threads
+        self.ttl_seconds = ttl_seconds
+        self.serde = JsonPlusSerializer()
+        self._entries: "OrderedDict[Tuple[str, str], _HotEntry]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    def get(self, thread_id: str, checkpoint_ns: str, checkpoint_id: Optional[str] = None) -> Optional[CheckpointTuple]:
+        key = (thread_id, checkpoint_ns)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry.expires_at <= time.monotonic():
+                del self._entries[key]
+                self.expirations += 1
+                entry = None
+            if entry is None or (checkpoint_id and checkpoint_id != entry.checkpoint_id):
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            writes = list(entry.writes.values())
+
+        loads = self.serde.loads_typed
+        return CheckpointTuple(
+            config={
+                "configurable": {
+                    "thread_id": thread_id,
+                    "checkpoint_ns": checkpoint_ns,
+                    "checkpoint_id": entry.checkpoint_id,
+                }
+            },
+            checkpoint=loads(entry.checkpoint),
+            metadata=loads(entry.metadata),
+            parent_config=(
+                {
+                    "configurable": {
+                        "thread_id": thread_id,
+                        "checkpoint_ns": checkpoint_ns,
+                        "checkpoint_id": entry.parent_checkpoint_id,
+                    }
+                }
+                if entry.parent_checkpoint_id
+                else None
+            ),
+            pending_writes=[(task_id, channel, loads(value)) for task_id, channel, value in writes],
+        )
+
+    def put(
+        self,
+        thread_id: str,
+        checkpoint_ns: str,
+        checkpoint: Checkpoint,
+        metadata: CheckpointMetadata,
+        parent_checkpoint_id: Optional[str],
+        pending_writes: Sequence[Tuple[str, str, Any]] = (),
+    ) -> None:
+        if self.max_threads <= 0:
+            return
+        dumps = self.serde.dumps_typed
+        entry = _HotEntry(
+            checkpoint_id=checkpoint["id"],
+            checkpoint=dumps(checkpoint),
+            metadata=dumps(metadata),
+            parent_checkpoint_id=parent_checkpoint_id,
+            expires_at=time.monotonic() + self.ttl_seconds,
+        )
+        counters: Dict[str, int] = {}
+        for task_id, channel, value in pending_writes:
+            idx = counters.get(task_id, 0)
+            counters[task_id] = idx + 1
+            entry.writes[(task_id, WRITES_IDX_MAP.get(channel, idx))] = (task_id, channel, dumps(value))
+
+        key = (thread_id, checkpoint_ns)
+        with self._lock:
+            self._entries[key] = entry
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_threads:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def add_writes(
+        self,
+        thread_id: str,
+        checkpoint_ns: str,
+        checkpoint_id: str,
+        writes: Sequence[Tuple[str, Any]],
+        task_id: str,
+    ) -> None:
+        """语义与 InMemorySaver.put_writes 一致：特殊 channel 覆盖，普通写入不重复"""
+        with self._lock:
+            entry = self._entries.get((thread_id, checkpoint_ns))
+            if entry is None or entry.checkpoint_id != checkpoint_id:
+                return
+            for idx, (channel, value) in enumerate(writes):
+                inner_key = (task_id, WRITES_IDX_MAP.get(channel, idx))
+                if inner_key[1] >= 0 and inner_key in entry.writes:
+                    continue
+                entry.writes[inner_key] = (task_id, channel, self.serde.dumps_typed(value))
+
+    def invalidate(self, thread_id: str) -> None:
+        with self._lock:
+            for key in [key for key in self._entries if key[0] == thread_id]:
+                del self._entries[key]
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "max_threads": self.max_threads,
+                "ttl_seconds": self.ttl_seconds,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / lookups, 4) if lookups else None,
+                "evictions": self.evictions,
+                "expirations": self.expirations,
+            }
+
+
+class TieredCheckpointer(BaseCheckpointSaver):
+    """热层 + 持久层；未缓存的操作（list、指定历史 checkpoint、同步接口）全部委托给持久层"""
+
+    def __init__(self, durable: BaseCheckpointSaver, hot: HotCheckpointTier):
+        super().__init__(serde=durable.serde)
+        self.durable = durable
+        self.hot = hot
+
+    def __getattr__(self, name: str) -> Any:
+        # conn 等持久层特有属性（cleanup_runtime / time_travel_utils 会用到）
+        if name == "durable":
+            raise AttributeError(name)
+        return getattr(self.durable, name)
+
+    @property
+    def config_specs(self):
+        return self.durable.config_specs
+
+    def get_next_version(self, current, channel):
+        # 版本号格式由持久层决定，必须保持一致
+        return self.durable.get_next_version(current, channel)
+
+    async def aget_tuple(self, config: RunnableConfig) -> Optional[CheckpointTuple]:
+        configurable = config["configurable"]
+        thread_id = configurable["thread_id"]
+        checkpoint_ns = configurable.get("checkpoint_ns", "")
+        checkpoint_id = get_checkpoint_id(config)
+
+        cached = self.hot.get(thread_id, checkpoint_ns, checkpoint_id)
+        if cached is not None:
+            return cached
+
+        result = await self.durable.aget_tuple(config)
+        if result is not None and not checkpoint_id:
+            # 从 MySQL 读到的最新 checkpoint 顺便预热
+            parent_config = result.parent_config or {}
+            self.hot.put(
+                thread_id,
+                checkpoint_ns,
+                result.checkpoint,
+                result.metadata,
+                (parent_config.get("configurable") or {}).get("checkpoint_id"),
+                result.pending_writes or (),
+            )
+        return result
+
+    async def alist(
+        self,
+        config: Optional[RunnableConfig],
+        *,
+        filter: Optional[Dict[str, Any]] = None,
+        before: Optional[RunnableConfig] = None,
+        limit: Optional[int] = None,
+    ) -> AsyncIterator[CheckpointTuple]:
+        async for item in self.durable.alist(config, filter=filter, before=before, limit=limit):
+            yield item
+
+    async def aput(
+        self,
+        config: RunnableConfig,
+        checkpoint: Checkpoint,
+        metadata: CheckpointMetadata,
+        new_versions: ChannelVersions,
+    ) -> RunnableConfig:
+        next_config = await self.durable.aput(config, checkpoint, metadata, new_versions)
+        configurable = config["configurable"]
+        self.hot.put(
+            configurable["thread_id"],
+            configurable.get("checkpoint_ns", ""),
+            checkpoint,
+            get_checkpoint_metadata(config, metadata),
+            configurable.get("checkpoint_id"),
+        )
+        return next_config
+
+    async def aput_writes(
+        self,
+        config: RunnableConfig,
+        writes: Sequence[Tuple[str, Any]],
+        task_id: str,
+        task_path: str = "",
+    ) -> None:
+        await self.durable.aput_writes(config, writes, task_id, task_path)
+        configurable = config["configurable"]
+        self.hot.add_writes(
+            configurable["thread_id"],
+            configurable.get("checkpoint_ns", ""),
+            configurable["checkpoint_id"],
+            writes,
+            task_id,
+        )
+
+    async def adelete_thread(self, thread_id: str) -> None:
+        self.hot.invalidate(thread_id)
+        await self.durable.adelete_thread(thread_id)
+
+    def get_tuple(self, config: RunnableConfig) -> Optional[CheckpointTuple]:
+        return self.durable.get_tuple(config)
+
+    def list(self, config, *, filter=None, before=None, limit=None):
+        return self.durable.list(config, filter=filter, before=before, limit=limit)
+
+    def put(self, config, checkpoint, metadata, new_versions) -> RunnableConfig:
+        self.hot.invalidate(config["configurable"]["thread_id"])
+        return self.durable.put(config, checkpoint, metadata, new_versions)
+
+    def put_writes(self, config, writes, task_id, task_path: str = "") -> None:
+        self.hot.invalidate(config["configurable"]["thread_id"])
+        return self.durable.put_writes(config, writes, task_id, task_path)
+
+    def delete_thread(self, thread_id: str) -> None:
+        self.hot.invalidate(thread_id)
+        return self.durable.delete_thread(thread_id)
+
+
+_hot_tier: Optional[HotCheckpointTier] = None
+
+
+def get_hot_tier() -> HotCheckpointTier:
+    global _hot_tier
+    if _hot_tier is None:
+        _hot_tier = HotCheckpointTier(
+            max_threads=int(os.getenv("CHECKPOINT_HOT_TIER_MAX_THREADS", DEFAULT_MAX_THREADS)),
+            ttl_seconds=float(os.getenv("CHECKPOINT_HOT_TIER_TTL_SECONDS", DEFAULT_TTL_SECONDS)),
+        )
+    return _hot_tier
+
+
+def is_hot_tier_enabled() -> bool:
+    return int(os.getenv("CHECKPOINT_HOT_TIER_MAX_THREADS", DEFAULT_MAX_THREADS)) > 0
+
+
+def get_hot_tier_stats() -> Dict[str, Any]:
+    return get_hot_tier().stats()
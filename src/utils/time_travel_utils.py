@@ -1,48 +1,53 @@
 """
 Time Travel utilities for LangGraph state management.
 """
+import logging
+import os
 from typing import List, Dict, Any, Optional
 from datetime import datetime
 import json
 
+from src.utils.thread_registry import is_registry_enabled, list_threads
 
-async def get_all_thread_ids(graph) -> List[str]:
+logger = logging.getLogger(__name__)
+
+
+async def get_all_thread_ids(graph, limit: int = 200) -> List[str]:
     """
-    获取数据库中所有的 thread_id
+    获取最近活跃的 thread_id（按 last_active 倒序）
+
+    MySQL checkpointer 且启用注册表时读 `threads` 注册表（索引范围查询）；
+    注册表未启用或读取失败时退回扫描 checkpoints 表（仅单库 MySQL checkpointer 支持）。
     
     Args:
         graph: 编译后的 LangGraph
+        limit: 最多返回的会话数
         
     Returns:
-        所有 thread_id 列表
+        thread_id 列表
     """
+    if is_registry_enabled():
+        try:
+            page = await list_threads(limit=limit)
+            return [row["thread_id"] for row in page["items"]]
+        except Exception as e:
+            logger.warning("Failed to read thread registry, falling back to checkpoints scan: %s", e)
+
+    checkpointer = getattr(graph, "checkpointer", None)
+    # 内存 checkpointer 没有持久化会话；分片部署下没有单一连接，只能依赖注册表
+    if os.getenv("LANGGRAPH_CHECKPOINTER", "mysql").lower() != "mysql" or not hasattr(checkpointer, "conn"):
+        return []
+
     try:
-        checkpointer = graph.checkpointer
-        
-        # 检查是否是 AsyncMySQLSaver (AIOMySQLSaver)
-        if not hasattr(checkpointer, 'conn'):
-            return []
-        
-        # 直接查询数据库获取所有不同的 thread_id
-        # 使用 aiomysql 游标
         async with checkpointer.conn.cursor() as cursor:
-            # 检查表是否存在
-            # 注意: LangGraph MySQL Saver 的表名通常是 checkpoints
-            try:
-                await cursor.execute("""
-                    SELECT DISTINCT thread_id 
-                    FROM checkpoints
-                """)
-                rows = await cursor.fetchall()
-                # 默认 cursor 返回的是元组，不是字典
-                return [row[0] for row in rows]
-            except Exception as e:
-                # 表可能不存在
-                print(f"查询 thread_id 失败 (可能是表不存在): {e}")
-                return []
+            await cursor.execute("SELECT DISTINCT thread_id FROM checkpoints LIMIT %s", (limit,))
+            rows = await cursor.fetchall()
     except Exception as e:
-        print(f"获取 thread_id 列表失败: {e}")
+        # 表可能不存在
+        logger.warning("Failed to scan thread ids from checkpoints: %s", e)
         return []
+    # 默认 cursor 返回的是元组，不是字典
+    return [row[0] if isinstance(row, (tuple, list)) else row["thread_id"] for row in rows]
 
 
 async def get_state_history(graph, thread_id: str) -> List[Dict[str, Any]]:
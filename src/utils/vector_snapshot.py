@@ -0,0 +1,217 @@
+"""
+内存映射向量快照
+
+多个 uvicorn / gunicorn worker 各自加载一份向量会让单机内存随 worker 数线性增长。
+这里定义一个固定布局的二进制快照，worker 以只读 mmap 打开，
+同一台机器上由 OS page cache 只保留一份物理内存。
+
+目录布局（每个快照名一个目录）::
+
+    <base_dir>/<name>/
+        CURRENT               # 当前代号，写新快照后通过 rename 原子切换
+        <generation>.vec      # 向量文件
+        <generation>.payload  # payload 边车文件
+
+`.vec` 文件布局（小端）::
+
+    magic(8s) = b"TTVEC001" | dim(u32) | reserved(u32) | count(u64) | reserved(u64)
+    float32[count][dim]     # 写入时已做 L2 归一化，读端零拷贝直接用于点积
+
+`.payload` 文件布局（小端）::
+
+    magic(8s) = b"TTPAY001" | count(u64)
+    offsets: u64[count + 1] # 相对数据区起点的偏移
+    data: 每条记录为 UTF-8 JSON `[id, payload]`，按需解码
+"""
+import fcntl
+import json
+import logging
+import mmap
+import os
+import struct
+import time
+import uuid
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Any, Iterator, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+VEC_MAGIC = b"TTVEC001"
+PAYLOAD_MAGIC = b"TTPAY001"
+VEC_HEADER = struct.Struct("<8sIIQQ")
+PAYLOAD_HEADER = struct.Struct("<8sQ")
+CURRENT_FILE = "CURRENT"
+LOCK_FILE = ".lock"
+# 保留的历史代数；已被 worker mmap 的旧文件即使被删除，inode 也会保留到解除映射为止
+KEEP_GENERATIONS = 2
+
+
+class SnapshotFormatError(ValueError):
+    """快照文件损坏或版本不匹配"""
+
+
+def write_snapshot(
+    snapshot_dir: Path,
+    vectors: np.ndarray,
+    ids: Sequence[Any],
+    payloads: Sequence[dict],
+) -> str:
+    """
+    写入新一代快照并原子切换 CURRENT
+
+    Returns:
+        str: 新快照的代号
+    """
+    vectors = np.asarray(vectors, dtype=np.float32)
+    if vectors.ndim != 2:
+        vectors = vectors.reshape(len(ids), -1)
+    if len(vectors) != len(ids) or len(ids) != len(payloads):
+        raise ValueError("vectors / ids / payloads length mismatch")
+
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    vectors = np.ascontiguousarray(vectors / norms, dtype="<f4")
+    count, dim = vectors.shape
+
+    snapshot_dir.mkdir(parents=True, exist_ok=True)
+    generation = f"{int(time.time() * 1000)}-{uuid.uuid4().hex[:8]}"
+
+    vec_path = snapshot_dir / f"{generation}.vec"
+    with open(vec_path, "wb") as f:
+        f.write(VEC_HEADER.pack(VEC_MAGIC, dim, 0, count, 0))
+        f.write(vectors.tobytes())
+        f.flush()
+        os.fsync(f.fileno())
+
+    records = [
+        json.dumps([id_, payload], ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+        for id_, payload in zip(ids, payloads)
+    ]
+    offsets = [0]
+    for record in records:
+        offsets.append(offsets[-1] + len(record))
+
+    payload_path = snapshot_dir / f"{generation}.payload"
+    with open(payload_path, "wb") as f:
+        f.write(PAYLOAD_HEADER.pack(PAYLOAD_MAGIC, count))
+        f.write(struct.pack(f"<{count + 1}Q", *offsets))
+        for record in records:
+            f.write(record)
+        f.flush()
+        os.fsync(f.fileno())
+
+    # CURRENT 通过 rename 原子替换，读端要么看到旧代号要么看到新代号
+    tmp_current = snapshot_dir / f"{CURRENT_FILE}.tmp-{os.getpid()}"
+    tmp_current.write_text(generation, encoding="utf-8")
+    os.replace(tmp_current, snapshot_dir / CURRENT_FILE)
+
+    _remove_stale_generations(snapshot_dir, keep=generation)
+    logger.info("Wrote vector snapshot %s/%s (%s x %s)", snapshot_dir, generation, count, dim)
+    return generation
+
+
+def _remove_stale_generations(snapshot_dir: Path, keep: str) -> None:
+    generations = sorted({p.stem for p in snapshot_dir.glob("*.vec")}, reverse=True)
+    for generation in generations[KEEP_GENERATIONS:]:
+        if generation == keep:
+            continue
+        for suffix in (".vec", ".payload"):
+            try:
+                (snapshot_dir / f"{generation}{suffix}").unlink()
+            except FileNotFoundError:
+                pass
+
+
+def read_current_generation(snapshot_dir: Path) -> Optional[str]:
+    try:
+        return (snapshot_dir / CURRENT_FILE).read_text(encoding="utf-8").strip() or None
+    except FileNotFoundError:
+        return None
+
+
+def snapshot_age_seconds(snapshot_dir: Path) -> Optional[float]:
+    """距离上次切换 CURRENT 的秒数；快照不存在时返回 None。"""
+    try:
+        return time.time() - (snapshot_dir / CURRENT_FILE).stat().st_mtime
+    except FileNotFoundError:
+        return None
+
+
+@contextmanager
+def exclusive_writer(snapshot_dir: Path) -> Iterator[bool]:
+    """
+    跨进程写锁（非阻塞）
+
+    多个 worker 都会跑刷新任务，只需其中一个真正导出；拿不到锁时返回 False。
+    """
+    snapshot_dir.mkdir(parents=True, exist_ok=True)
+    with open(snapshot_dir / LOCK_FILE, "a") as lock_file:
+        try:
+            fcntl.flock(lock_file.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except BlockingIOError:
+            yield False
+            return
+        try:
+            yield True
+        finally:
+            fcntl.flock(lock_file.fileno(), fcntl.LOCK_UN)
+
+
+def _map_readonly(path: Path) -> mmap.mmap:
+    with open(path, "rb") as f:
+        return mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+
+class MappedVectorSnapshot(Sequence):
+    """
+    只读映射的快照
+
+    - `vectors`: 直接指向 mmap 的 (count, dim) float32 视图，不拷贝
+    - 下标访问返回 `(id, payload)`，只解码被命中的那一条
+    """
+
+    def __init__(self, snapshot_dir: Path, generation: str):
+        self.snapshot_dir = snapshot_dir
+        self.generation = generation
+
+        self._vec_map = _map_readonly(snapshot_dir / f"{generation}.vec")
+        magic, dim, _, count, _ = VEC_HEADER.unpack_from(self._vec_map, 0)
+        if magic != VEC_MAGIC:
+            raise SnapshotFormatError(f"bad vector snapshot magic: {magic!r}")
+        expected = VEC_HEADER.size + count * dim * 4
+        if len(self._vec_map) < expected:
+            raise SnapshotFormatError(f"truncated vector snapshot: {len(self._vec_map)} < {expected}")
+        self.vectors = np.frombuffer(
+            self._vec_map, dtype="<f4", count=count * dim, offset=VEC_HEADER.size
+        ).reshape(count, dim)
+
+        self._payload_map = _map_readonly(snapshot_dir / f"{generation}.payload")
+        magic, payload_count = PAYLOAD_HEADER.unpack_from(self._payload_map, 0)
+        if magic != PAYLOAD_MAGIC or payload_count != count:
+            raise SnapshotFormatError("payload sidecar does not match vector snapshot")
+        self._offsets = np.frombuffer(
+            self._payload_map, dtype="<u8", count=count + 1, offset=PAYLOAD_HEADER.size
+        )
+        self._data_start = PAYLOAD_HEADER.size + (count + 1) * 8
+
+    @classmethod
+    def open_current(cls, snapshot_dir: Path) -> Optional["MappedVectorSnapshot"]:
+        generation = read_current_generation(snapshot_dir)
+        if generation is None:
+            return None
+        return cls(snapshot_dir, generation)
+
+    def __len__(self) -> int:
+        return len(self.vectors)
+
+    def __getitem__(self, index: int) -> Tuple[Any, dict]:
+        start = self._data_start + int(self._offsets[index])
+        end = self._data_start + int(self._offsets[index + 1])
+        id_, payload = json.loads(self._payload_map[start:end].decode("utf-8"))
+        return id_, payload
+
+    def ids(self) -> List[Any]:
+        return [self[i][0] for i in range(len(self))]
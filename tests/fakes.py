@@ -0,0 +1,119 @@
+"""测试共用的假依赖"""
+import asyncio
+from typing import Any, List, Optional
+
+from langchain_core.language_models import BaseChatModel
+from langchain_core.messages import AIMessage, BaseMessage
+from langchain_core.outputs import ChatGeneration, ChatResult
+
+
+class SlowChatModel(BaseChatModel):
+    """每次调用等待 delay 秒后返回 response，用于测试超时 / 取消"""
+
+    delay: float = 1.0
+    response: str = "ok"
+
+    @property
+    def _llm_type(self) -> str:
+        return "slow-fake"
+
+    def _generate(self, messages: List[BaseMessage], stop: Optional[List[str]] = None, **kwargs: Any) -> ChatResult:
+        raise NotImplementedError
+
+    async def _agenerate(self, messages: List[BaseMessage], stop: Optional[List[str]] = None, **kwargs: Any) -> ChatResult:
+        await asyncio.sleep(self.delay)
+        return ChatResult(generations=[ChatGeneration(message=AIMessage(content=self.response))])
+
+
+class FakeCursor:
+    """aiomysql 游标：按 SQL 片段返回预设行，并把执行过的 (语句, 参数) 记到 pool.executed"""
+
+    def __init__(self, pool):
+        self.pool = pool
+        self.rows = []
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        return False
+
+    def _execute(self, query, params):
+        query = " ".join(query.split())
+        params = list(params or [])
+        self.pool.executed.append((query, params))
+        matched = next((rows for marker, rows in self.pool.responses if marker in query), None)
+        self.rows = matched if matched is not None else self.pool.default
+        # 返回受影响行数：命中预设时为行数，否则（DELETE 等）按占位参数个数估算
+        return len(matched) if matched is not None else max(len(params) - 1, 0)
+
+    async def execute(self, query, params=None):
+        return self._execute(query, params)
+
+    async def fetchone(self):
+        return self.rows[0] if self.rows else None
+
+    async def fetchall(self):
+        return self.rows
+
+
+class FakeSyncCursor(FakeCursor):
+    """pymysql 游标，行为同 FakeCursor"""
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def execute(self, query, params=None):
+        return self._execute(query, params)
+
+    def fetchone(self):
+        return self.rows[0] if self.rows else None
+
+    def fetchall(self):
+        return self.rows
+
+
+class FakeConnection:
+    def __init__(self, pool):
+        self.pool = pool
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        return False
+
+    def cursor(self):
+        return FakeCursor(self.pool)
+
+
+class FakeSyncConnection:
+    def __init__(self, pool):
+        self.pool = pool
+
+    def cursor(self):
+        return FakeSyncCursor(self.pool)
+
+
+class FakePool:
+    """
+    假的 aiomysql 连接池
+
+    responses 为 {SQL 片段: 行} 或 [(SQL 片段, 行)]，按声明顺序取第一个出现在语句中的片段；
+    都不匹配时返回 default。connection() 返回共享同一份预设和记录的 pymysql 连接。
+    """
+
+    def __init__(self, responses=None, default=None):
+        responses = responses or []
+        self.responses = list(responses.items()) if isinstance(responses, dict) else list(responses)
+        self.default = default if default is not None else []
+        self.executed = []
+
+    def acquire(self):
+        return FakeConnection(self)
+
+    def connection(self):
+        return FakeSyncConnection(self)
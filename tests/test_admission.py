@@ -0,0 +1,68 @@
+import asyncio
+import unittest
+
+from src.utils.admission import (
+    REASON_QUEUE_FULL,
+    REASON_QUEUE_TIMEOUT,
+    REASON_TENANT_LIMIT,
+    AdmissionController,
+    AdmissionRejected,
+    resolve_tenant,
+)
+
+
+class AdmissionControllerTests(unittest.IsolatedAsyncioTestCase):
+    async def test_tenant_limit_rejects_with_429(self):
+        controller = AdmissionController(max_in_flight=10, tenant_max_in_flight=1, queue_size=10)
+        ticket = await controller.acquire("tenant:a")
+
+        with self.assertRaises(AdmissionRejected) as ctx:
+            await controller.acquire("tenant:a")
+        self.assertEqual(ctx.exception.status_code, 429)
+        self.assertGreaterEqual(ctx.exception.retry_after, 1)
+
+        # 其他租户不受影响
+        other = await controller.acquire("tenant:b")
+        ticket.release()
+        other.release()
+        self.assertEqual(controller.stats()["rejected"], {REASON_TENANT_LIMIT: 1})
+        self.assertEqual(controller.stats()["in_flight"], 0)
+
+    async def test_queued_request_gets_released_slot_in_order(self):
+        controller = AdmissionController(max_in_flight=1, tenant_max_in_flight=0, queue_size=1, queue_timeout=1)
+        first = await controller.acquire("tenant:a")
+        waiter = asyncio.create_task(controller.acquire("tenant:b"))
+        await asyncio.sleep(0)
+        self.assertEqual(controller.stats()["queue_depth"], 1)
+
+        with self.assertRaises(AdmissionRejected) as ctx:
+            await controller.acquire("tenant:c")
+        self.assertEqual((ctx.exception.status_code, ctx.exception.reason), (503, REASON_QUEUE_FULL))
+
+        first.release()
+        second = await waiter
+        self.assertEqual(second.tenant, "tenant:b")
+        self.assertEqual(controller.stats()["in_flight"], 1)
+        second.release()
+        second.release()
+        self.assertEqual(controller.stats()["in_flight"], 0)
+
+    async def test_queue_timeout_returns_503(self):
+        controller = AdmissionController(max_in_flight=1, tenant_max_in_flight=0, queue_size=5, queue_timeout=0.01)
+        async with controller.admit("tenant:a"):
+            with self.assertRaises(AdmissionRejected) as ctx:
+                await controller.acquire("tenant:b")
+        self.assertEqual(ctx.exception.reason, REASON_QUEUE_TIMEOUT)
+        stats = controller.stats()
+        self.assertEqual((stats["in_flight"], stats["queue_depth"], stats["active_tenants"]), (0, 0, 0))
+
+    def test_resolve_tenant_hashes_api_key(self):
+        self.assertEqual(resolve_tenant({"x-tenant-id": "ops"}), "tenant:ops")
+        key_tenant = resolve_tenant({"x-api-key": "secret"}, "1.2.3.4")
+        self.assertTrue(key_tenant.startswith("key:"))
+        self.assertNotIn("secret", key_tenant)
+        self.assertEqual(resolve_tenant({}, "1.2.3.4"), "ip:1.2.3.4")
+
+
+if __name__ == "__main__":
+    unittest.main()
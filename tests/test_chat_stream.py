@@ -0,0 +1,78 @@
+import asyncio
+import os
+import unittest
+from types import SimpleNamespace
+from unittest.mock import AsyncMock, patch
+
+from src.fastapi.app import SSE_HEARTBEAT, ChatRequest, build_graph_input, chat_stream
+from src.utils.thread_registry import STATUS_CANCELLED
+
+
+class ChatStreamDisconnectTests(unittest.IsolatedAsyncioTestCase):
+    async def asyncSetUp(self):
+        self.started = asyncio.Event()
+        self.cancelled = asyncio.Event()
+
+        async def hanging_stream(*args, **kwargs):
+            self.started.set()
+            try:
+                await asyncio.sleep(3600)
+            except asyncio.CancelledError:
+                self.cancelled.set()
+                raise
+            yield "never"
+
+        self.snapshot = SimpleNamespace(tasks=[], values={})
+        self.fake_graph = SimpleNamespace(aget_state=AsyncMock(return_value=self.snapshot))
+        self.record_snapshot = AsyncMock()
+        self.patches = [
+            patch.dict(os.environ, {"SSE_HEARTBEAT_SECONDS": "0.01"}),
+            patch("src.fastapi.app.build_graph", new=AsyncMock(return_value=self.fake_graph)),
+            patch("src.fastapi.app.cleanup_runtime", new=AsyncMock()),
+            patch("src.fastapi.app.record_thread", new=AsyncMock()),
+            patch("src.fastapi.app.record_thread_snapshot", new=self.record_snapshot),
+            patch("src.fastapi.app.emit_graph_stream", new=hanging_stream),
+        ]
+        for p in self.patches:
+            p.start()
+
+    async def asyncTearDown(self):
+        for p in reversed(self.patches):
+            p.stop()
+
+    async def test_heartbeat_then_cancel_on_disconnect(self):
+        disconnected = AsyncMock(side_effect=[False, True])
+        response = await chat_stream(
+            ChatRequest(query="用户问题", thread_id="thread-1"),
+            SimpleNamespace(is_disconnected=disconnected, headers={}, client=None),
+        )
+
+        events = [event async for event in response.body_iterator]
+
+        self.assertTrue(events[0].startswith("event: metadata"))
+        self.assertEqual(events[-1], SSE_HEARTBEAT)
+        self.assertTrue(self.cancelled.is_set())
+        self.record_snapshot.assert_awaited_with("thread-1", self.snapshot, STATUS_CANCELLED)
+        self.assertEqual(response.headers["x-accel-buffering"], "no")
+
+    async def test_closing_generator_cancels_run(self):
+        response = await chat_stream(
+            ChatRequest(query="用户问题", thread_id="thread-1"),
+            SimpleNamespace(is_disconnected=AsyncMock(return_value=False), headers={}, client=None),
+        )
+        iterator = response.body_iterator
+        await iterator.__anext__()
+        await self.started.wait()
+
+        # Starlette 发送失败时会关闭生成器
+        await iterator.aclose()
+
+        self.assertTrue(self.cancelled.is_set())
+        self.record_snapshot.assert_awaited_with("thread-1", self.snapshot, STATUS_CANCELLED)
+
+    def test_resume_cancelled_continues_from_checkpoint(self):
+        self.assertIsNone(build_graph_input(ChatRequest(thread_id="thread-1", resume_cancelled=True)))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,38 @@
+import asyncio
+import os
+import unittest
+from unittest.mock import patch
+
+from langgraph.checkpoint.memory import InMemorySaver
+
+from src.fastapi.app import ChatRequest, resolve_durability
+from src.utils.tiered_checkpointer import HotCheckpointTier, TieredCheckpointer
+from tests.test_tiered_checkpointer import _build_graph
+
+
+class CheckpointDurabilityTests(unittest.TestCase):
+    def test_resolve_durability_prefers_request_then_env(self):
+        with patch.dict(os.environ, {"CHECKPOINT_DURABILITY": "exit"}):
+            self.assertEqual(resolve_durability(ChatRequest(query="q", durability="sync")), "sync")
+            self.assertEqual(resolve_durability(ChatRequest(query="q")), "exit")
+        with patch.dict(os.environ, {"CHECKPOINT_DURABILITY": "later"}):
+            self.assertEqual(resolve_durability(ChatRequest(query="q")), "async")
+
+    def test_exit_durability_persists_at_interrupt(self):
+        durable = InMemorySaver()
+        config = {"configurable": {"thread_id": "thread_1"}}
+
+        async def run():
+            graph = _build_graph(TieredCheckpointer(durable, HotCheckpointTier()))
+            await graph.ainvoke({"items": ["a"]}, config, durability="exit")
+            return await _build_graph(durable).aget_state(config)
+
+        state = asyncio.run(run())
+
+        self.assertEqual(state.values["items"], ["a"])
+        self.assertEqual(state.next, ("collect",))
+        self.assertEqual(len(list(durable.list(config))), 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
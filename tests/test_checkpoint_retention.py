@@ -0,0 +1,102 @@
+import asyncio
+import unittest
+from datetime import datetime, timedelta, timezone
+from unittest.mock import AsyncMock, patch
+
+from langgraph.checkpoint.base.id import uuid6
+
+from src.utils.checkpoint_retention import (
+    CheckpointRetention,
+    RetentionPolicy,
+    RetentionReport,
+    checkpoint_time,
+    run_retention,
+)
+from tests.fakes import FakePool
+
+
+class CheckpointRetentionTests(unittest.TestCase):
+    def test_checkpoint_time_decodes_uuid6(self):
+        before = datetime.now(timezone.utc)
+        checkpoint_id = str(uuid6(clock_seq=-1))
+
+        self.assertLess(abs(checkpoint_time(checkpoint_id) - before), timedelta(seconds=5))
+
+    def test_prune_keeps_latest_and_collects_orphan_blobs(self):
+        pool = FakePool({
+            "SELECT checkpoint_ns, checkpoint_id": [
+                {"checkpoint_ns": "", "checkpoint_id": "c3", "channel_versions": '{"messages": "3", "plan": "1"}'},
+                {"checkpoint_ns": "", "checkpoint_id": "c2", "channel_versions": '{"messages": "2", "plan": "1"}'},
+                {"checkpoint_ns": "", "checkpoint_id": "c1", "channel_versions": '{"messages": "1"}'},
+            ],
+            "SELECT checkpoint_ns, channel, version": [
+                {"checkpoint_ns": "", "channel": "messages", "version": "1"},
+                {"checkpoint_ns": "", "channel": "messages", "version": "2"},
+                {"checkpoint_ns": "", "channel": "messages", "version": "3"},
+                {"checkpoint_ns": "", "channel": "plan", "version": "1"},
+            ],
+        })
+        retention = CheckpointRetention(pool, RetentionPolicy(keep_last=2, pause_seconds=0))
+        report = RetentionReport()
+
+        pruned = asyncio.run(retention._prune_thread("t1", report))
+
+        self.assertTrue(pruned)
+        deletes = [(q, p) for q, p in pool.executed if q.startswith("DELETE")]
+        self.assertIn(("DELETE FROM checkpoints WHERE thread_id = %s AND checkpoint_id IN (%s)", ["t1", "c1"]), deletes)
+        blob_delete = [p for q, p in deletes if q.startswith("DELETE FROM checkpoint_blobs")]
+        self.assertEqual(blob_delete, [["t1", "", "messages", "1"]])
+        self.assertEqual(report.checkpoints_deleted, 1)
+
+    def test_expired_thread_is_removed_from_registry(self):
+        pool = FakePool({})
+        registry_pool = FakePool({})
+        retention = CheckpointRetention(pool, RetentionPolicy(idle_days=30, archive_dir=None, pause_seconds=0), registry_pool)
+        report = RetentionReport()
+
+        with patch("src.utils.checkpoint_retention.checkpoint_time",
+                   return_value=datetime.now(timezone.utc) - timedelta(days=31)):
+            asyncio.run(retention._apply("t1", "c1", report))
+
+        self.assertEqual(report.threads_expired, 1)
+        self.assertIn(("DELETE FROM threads WHERE thread_id = %s", ["t1"]), registry_pool.executed)
+        self.assertFalse(any(q.startswith("DELETE FROM threads") for q, _ in pool.executed))
+
+    def test_dry_run_reports_planned_counts_separately(self):
+        pool = FakePool({"SELECT COUNT(*)": [{"n": 3}]})
+        registry_pool = FakePool({})
+        policy = RetentionPolicy(idle_days=30, archive_dir="/tmp/unused", pause_seconds=0, dry_run=True)
+        retention = CheckpointRetention(pool, policy, registry_pool)
+        report = RetentionReport(dry_run=True)
+
+        with patch("src.utils.checkpoint_retention.checkpoint_time",
+                   return_value=datetime.now(timezone.utc) - timedelta(days=31)):
+            asyncio.run(retention._apply("t1", "c1", report))
+
+        self.assertEqual((report.threads_expired, report.threads_archived, report.checkpoints_deleted), (0, 0, 0))
+        self.assertEqual((report.planned.threads_expired, report.planned.threads_archived), (1, 1))
+        self.assertEqual(report.planned.checkpoints_deleted, 3)
+        self.assertEqual(report.planned.registry_deleted, 1)
+        self.assertFalse(any(q.startswith("DELETE") for q, _ in pool.executed + registry_pool.executed))
+
+    def test_run_retention_covers_every_shard_primary(self):
+        shards, legacy = [object(), object()], object()
+        seen = []
+
+        async def run_once(retention):
+            seen.append((retention.pool, retention.registry_pool))
+            return RetentionReport()
+
+        with patch("src.utils.checkpoint_retention.is_sharding_enabled", return_value=True), \
+             patch("src.utils.checkpoint_retention.get_primary_pools", new=AsyncMock(return_value=shards)), \
+             patch("src.utils.checkpoint_retention.get_aio_pool", new=AsyncMock(return_value=legacy)), \
+             patch("src.utils.checkpoint_retention.is_registry_enabled", return_value=True), \
+             patch.object(CheckpointRetention, "run_once", run_once):
+            reports = asyncio.run(run_retention())
+
+        self.assertEqual(len(reports), 2)
+        self.assertEqual(seen, [(shards[0], legacy), (shards[1], legacy)])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,62 @@
+import unittest
+from datetime import datetime
+
+from langchain_core.messages import AIMessage, HumanMessage
+from langgraph.checkpoint.serde.jsonplus import JsonPlusSerializer
+
+from src.models.execution_result import PlanExecutionSummary, StepExecutionResult, StepStatus, TokenUsage
+from src.utils.checkpoint_serde import CompactSerializer
+
+
+def make_step_results(count=3, response_len=2000):
+    return [
+        StepExecutionResult(
+            step_index=i,
+            step_description=f"查询订单状态 {i}",
+            status=StepStatus.SUCCESS,
+            agent_response="订单已发货，预计明天送达。" * (response_len // 13),
+            start_time=datetime(2024, 5, 1, 12, 0, i),
+            token_usage=TokenUsage(prompt_tokens=100, completion_tokens=20, total_tokens=120),
+        )
+        for i in range(count)
+    ]
+
+
+class CompactSerializerTests(unittest.TestCase):
+    def setUp(self):
+        self.serde = CompactSerializer(compress_threshold=1024)
+
+    def test_roundtrip_preserves_models_and_messages(self):
+        value = {
+            "step_results": make_step_results(count=2, response_len=50),
+            "execution_summary": PlanExecutionSummary(query="我的订单呢", total_steps=2),
+            "messages": [HumanMessage(content="你好"), AIMessage(content="您好")],
+        }
+
+        restored = self.serde.loads_typed(self.serde.dumps_typed(value))
+
+        self.assertEqual(restored["step_results"], value["step_results"])
+        self.assertEqual(restored["execution_summary"], value["execution_summary"])
+        self.assertEqual(restored["messages"][1].content, "您好")
+
+    def test_large_payload_is_compressed_and_smaller_than_jsonplus(self):
+        value = make_step_results()
+
+        type_, data = self.serde.dumps_typed(value)
+        _, baseline = JsonPlusSerializer().dumps_typed(value)
+
+        self.assertEqual(type_, "msgpack+zstd")
+        self.assertLess(len(data), len(baseline) / 4)
+        self.assertEqual(self.serde.loads_typed((type_, data)), value)
+        self.assertEqual(self.serde.stats.snapshot()["compressed_blobs"], 1)
+
+    def test_reads_checkpoints_written_by_jsonplus(self):
+        value = {"step_results": make_step_results(count=1, response_len=20), "current_step": 1}
+
+        restored = self.serde.loads_typed(JsonPlusSerializer().dumps_typed(value))
+
+        self.assertEqual(restored, value)
+
+
+if __name__ == "__main__":
+    unittest.main()
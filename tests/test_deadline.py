@@ -0,0 +1,78 @@
+import asyncio
+import time
+import unittest
+from unittest.mock import Mock, patch
+
+from langgraph.types import Command
+
+from src.models.execution_result import StepStatus
+from src.nodes.plan_nodes import plan_executor_node
+from src.nodes.response_generator_node import response_generator_node
+from src.utils.deadline import DEADLINE_KEY, DeadlineExceeded, call_timeout, with_deadline
+
+
+def _config(remaining: float) -> dict:
+    return {"configurable": {"thread_id": "t1", DEADLINE_KEY: time.time() + remaining}}
+
+
+class DeadlineTests(unittest.IsolatedAsyncioTestCase):
+    async def test_call_timeout_is_capped_by_remaining_time(self):
+        self.assertEqual(call_timeout(None, "tool"), 30)
+        self.assertLessEqual(call_timeout(_config(2), "tool"), 2)
+
+    async def test_with_deadline_cancels_slow_call(self):
+        cancelled = asyncio.Event()
+
+        async def slow():
+            try:
+                await asyncio.sleep(10)
+            except asyncio.CancelledError:
+                cancelled.set()
+                raise
+
+        with self.assertRaises(DeadlineExceeded):
+            await with_deadline(slow(), _config(0.05), "tool")
+        self.assertTrue(cancelled.is_set())
+
+    async def test_expired_deadline_skips_remaining_steps(self):
+        state = {"plan": ["查询商户", "查询日志"], "current_step": 0, "step_results": [], "messages": []}
+
+        result = await plan_executor_node(state, tools=[], config=_config(-1))
+
+        self.assertIsInstance(result, Command)
+        self.assertEqual(result.goto, "finalize_execution_node")
+        self.assertEqual(result.update["current_step"], 2)
+        self.assertEqual([r.status for r in result.update["step_results"]], [StepStatus.SKIPPED] * 2)
+
+    async def test_timed_out_and_skipped_steps_are_logged(self):
+        async def timeout(awaitable, config, kind):
+            awaitable.close()
+            raise DeadlineExceeded(kind, 1)
+
+        writer = Mock()
+        state = {"plan": ["查询商户"], "current_step": 0, "step_results": [], "messages": []}
+        with patch("src.nodes.plan_nodes.get_gpt_model", return_value=Mock()), \
+             patch("src.nodes.plan_nodes.with_deadline", new=timeout), \
+             patch("src.utils.execution_log.get_execution_log_writer", return_value=writer):
+            await plan_executor_node(state, tools=[], config=_config(60))
+            await plan_executor_node(
+                {**state, "plan": ["查询商户", "查询日志"], "current_step": 1}, tools=[], config=_config(-1)
+            )
+
+        rows = [call.args for call in writer.submit.call_args_list]
+        self.assertEqual([table for table, _ in rows], ["execution_steps", "execution_steps"])
+        # (thread_id, intent, is_sop, step_index, step_description, status, ...)
+        self.assertEqual([row[3:6] for _, row in rows], [(0, "查询商户", "failed"), (1, "查询日志", "skipped")])
+
+    async def test_response_generator_returns_partial_summary_on_timeout(self):
+        state = {"original_query": "商户不展示", "step_results": []}
+        with patch("src.nodes.response_generator_node.get_gpt_model", return_value=Mock()), \
+             patch("src.nodes.response_generator_node.get_prompt", return_value="{query}"):
+            result = await response_generator_node(state, config=_config(-1))
+
+        self.assertIn("处理超时", result["final_response"])
+        self.assertIn("未执行任何步骤", result["final_response"])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,95 @@
+import asyncio
+import unittest
+from datetime import datetime
+from unittest.mock import AsyncMock, patch
+
+from fastapi import HTTPException
+
+from src.models.execution_result import StepExecutionResult, StepStatus, TokenUsage, ToolCall
+from src.utils.execution_log import STEP_COLUMNS, ExecutionLogWriter, build_insert, step_row
+
+
+class ExecutionLogTests(unittest.TestCase):
+    def test_step_row_flattens_tools_and_tokens(self):
+        result = StepExecutionResult(
+            step_index=1,
+            step_description="查询订单",
+            status=StepStatus.SUCCESS,
+            tool_calls=[ToolCall(tool_name="query_order"), ToolCall(tool_name="query_refund")],
+            end_time=datetime(2024, 5, 1, 12, 0),
+            duration_ms=120.5,
+            token_usage=TokenUsage(prompt_tokens=10, completion_tokens=5, total_tokens=15),
+        )
+
+        row = step_row("thread_1", "order_query", True, result)
+
+        self.assertEqual(len(row), len(STEP_COLUMNS))
+        self.assertEqual(
+            row,
+            ("thread_1", "order_query", 1, 1, "查询订单", "success", "query_order,query_refund",
+             120.5, 10, 5, 15, datetime(2024, 5, 1, 12, 0)),
+        )
+
+    def test_build_insert_is_multi_row(self):
+        query, params = build_insert("execution_steps", [tuple(range(12)), tuple(range(12, 24))])
+
+        self.assertEqual(query.count("(%s, %s"), 2)
+        self.assertEqual(params, list(range(24)))
+
+    def test_submit_is_noop_until_started(self):
+        writer = ExecutionLogWriter()
+
+        writer.submit("execution_steps", ("thread_1",))
+        asyncio.run(writer.close())
+
+        self.assertFalse(writer.running)
+
+    def test_close_waits_for_in_progress_flush(self):
+        writer = ExecutionLogWriter(batch_size=2, flush_interval=0.01)
+        written = []
+
+        async def slow_flush(batch):
+            await asyncio.sleep(0.05)
+            written.extend(batch)
+
+        async def run():
+            writer._queue = asyncio.Queue()
+            writer._task = asyncio.create_task(writer._run())
+            for index in range(3):
+                writer.submit("execution_steps", (index,))
+            # 让后台任务取走第一批并进入写入
+            await asyncio.sleep(0.01)
+            await writer.close()
+
+        with patch.object(writer, "_flush", side_effect=slow_flush):
+            asyncio.run(run())
+
+        self.assertEqual(sorted(row for _, row in written), [(0,), (1,), (2,)])
+        self.assertFalse(writer.running)
+
+
+class ThreadStepsEndpointTests(unittest.IsolatedAsyncioTestCase):
+    async def test_thread_steps_endpoint_returns_logged_rows(self):
+        from src.fastapi.app import analytics_thread_steps
+
+        rows = [{"step_index": 0, "status": "failed", "created_at": datetime(2024, 5, 1, 12, 0)}]
+        get_thread_steps = AsyncMock(return_value=rows)
+        with patch("src.fastapi.app.is_execution_log_enabled", return_value=True), \
+             patch("src.fastapi.app.get_thread_steps", new=get_thread_steps):
+            result = await analytics_thread_steps("thread_1")
+
+        get_thread_steps.assert_awaited_once_with("thread_1")
+        self.assertEqual(result["thread_id"], "thread_1")
+        self.assertEqual(result["items"][0]["status"], "failed")
+
+    async def test_thread_steps_endpoint_404_when_log_disabled(self):
+        from src.fastapi.app import analytics_thread_steps
+
+        with patch("src.fastapi.app.is_execution_log_enabled", return_value=False):
+            with self.assertRaises(HTTPException) as ctx:
+                await analytics_thread_steps("thread_1")
+        self.assertEqual(ctx.exception.status_code, 404)
+
+
+if __name__ == "__main__":
+    unittest.main()
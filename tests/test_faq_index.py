@@ -0,0 +1,91 @@
+import tempfile
+import unittest
+from pathlib import Path
+
+import numpy as np
+
+from src.utils.faq_index import LocalVectorIndex
+from src.utils.vector_snapshot import MappedVectorSnapshot, read_current_generation, write_snapshot
+
+
+class LocalVectorIndexTests(unittest.TestCase):
+    def setUp(self):
+        self.vectors = np.array(
+            [
+                [1.0, 0.0, 0.0],
+                [0.0, 2.0, 0.0],
+                [0.7, 0.7, 0.0],
+                [0.0, 0.0, 3.0],
+            ],
+            dtype=np.float32,
+        )
+        self.index = LocalVectorIndex(
+            self.vectors,
+            ids=[10, 11, 12, 13],
+            payloads=[{"question": f"q{i}", "answer": f"a{i}"} for i in range(4)],
+        )
+
+    def test_search_returns_top_k_sorted_by_cosine(self):
+        result = self.index.search([1.0, 0.1, 0.0], limit=2)
+
+        self.assertEqual([p.id for p in result.points], [10, 12])
+        self.assertGreaterEqual(result.points[0].score, result.points[1].score)
+        self.assertEqual(result.points[0].payload["answer"], "a0")
+
+    def test_search_applies_score_threshold(self):
+        result = self.index.search([0.0, 0.0, 1.0], limit=3, score_threshold=0.9)
+
+        self.assertEqual([p.id for p in result.points], [13])
+
+    def test_vectors_are_normalized(self):
+        norms = np.linalg.norm(self.index.vectors, axis=1)
+
+        np.testing.assert_allclose(norms, np.ones(4), rtol=1e-6)
+
+
+class MappedVectorSnapshotTests(unittest.TestCase):
+    def test_snapshot_roundtrip_and_atomic_switch(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            snapshot_dir = Path(tmp) / "faq"
+            first = write_snapshot(
+                snapshot_dir,
+                np.array([[3.0, 4.0], [0.0, 1.0]], dtype=np.float32),
+                ids=[1, "uuid-2"],
+                payloads=[{"answer": "重置密码"}, {"answer": "支付方式"}],
+            )
+            snapshot = MappedVectorSnapshot.open_current(snapshot_dir)
+
+            self.assertEqual(snapshot.generation, first)
+            self.assertEqual(len(snapshot), 2)
+            np.testing.assert_allclose(snapshot.vectors[0], [0.6, 0.8], rtol=1e-6)
+            self.assertEqual(snapshot[1], ("uuid-2", {"answer": "支付方式"}))
+
+            second = write_snapshot(
+                snapshot_dir,
+                np.array([[1.0, 0.0]], dtype=np.float32),
+                ids=[3],
+                payloads=[{"answer": "新FAQ"}],
+            )
+            self.assertEqual(read_current_generation(snapshot_dir), second)
+            # 已映射的旧快照不受新快照写入影响
+            self.assertEqual(len(snapshot), 2)
+
+    def test_index_searches_mapped_snapshot(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            snapshot_dir = Path(tmp) / "faq"
+            write_snapshot(
+                snapshot_dir,
+                np.array([[1.0, 0.0], [0.0, 1.0]], dtype=np.float32),
+                ids=[1, 2],
+                payloads=[{"answer": "a1"}, {"answer": "a2"}],
+            )
+            index = LocalVectorIndex.from_snapshot(MappedVectorSnapshot.open_current(snapshot_dir))
+
+            result = index.search([0.1, 1.0], limit=1)
+
+            self.assertEqual(result.points[0].id, 2)
+            self.assertEqual(result.points[0].payload, {"answer": "a2"})
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,91 @@
+import asyncio
+import unittest
+
+from langchain_core.messages import HumanMessage
+
+from src.utils.llm_hedge import Hedger
+from src.utils.llm_pool import LLMEndpoint, PoolCallback
+from src.utils.llm_scheduler import LLMScheduler, SchedulerCallback
+from tests.fakes import SlowChatModel
+
+
+def _warm(hedger: Hedger, node: str, model: str, seconds: float, samples: int) -> None:
+    for _ in range(samples):
+        hedger._latency[(node, model)].record(seconds)
+
+
+class HedgerTests(unittest.IsolatedAsyncioTestCase):
+    async def test_slow_primary_is_hedged_and_cancelled(self):
+        hedger = Hedger(percentile=0.5, min_samples=3, default_budget=1.0)
+        _warm(hedger, "node", "m", 0.01, 3)
+        primary_cancelled = asyncio.Event()
+
+        async def make_call(alternate):
+            if alternate:
+                return "hedge"
+            try:
+                await asyncio.sleep(10)
+            except asyncio.CancelledError:
+                primary_cancelled.set()
+                raise
+            return "primary"
+
+        self.assertEqual(await hedger.call("node", "m", make_call), "hedge")
+        await asyncio.sleep(0)
+        self.assertTrue(primary_cancelled.is_set())
+        self.assertEqual(hedger.stats()["node"]["hedge_wins"], 1)
+
+    async def test_cancelled_loser_returns_scheduler_slot_and_endpoint(self):
+        hedger = Hedger(percentile=0.5, min_samples=3, default_budget=1.0)
+        _warm(hedger, "node", "m", 0.01, 3)
+        scheduler = LLMScheduler()
+        primary_endpoint = LLMEndpoint("primary", "http://primary/v1", "k")
+        hedge_endpoint = LLMEndpoint("hedge", "http://hedge/v1", "k")
+        models = {
+            False: SlowChatModel(delay=5, response="primary",
+                                 callbacks=[SchedulerCallback(scheduler, "m"), PoolCallback(primary_endpoint)]),
+            True: SlowChatModel(delay=0, response="hedge",
+                                callbacks=[SchedulerCallback(scheduler, "m"), PoolCallback(hedge_endpoint)]),
+        }
+
+        result = await hedger.call("node", "m", lambda alternate: models[alternate].ainvoke([HumanMessage(content="q")]))
+        self.assertEqual(result.content, "hedge")
+
+        # 落败的主请求被取消后，所在任务结束时归还调度名额和端点在途数
+        await asyncio.sleep(0.01)
+        self.assertEqual(scheduler.limiter("m").in_flight, 0)
+        self.assertEqual((primary_endpoint.in_flight, hedge_endpoint.in_flight), (0, 0))
+
+    async def test_no_hedge_without_budget_or_samples(self):
+        hedger = Hedger(percentile=0.5, min_samples=3, default_budget=0.0)
+        calls = []
+
+        async def make_call(alternate):
+            calls.append(alternate)
+            await asyncio.sleep(0.03)
+            return "primary"
+
+        # 样本不足
+        self.assertEqual(await hedger.call("node", "m", make_call), "primary")
+        # 样本足够但没有预算
+        _warm(hedger, "node", "m", 0.001, 3)
+        self.assertEqual(await hedger.call("node", "m", make_call), "primary")
+        self.assertEqual(calls, [False, False])
+        self.assertEqual(hedger.stats()["node"]["hedged"], 0)
+
+    async def test_failed_hedge_falls_back_to_primary(self):
+        hedger = Hedger(percentile=0.5, min_samples=1, default_budget=1.0)
+        _warm(hedger, "node", "m", 0.001, 1)
+
+        async def make_call(alternate):
+            if alternate:
+                raise RuntimeError("alternate down")
+            await asyncio.sleep(0.03)
+            return "primary"
+
+        self.assertEqual(await hedger.call("node", "m", make_call), "primary")
+        self.assertEqual(hedger.stats()["node"]["hedged"], 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,134 @@
+import asyncio
+import json
+import os
+import time
+import unittest
+from unittest.mock import patch
+from uuid import uuid4
+
+from langchain_core.messages import HumanMessage
+
+from src.utils.llm_pool import (
+    DEFAULT_PRIOR_LATENCY,
+    STATE_CLOSED,
+    STATE_HALF_OPEN,
+    STATE_OPEN,
+    CircuitBreaker,
+    LLMEndpoint,
+    LLMPool,
+    PoolCallback,
+    load_endpoints,
+)
+from tests.fakes import SlowChatModel
+
+
+class _BadRequest(Exception):
+    status_code = 400
+
+
+class CircuitBreakerTests(unittest.TestCase):
+    def test_opens_on_consecutive_failures_and_recovers_via_probe(self):
+        breaker = CircuitBreaker(consecutive_failures=2, cooldown_seconds=0.01)
+        breaker.record(False)
+        self.assertEqual(breaker.state, STATE_CLOSED)
+        breaker.record(False)
+        self.assertEqual(breaker.state, STATE_OPEN)
+        self.assertFalse(breaker.allow())
+
+        time.sleep(0.02)
+        self.assertEqual(breaker.current_state(), STATE_HALF_OPEN)
+        self.assertTrue(breaker.allow())
+        # 半开时只放一个探测
+        self.assertFalse(breaker.allow())
+        breaker.record(True)
+        self.assertEqual(breaker.state, STATE_CLOSED)
+
+    def test_opens_on_error_rate(self):
+        breaker = CircuitBreaker(error_rate=0.5, min_requests=4, consecutive_failures=10)
+        for ok in (True, False, True, False):
+            breaker.record(ok)
+        self.assertEqual(breaker.state, STATE_OPEN)
+
+
+class LLMPoolTests(unittest.TestCase):
+    def test_routes_by_weighted_latency_and_skips_open_endpoints(self):
+        fast = LLMEndpoint("fast", "http://fast/v1", "k", latency_ewma=1.0)
+        slow = LLMEndpoint("slow", "http://slow/v1", "k", latency_ewma=3.0)
+        heavy = LLMEndpoint("heavy", "http://heavy/v1", "k", latency_ewma=3.0, weight=4.0)
+        mini_only = LLMEndpoint("mini", "http://mini/v1", "k", models=["gpt-4.1-mini"])
+        pool = LLMPool([fast, slow, heavy, mini_only])
+
+        self.assertEqual([e.name for e in pool.select("gpt-4.1")], ["heavy", "fast", "slow"])
+
+        heavy.breaker._open(time.monotonic())
+        self.assertEqual([e.name for e in pool.select("gpt-4.1")], ["fast", "slow"])
+
+        # 全部熔断时仍然返回（fail-open）
+        fast.breaker._open(time.monotonic())
+        slow.breaker._open(time.monotonic())
+        self.assertEqual(len(pool.select("gpt-4.1")), 3)
+
+    def test_unused_half_open_fallback_keeps_probe_slot(self):
+        primary = LLMEndpoint("primary", "http://primary/v1", "k", latency_ewma=1.0)
+        recovering = LLMEndpoint("recovering", "http://recovering/v1", "k", latency_ewma=3.0,
+                                 breaker=CircuitBreaker(cooldown_seconds=0.01))
+        recovering.breaker._open(time.monotonic())
+        time.sleep(0.02)
+        pool = LLMPool([primary, recovering])
+
+        # 半开端点只作为 fallback 返回，没有被调用，不占用探测名额
+        self.assertEqual([e.name for e in pool.select("gpt-4.1")], ["primary", "recovering"])
+        self.assertEqual([e.name for e in pool.select("gpt-4.1")], ["primary", "recovering"])
+
+        # 真正发出请求时才占用，请求进行中不再被选中
+        async def call_in_flight():
+            await PoolCallback(recovering).on_chat_model_start({}, [], run_id=uuid4())
+            return [e.name for e in pool.select("gpt-4.1")]
+
+        self.assertEqual(asyncio.run(call_in_flight()), ["primary"])
+
+    def test_load_endpoints_reads_key_from_env(self):
+        raw = json.dumps([
+            {"name": "proxy", "base_url": "http://proxy/v1/", "api_key_env": "TEST_POOL_KEY", "models": ["*"]},
+            {"name": "nokey", "base_url": "http://x/v1", "api_key_env": "TEST_POOL_MISSING"},
+        ])
+        with patch.dict(os.environ, {"TEST_POOL_KEY": "secret"}):
+            endpoints = load_endpoints(raw)
+        self.assertEqual([(e.name, e.base_url, e.api_key, e.models) for e in endpoints],
+                         [("proxy", "http://proxy/v1", "secret", None)])
+
+    def test_callback_ignores_client_errors_and_cancellation(self):
+        endpoint = LLMEndpoint("proxy", "http://proxy/v1", "k")
+        callback = PoolCallback(endpoint)
+
+        async def run(error):
+            run_id = uuid4()
+            await callback.on_chat_model_start({}, [], run_id=run_id)
+            await callback.on_llm_error(error, run_id=run_id)
+
+        asyncio.run(run(_BadRequest("context too long")))
+        asyncio.run(run(asyncio.CancelledError()))
+        asyncio.run(run(ConnectionError("reset")))
+        self.assertEqual((endpoint.requests, endpoint.failures, endpoint.in_flight), (2, 1, 0))
+
+    def test_cancelled_calls_release_in_flight_and_probe(self):
+        endpoint = LLMEndpoint("proxy", "http://proxy/v1", "k", breaker=CircuitBreaker(cooldown_seconds=0.01))
+        endpoint.breaker._open(time.monotonic())
+        time.sleep(0.02)
+        llm = SlowChatModel(delay=5, callbacks=[PoolCallback(endpoint)])
+
+        async def run():
+            for _ in range(3):
+                with self.assertRaises(asyncio.TimeoutError):
+                    await asyncio.wait_for(llm.ainvoke([HumanMessage(content="你好")]), 0.05)
+
+        asyncio.run(run())
+        self.assertEqual((endpoint.in_flight, endpoint.requests), (0, 0))
+        self.assertEqual(endpoint.score(), DEFAULT_PRIOR_LATENCY)
+        # 被取消的探测没有结果，探测名额归还，端点仍可被选中
+        self.assertEqual(endpoint.breaker.current_state(), STATE_HALF_OPEN)
+        self.assertTrue(endpoint.breaker.available())
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,101 @@
+import asyncio
+import unittest
+
+from langchain_core.language_models import FakeListChatModel
+from langchain_core.messages import HumanMessage
+
+from src.utils.llm_scheduler import (
+    PRIORITY_BATCH,
+    PRIORITY_INTERACTIVE,
+    PRIORITY_NORMAL,
+    LLMScheduler,
+    ModelLimiter,
+    SchedulerCallback,
+)
+from tests.fakes import SlowChatModel
+
+
+class ModelLimiterTests(unittest.IsolatedAsyncioTestCase):
+    async def test_higher_priority_is_granted_first(self):
+        limiter = ModelLimiter("m", max_concurrency=1, min_concurrency=1)
+        await limiter.acquire(PRIORITY_NORMAL, 10)
+
+        order = []
+
+        async def call(priority, name):
+            await limiter.acquire(priority, 10)
+            order.append(name)
+
+        batch = asyncio.create_task(call(PRIORITY_BATCH, "batch"))
+        interactive = asyncio.create_task(call(PRIORITY_INTERACTIVE, "interactive"))
+        await asyncio.sleep(0)
+        self.assertEqual(limiter.stats()["queue_by_priority"], {"batch": 1, "interactive": 1})
+
+        limiter.release(0.1, 10)
+        await asyncio.sleep(0)
+        limiter.release(0.1, 10)
+        await asyncio.gather(batch, interactive)
+        self.assertEqual(order, ["interactive", "batch"])
+
+    async def test_rate_limit_halves_concurrency_and_success_grows_it(self):
+        limiter = ModelLimiter("m", max_concurrency=8, min_concurrency=2)
+        await limiter.acquire(PRIORITY_NORMAL, 10)
+        limiter.release(1.0, 10, throttled=True, failed=True)
+        self.assertEqual(limiter.concurrency_limit, 4)
+
+        await limiter.acquire(PRIORITY_NORMAL, 10)
+        limiter.release(1.0, 10)
+        self.assertAlmostEqual(limiter.concurrency_limit, 4.25)
+
+    async def test_token_bucket_delays_when_exhausted(self):
+        limiter = ModelLimiter("m", rpm=60, tpm=1000)
+        await limiter.acquire(PRIORITY_NORMAL, 1000)
+
+        waiter = asyncio.create_task(limiter.acquire(PRIORITY_NORMAL, 500))
+        await asyncio.sleep(0.05)
+        self.assertFalse(waiter.done())
+
+        # 实际只用了 100 token，多扣的退回后可以放行
+        limiter.release(0.1, 1000, used_tokens=100)
+        await asyncio.wait_for(waiter, 1)
+
+    async def test_cancelled_waiter_leaves_queue(self):
+        limiter = ModelLimiter("m", max_concurrency=1, min_concurrency=1)
+        await limiter.acquire(PRIORITY_NORMAL, 10)
+        waiter = asyncio.create_task(limiter.acquire(PRIORITY_NORMAL, 10))
+        await asyncio.sleep(0)
+        waiter.cancel()
+        await asyncio.gather(waiter, return_exceptions=True)
+        self.assertEqual(limiter.stats()["queue_depth"], 0)
+
+
+class SchedulerCallbackTests(unittest.IsolatedAsyncioTestCase):
+    async def test_llm_call_acquires_and_releases(self):
+        scheduler = LLMScheduler()
+        llm = FakeListChatModel(responses=["ok"], callbacks=[SchedulerCallback(scheduler, "fake")])
+
+        result = await llm.ainvoke([HumanMessage(content="你好")])
+
+        self.assertEqual(result.content, "ok")
+        stats = scheduler.stats()["fake"]
+        self.assertEqual((stats["granted"], stats["in_flight"]), (1, 0))
+
+    async def test_cancelled_call_returns_its_slot(self):
+        scheduler = LLMScheduler()
+        limiter = scheduler.limiter("slow")
+        limiter.concurrency_limit = 2
+        llm = SlowChatModel(delay=5, callbacks=[SchedulerCallback(scheduler, "slow")])
+
+        for _ in range(3):
+            with self.assertRaises(asyncio.TimeoutError):
+                await asyncio.wait_for(llm.ainvoke([HumanMessage(content="你好")]), 0.05)
+        self.assertEqual(limiter.in_flight, 0)
+        self.assertEqual((limiter.granted, limiter.errors), (3, 0))
+
+        # 名额没有泄漏，后续调用不用排队
+        llm.delay = 0
+        self.assertEqual((await asyncio.wait_for(llm.ainvoke([HumanMessage(content="你好")]), 1)).content, "ok")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,50 @@
+import unittest
+
+from langgraph.checkpoint.base import create_checkpoint, empty_checkpoint
+
+from src.utils.memory_checkpointer import BoundedMemorySaver
+
+
+def _put_history(saver, thread_id, steps):
+    config = {"configurable": {"thread_id": thread_id, "checkpoint_ns": ""}}
+    checkpoint = empty_checkpoint()
+    for step in range(steps):
+        checkpoint = create_checkpoint(checkpoint, None, step)
+        version = str(step + 1)
+        checkpoint["channel_values"] = {"messages": ["x" * 100] * (step + 1)}
+        checkpoint["channel_versions"] = {"messages": version}
+        config = saver.put(config, checkpoint, {"step": step}, {"messages": version})
+    return config
+
+
+class BoundedMemorySaverTests(unittest.TestCase):
+    def test_history_is_truncated_and_orphan_blobs_removed(self):
+        saver = BoundedMemorySaver(keep_last=2)
+
+        config = _put_history(saver, "thread_1", 5)
+
+        self.assertEqual(len(list(saver.list({"configurable": {"thread_id": "thread_1"}}))), 2)
+        self.assertEqual(len(saver.blobs), 2)
+        self.assertEqual(saver.get_tuple(config).checkpoint["channel_values"]["messages"], ["x" * 100] * 5)
+        self.assertEqual(saver.stats()["truncated_checkpoints"], 3)
+        self.assertEqual(saver.stats()["bytes"], sum(len(b[1]) for b in saver.blobs.values()) + sum(
+            len(c[0][1]) + len(c[1][1]) for c in saver.storage["thread_1"][""].values()
+        ))
+
+    def test_lru_eviction_by_thread_count_and_bytes(self):
+        saver = BoundedMemorySaver(max_threads=2, keep_last=1)
+        _put_history(saver, "thread_1", 1)
+        _put_history(saver, "thread_2", 1)
+        _put_history(saver, "thread_3", 1)
+
+        self.assertIsNone(saver.get_tuple({"configurable": {"thread_id": "thread_1", "checkpoint_ns": ""}}))
+        self.assertEqual(saver.stats()["threads"], 2)
+
+        saver.max_bytes = 1
+        _put_history(saver, "thread_4", 1)
+        self.assertEqual(saver.stats()["threads"], 1)
+        self.assertEqual(saver.stats()["evictions"], 3)
+
+
+if __name__ == "__main__":
+    unittest.main()
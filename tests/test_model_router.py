@@ -0,0 +1,68 @@
+import json
+import unittest
+
+from src.config.model_router import ModelRoute, ModelRouter
+from src.utils.model_cascade import get_cascade_stats, run_cascade
+
+
+class ModelRouterTests(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.router = ModelRouter("src/config/model_routes.yaml")
+
+    def test_node_route_and_sop_override(self):
+        route = self.router.get_route("response_generator")
+        self.assertEqual(route.tiers, ["gpt-4.1-mini", "gpt-4.1"])
+        self.assertGreater(route.min_length, 0)
+
+        override = self.router.get_route("response_generator", intent="restore_user_scene")
+        self.assertEqual(override.tiers, ["gpt-4.1"])
+        self.assertEqual(override.min_length, route.min_length)
+
+    def test_unknown_node_uses_defaults(self):
+        self.assertEqual(self.router.get_route("unknown_node").tiers, self.router.defaults["tiers"])
+
+
+class ModelCascadeTests(unittest.IsolatedAsyncioTestCase):
+    async def test_escalates_on_parse_error_and_validation_failure(self):
+        route = ModelRoute(node="cascade_test", tiers=["fast", "mid", "strong"])
+        outputs = {"fast": "not json", "mid": '{"label": "???"}', "strong": '{"label": "ok"}'}
+        called = []
+
+        async def call(model):
+            called.append(model)
+            return json.loads(outputs[model])
+
+        result = await run_cascade(route, call, lambda r: None if r["label"] == "ok" else "unknown_label")
+
+        self.assertEqual(result, {"label": "ok"})
+        self.assertEqual(called, ["fast", "mid", "strong"])
+        stats = get_cascade_stats()["cascade_test"]
+        self.assertEqual(stats["served_by"], {"strong": 1})
+        self.assertEqual(stats["escalations"], {"parse_error": 1, "unknown_label": 1})
+
+    async def test_fast_tier_result_is_kept_when_valid(self):
+        route = ModelRoute(node="cascade_fast", tiers=["fast", "strong"])
+        called = []
+
+        async def call(model):
+            called.append(model)
+            return "answer"
+
+        self.assertEqual(await run_cascade(route, call, lambda r: None), "answer")
+        self.assertEqual(called, ["fast"])
+
+    async def test_returns_last_parsed_result_when_all_tiers_fail(self):
+        route = ModelRoute(node="cascade_exhausted", tiers=["fast", "strong"])
+
+        async def call(model):
+            if model == "strong":
+                raise ValueError("bad json")
+            return "短"
+
+        self.assertEqual(await run_cascade(route, call, lambda r: "too_short"), "短")
+        self.assertEqual(get_cascade_stats()["cascade_exhausted"]["exhausted"], 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
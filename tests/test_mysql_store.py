@@ -0,0 +1,136 @@
+import datetime
+import unittest
+
+from langgraph.store.base import GetOp, ListNamespacesOp, MatchCondition, PutOp
+
+from src.utils.mysql_store import MySQLStore, _build_put_queries
+from tests.fakes import FakePool
+
+
+def _store_db(rows=None):
+    """除 information_schema 查询外都返回 rows"""
+    return FakePool({"information_schema": []}, default=rows)
+
+
+class MySQLStoreBatchTests(unittest.TestCase):
+    def test_put_ops_are_deduplicated_and_split_into_upsert_and_delete(self):
+        queries = _build_put_queries([
+            (0, PutOp(("user", "1"), "profile", {"name": "a"})),
+            (1, PutOp(("user", "1"), "profile", {"name": "b"})),
+            (2, PutOp(("user", "2"), "profile", None)),
+            (3, PutOp(("user", "3"), "prefs", {"lang": "zh"})),
+        ])
+
+        self.assertEqual(len(queries), 2)
+        delete_sql, delete_params = queries[0]
+        upsert_sql, upsert_params = queries[1]
+        self.assertTrue(delete_sql.startswith("DELETE"))
+        self.assertEqual(delete_params, ["user/2", "profile"])
+        self.assertIn("ON DUPLICATE KEY UPDATE", upsert_sql)
+        self.assertEqual(
+            upsert_params,
+            ["user/1", "profile", '{"name": "b"}', "user/3", "prefs", '{"lang": "zh"}'],
+        )
+
+    def test_get_ops_use_single_in_query_and_keep_order(self):
+        now = datetime.datetime(2024, 1, 1)
+        db = _store_db([
+            {"namespace": "user/2", "key": "profile", "value": '{"v": 2}', "created_at": now, "updated_at": now},
+        ])
+        store = MySQLStore(conn=db.connection())
+
+        results = store.batch([
+            GetOp(("user", "1"), "profile"),
+            GetOp(("user", "2"), "profile"),
+        ])
+
+        get_queries = [q for q in db.executed if q[0].startswith("SELECT namespace")]
+        self.assertEqual(len(get_queries), 1)
+        self.assertIn("(namespace, `key`) IN ((%s, %s), (%s, %s))", get_queries[0][0])
+        self.assertIsNone(results[0])
+        self.assertEqual(results[1].value, {"v": 2})
+        self.assertEqual(results[1].namespace, ("user", "2"))
+
+    def test_get_matches_rows_like_the_table_collation(self):
+        now = datetime.datetime(2024, 1, 1)
+        # utf8mb4_unicode_ci 下 IN 查询不区分大小写 / 重音 / 尾部空格，返回的是表里实际存的值
+        db = _store_db([
+            {"namespace": "User/1", "key": "Foo", "value": '{"v": 1}', "created_at": now, "updated_at": now},
+            {"namespace": "user/1", "key": "café", "value": '{"v": 2}', "created_at": now, "updated_at": now},
+        ])
+        store = MySQLStore(conn=db.connection())
+
+        results = store.batch([GetOp(("user", "1"), "foo"), GetOp(("user", "1"), "cafe "), GetOp(("user", "1"), "bar")])
+
+        self.assertEqual(results[0].key, "Foo")
+        self.assertEqual(results[1].value, {"v": 2})
+        self.assertIsNone(results[2])
+
+    def test_list_namespaces_applies_conditions_and_depth(self):
+        db = _store_db([
+            {"namespace": "user/1/memories"},
+            {"namespace": "user/2/memories"},
+            {"namespace": "user/2/prefs"},
+            {"namespace": "team/1/memories"},
+        ])
+        store = MySQLStore(conn=db.connection())
+
+        results = store.batch([
+            ListNamespacesOp(match_conditions=(MatchCondition("suffix", ("memories",)),), max_depth=2),
+        ])
+
+        self.assertEqual(results[0], [("team", "1"), ("user", "1"), ("user", "2")])
+
+
+class MySQLStoreSearchPushdownTests(unittest.TestCase):
+    def setUp(self):
+        self.db = _store_db()
+        self.store = MySQLStore(conn=self.db.connection(), indexed_fields={"status": "string", "priority": "int"})
+
+    def test_setup_adds_generated_columns_and_drops_redundant_index(self):
+        ddl = self.store._migration_statements(
+            columns=["namespace", "key", "value", "f_status"],
+            indexes=["PRIMARY", "idx_namespace"],
+        )
+
+        self.assertIn("ALTER TABLE store_items DROP INDEX idx_namespace", ddl)
+        self.assertFalse(any("ADD COLUMN `f_status`" in q for q in ddl))
+        self.assertTrue(any("ADD COLUMN `f_priority` BIGINT GENERATED ALWAYS" in q for q in ddl))
+        self.assertIn("ALTER TABLE store_items ADD INDEX `idx_f_priority` (`f_priority`, namespace)", ddl)
+
+    def test_filter_uses_generated_columns_and_json_predicates(self):
+        query, params = self.store._build_search_query(
+            ("user", "1"),
+            {"status": "active", "priority": {"$gte": 3}, "meta.source": "faq"},
+            limit=20,
+            offset=40,
+        )
+
+        self.assertIn("(namespace = %s OR namespace LIKE %s)", query)
+        self.assertIn("`f_status` = %s", query)
+        self.assertIn("`f_priority` >= %s", query)
+        self.assertIn("JSON_EXTRACT(value, %s) = CAST(%s AS JSON)", query)
+        self.assertTrue(query.endswith("ORDER BY namespace, `key` LIMIT %s OFFSET %s"))
+        self.assertEqual(
+            params,
+            ["user/1", "user/1/%", "active", 3, '$."meta"."source"', '"faq"', 20, 40],
+        )
+
+    def test_search_page_returns_keyset_cursor(self):
+        now = datetime.datetime(2024, 1, 1)
+        self.db.default = [
+            {"namespace": "user/1", "key": k, "value": "{}", "created_at": now, "updated_at": now}
+            for k in ("a", "b")
+        ]
+
+        items, cursor = self.store.search_page(("user",), limit=2, after=("user/0", "z"))
+
+        query, params = self.db.executed[-1]
+        self.assertIn("(namespace > %s OR (namespace = %s AND `key` > %s))", query)
+        self.assertEqual(params[-4:], ["user/0", "user/0", "z", 2])
+        self.assertEqual([item.key for item in items], ["a", "b"])
+        self.assertEqual(cursor, ("user/1", "b"))
+
+
+if __name__ == "__main__":
+    unittest.main()
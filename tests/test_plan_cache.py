@@ -0,0 +1,132 @@
+import unittest
+from unittest.mock import AsyncMock, Mock, patch
+
+from src.graph_state import Plan
+from src.models.execution_result import PlanExecutionSummary, StepExecutionResult, StepStatus
+from src.utils.plan_cache import PlanCache, make_key, parameterize, to_template
+
+
+def _key(query: str):
+    template, slots = to_template(query)
+    return make_key("other", template), slots
+
+
+class TemplateTests(unittest.TestCase):
+    def test_ids_times_and_numbers_are_masked(self):
+        template, slots = to_template("查询用户123456在2024-05-01 10:00的访问记录")
+        self.assertEqual(template, "查询用户<ID>在<TIME>的访问记录")
+        self.assertEqual(slots, ["123456", "2024-05-01 10:00"])
+        self.assertEqual(to_template("查询用户654321在昨天的访问记录")[0], "查询用户<ID>在<TIME>的访问记录")
+        self.assertEqual(to_template("查询前10条")[0], "查询前<NUM>条")
+
+    def test_plan_with_foreign_id_is_not_parameterizable(self):
+        _, slots = to_template("商户1002为什么没展示")
+        self.assertEqual(parameterize(["检查商户1002的召回"], slots), ["检查商户{{slot_0}}的召回"])
+        self.assertIsNone(parameterize(["检查商户1003的召回"], slots))
+
+
+class PlanCacheTests(unittest.TestCase):
+    def test_successful_plan_is_rebound_for_new_slots(self):
+        cache = PlanCache()
+        key, slots = _key("查询用户123456在2024-05-01的访问记录")
+        self.assertIsNone(cache.lookup(key, slots))
+        cache.record_outcome(key, slots, ["查询用户123456在2024-05-01的访问日志"], success=True, hit=False)
+
+        new_key, new_slots = _key("查询用户654321在2024-06-02的访问记录")
+        self.assertEqual(new_key, key)
+        self.assertEqual(cache.lookup(new_key, new_slots), ["查询用户654321在2024-06-02的访问日志"])
+
+        stats = cache.stats()["templates"][key]
+        self.assertEqual((stats["lookups"], stats["hits"]), (2, 1))
+        self.assertEqual(stats["hit_rate"], 0.5)
+
+    def test_failed_plans_are_not_stored_and_failed_hits_invalidate(self):
+        cache = PlanCache()
+        key, slots = _key("商户1002为什么没展示")
+        cache.record_outcome(key, slots, ["检查商户1002的召回"], success=False, hit=False)
+        self.assertIsNone(cache.lookup(key, slots))
+
+        cache.record_outcome(key, slots, ["检查商户1002的召回"], success=True, hit=False)
+        self.assertIsNotNone(cache.lookup(key, slots))
+        cache.record_outcome(key, slots, ["检查商户1002的召回"], success=False, hit=True)
+        self.assertIsNone(cache.lookup(key, slots))
+
+        stats = cache.stats()["templates"][key]
+        self.assertEqual(stats["success_rate"], round(1 / 3, 4))
+        self.assertEqual(stats["invalidations"], 1)
+
+
+class PlanningNodeCacheTests(unittest.IsolatedAsyncioTestCase):
+    async def test_cache_hit_skips_planning_llm(self):
+        from src.nodes.plan_nodes import finalize_execution_node, planning_node
+
+        cache = PlanCache()
+        key, slots = _key("商户1002为什么没展示")
+        cache.record_outcome(key, slots, ["检查商户1002的召回"], success=True, hit=False)
+        get_gpt_model = Mock()
+
+        with patch("src.nodes.plan_nodes.get_plan_cache", return_value=cache), \
+             patch("src.nodes.plan_nodes.get_gpt_model", get_gpt_model), \
+             patch("src.nodes.plan_nodes.sop_loader") as mock_sop_loader:
+            mock_sop_loader.has_sop.return_value = False
+            result = await planning_node({"rewritten_query": "商户2048为什么没展示", "intent": "other"})
+
+            self.assertEqual(result["plan"], ["检查商户2048的召回"])
+            self.assertTrue(result["plan_cache"]["hit"])
+            get_gpt_model.assert_not_called()
+
+            # 命中的计划被 replan 改写后视为失败，缓存失效
+            summary = PlanExecutionSummary(query="q", total_steps=1, overall_status=StepStatus.SUCCESS)
+            with patch("src.nodes.plan_nodes.finalize_execution", return_value={"execution_summary": summary}):
+                await finalize_execution_node({**result, "plan": ["重新规划的步骤"]})
+
+        self.assertFalse(cache.stats()["templates"][key]["cached"])
+
+    async def test_later_sop_turn_does_not_touch_previous_entry(self):
+        from src.nodes.plan_nodes import finalize_execution_node, planning_node
+
+        cache = PlanCache()
+        key, _ = _key("商户1002为什么没展示")
+        summary = PlanExecutionSummary(query="q", total_steps=1, overall_status=StepStatus.SUCCESS)
+
+        with patch("src.nodes.plan_nodes.get_plan_cache", return_value=cache), \
+             patch("src.nodes.plan_nodes.finalize_execution", return_value={"execution_summary": summary}), \
+             patch("src.nodes.plan_nodes.sop_loader") as mock_sop_loader:
+            mock_sop_loader.has_sop.return_value = False
+            with patch("src.nodes.plan_nodes.run_cascade", AsyncMock(return_value=Plan(steps=["检查商户1002的召回"]))), \
+                 patch("src.prompt.prompt_loader.get_prompt", return_value="system"):
+                turn1 = await planning_node({"rewritten_query": "商户1002为什么没展示", "intent": "other"})
+            step_results = [StepExecutionResult(step_index=0, step_description="检查商户1002的召回", status=StepStatus.SUCCESS)]
+            finalized = await finalize_execution_node({**turn1, "step_results": step_results})
+            self.assertIsNone(finalized["plan_cache"])
+            self.assertTrue(cache.stats()["templates"][key]["cached"])
+
+            # 第二轮走 SOP，不经过 planning_node，checkpoint 里是上一轮 finalize 写回的状态
+            thread_state = {**turn1, **finalized, "step_results": step_results}
+            await finalize_execution_node({**thread_state, "plan": ["按 SOP 检查"], "step_results": step_results * 2})
+
+        stats = cache.stats()["templates"][key]
+        self.assertTrue(stats["cached"])
+        self.assertEqual((stats["executions"], stats["invalidations"]), (1, 0))
+
+    async def test_failures_from_earlier_turns_do_not_block_caching(self):
+        from src.nodes.plan_nodes import finalize_execution_node
+
+        cache = PlanCache()
+        key, slots = _key("商户1002为什么没展示")
+        steps = ["检查商户1002的召回"]
+        earlier = StepExecutionResult(step_index=0, step_description="查询订单", status=StepStatus.FAILED)
+        current = StepExecutionResult(step_index=0, step_description=steps[0], status=StepStatus.SUCCESS)
+        # 汇总状态按累积的 step_results 计算，会被上一轮的失败拖成 FAILED
+        summary = PlanExecutionSummary(query="q", total_steps=2, overall_status=StepStatus.FAILED)
+        cache_ref = {"key": key, "slots": slots, "hit": False, "results_offset": 1, "steps": steps}
+
+        with patch("src.nodes.plan_nodes.get_plan_cache", return_value=cache), \
+             patch("src.nodes.plan_nodes.finalize_execution", return_value={"execution_summary": summary}):
+            await finalize_execution_node({"plan": steps, "plan_cache": cache_ref, "step_results": [earlier, current]})
+
+        self.assertTrue(cache.stats()["templates"][key]["cached"])
+
+
+if __name__ == "__main__":
+    unittest.main()
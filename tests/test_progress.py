@@ -0,0 +1,38 @@
+import asyncio
+import unittest
+from typing import TypedDict
+
+from langgraph.graph import StateGraph
+
+from src.utils.progress import emit_progress
+
+
+class _State(TypedDict):
+    value: int
+
+
+class ProgressEventTests(unittest.TestCase):
+    def test_progress_is_streamed_but_not_stored(self):
+        def node(state: _State):
+            emit_progress("step_started", "开始", step_index=0)
+            return {"value": state["value"] + 1}
+
+        graph = StateGraph(_State)
+        graph.add_node("node", node)
+        graph.set_entry_point("node")
+        graph.set_finish_point("node")
+
+        async def run():
+            return [chunk async for chunk in graph.compile().astream({"value": 0}, stream_mode=["custom", "values"])]
+
+        chunks = asyncio.run(run())
+
+        self.assertIn(("custom", {"type": "progress", "stage": "step_started", "message": "开始", "step_index": 0}), chunks)
+        self.assertEqual(chunks[-1], ("values", {"value": 1}))
+
+    def test_noop_outside_graph(self):
+        emit_progress("step_started", "开始")
+
+
+if __name__ == "__main__":
+    unittest.main()
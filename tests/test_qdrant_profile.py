@@ -0,0 +1,62 @@
+import os
+import unittest
+from unittest.mock import Mock, patch
+
+from qdrant_client.models import BinaryQuantization, Disabled, ScalarQuantization
+
+from src.utils.qdrant_profile import (
+    DEFAULT_HNSW_EF_CONSTRUCT,
+    DEFAULT_HNSW_M,
+    PROFILES,
+    apply_profile,
+    get_profile,
+)
+
+
+class ProfileResolutionTests(unittest.TestCase):
+    def test_profile_resolved_from_argument_or_env(self):
+        with patch.dict(os.environ, {"QDRANT_COLLECTION_PROFILE": "INT8"}):
+            self.assertEqual(get_profile().name, "int8")
+            self.assertEqual(get_profile("binary").name, "binary")
+        with patch.dict(os.environ, {}, clear=True):
+            self.assertEqual(get_profile().name, "baseline")
+
+    def test_unknown_profile_raises(self):
+        with self.assertRaises(ValueError):
+            get_profile("pq")
+
+
+class ProfileConfigTests(unittest.TestCase):
+    def test_config_built_for_each_profile(self):
+        baseline, int8, binary = PROFILES["baseline"], PROFILES["int8"], PROFILES["binary"]
+
+        self.assertIsNone(baseline.quantization_config())
+        self.assertIsNone(baseline.search_params())
+        self.assertIsNone(baseline.vectors_config().on_disk)
+
+        self.assertIsInstance(int8.quantization_config(), ScalarQuantization)
+        self.assertTrue(int8.vectors_config().on_disk)
+        self.assertEqual(int8.search_params().hnsw_ef, 64)
+        self.assertEqual(int8.search_params().quantization.oversampling, 1.5)
+
+        self.assertIsInstance(binary.quantization_config(), BinaryQuantization)
+        self.assertEqual(binary.search_params().quantization.oversampling, 3.0)
+
+        exact = baseline.search_params(exact=True)
+        self.assertTrue(exact.exact)
+        self.assertTrue(exact.quantization.ignore)
+
+    def test_migrating_back_to_baseline_restores_defaults(self):
+        client = Mock()
+        apply_profile(client, "faq", PROFILES["baseline"])
+
+        kwargs = client.update_collection.call_args.kwargs
+        self.assertEqual(kwargs["hnsw_config"].m, DEFAULT_HNSW_M)
+        self.assertEqual(kwargs["hnsw_config"].ef_construct, DEFAULT_HNSW_EF_CONSTRUCT)
+        self.assertEqual(kwargs["vectors_config"][""].hnsw_config.m, DEFAULT_HNSW_M)
+        self.assertFalse(kwargs["vectors_config"][""].on_disk)
+        self.assertEqual(kwargs["quantization_config"], Disabled.DISABLED)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,42 @@
+import asyncio
+import unittest
+
+from langgraph.checkpoint.base import empty_checkpoint
+from langgraph.checkpoint.memory import InMemorySaver
+
+from src.utils.sharded_checkpointer import HashRing, ShardedCheckpointer
+
+
+class HashRingTests(unittest.TestCase):
+    def test_adding_shard_moves_only_a_fraction_of_threads(self):
+        before = HashRing(["s0", "s1", "s2"])
+        after = HashRing(["s0", "s1", "s2", "s3"])
+        thread_ids = [f"thread_{i}" for i in range(2000)]
+
+        moved = [t for t in thread_ids if before.node_for(t) != after.node_for(t)]
+
+        self.assertTrue(all(after.node_for(t) == "s3" for t in moved))
+        self.assertLess(len(moved), len(thread_ids) * 0.4)
+
+
+class ShardedCheckpointerTests(unittest.TestCase):
+    def test_dual_writes_while_resharding(self):
+        savers = {"s0": InMemorySaver(), "s1": InMemorySaver()}
+        ring, next_ring = HashRing(["s0"]), HashRing(["s0", "s1"])
+        thread_id = next(f"thread_{i}" for i in range(1000) if next_ring.node_for(f"thread_{i}") == "s1")
+        config = {"configurable": {"thread_id": thread_id, "checkpoint_ns": ""}}
+
+        async def run():
+            checkpointer = ShardedCheckpointer(ring, savers, next_ring=next_ring)
+            await checkpointer.aput(config, empty_checkpoint(), {}, {})
+            return await checkpointer.aget_tuple(config)
+
+        result = asyncio.run(run())
+
+        self.assertIsNotNone(result)
+        for saver in savers.values():
+            self.assertEqual(saver.get_tuple(config).checkpoint["id"], result.checkpoint["id"])
+
+
+if __name__ == "__main__":
+    unittest.main()
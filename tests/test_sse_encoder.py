@@ -0,0 +1,45 @@
+import json
+import unittest
+from datetime import datetime
+
+from langchain_core.messages import AIMessage, AIMessageChunk
+
+from src.models.execution_result import StepExecutionResult, StepStatus
+from src.utils.sse_encoder import StreamEncoder
+
+
+def _payload(event: str) -> dict:
+    return json.loads(event.split("data: ", 1)[1])
+
+
+class StreamEncoderTests(unittest.TestCase):
+    def test_updates_only_carry_new_messages_and_steps(self):
+        encoder = StreamEncoder("thread_1")
+        step = StepExecutionResult(
+            step_index=0,
+            step_description="检查数据",
+            status=StepStatus.SUCCESS,
+            start_time=datetime(2024, 5, 1, 12, 0),
+        )
+
+        first = _payload(encoder.updates("plan_executor_node", {"step_results": [step], "current_step": 1}))
+        second = encoder.updates("plan_executor_node", {"step_results": [step]})
+
+        self.assertEqual(first["data"]["payload"]["step_results"][0]["status"], "success")
+        self.assertEqual(first["data"]["payload"]["step_results"][0]["start_time"], "2024-05-01T12:00:00")
+        self.assertIsNone(second)
+
+        encoder.messages(AIMessageChunk(content="答", id="msg_1"), {"langgraph_node": "response_generator"})
+        self.assertIsNone(encoder.updates("response_generator", {"messages": [AIMessage(content="答案", id="msg_1")]}))
+
+    def test_field_projection(self):
+        encoder = StreamEncoder("thread_1", fields=["plan"])
+
+        event = _payload(encoder.updates("planning_node", {"plan": ["a"], "current_step": 0}))
+
+        self.assertEqual(event["data"]["payload"], {"plan": ["a"]})
+        self.assertIsNone(encoder.updates("replan_node", {"current_step": 0}))
+
+
+if __name__ == "__main__":
+    unittest.main()
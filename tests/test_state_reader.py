@@ -0,0 +1,54 @@
+import asyncio
+import json
+import unittest
+
+from src.models.execution_result import StepExecutionResult, StepStatus
+from src.utils.checkpoint_serde import CompactSerializer
+from src.utils.state_reader import MySQLStateReader, etag_matches, find_step
+from tests.fakes import FakePool
+
+
+class StateReaderTests(unittest.TestCase):
+    def setUp(self):
+        serde = CompactSerializer()
+        self.steps = [
+            StepExecutionResult(step_index=0, step_description="查询订单", status=StepStatus.SUCCESS),
+            StepExecutionResult(step_index=1, step_description="查询物流", status=StepStatus.FAILED),
+        ]
+        step_type, step_blob = serde.dumps_typed(self.steps)
+        self.pool = FakePool([
+            ("SELECT checkpoint_id FROM checkpoints", [{"checkpoint_id": "cp-2"}]),
+            ("JSON_EXTRACT(checkpoint", [{
+                "inline_values": json.dumps({"original_query": "我的快递到哪了"}),
+                "channel_versions": json.dumps({"original_query": "1", "step_results": "5", "messages": "7"}),
+            }]),
+            ("FROM checkpoint_blobs", [{"channel": "step_results", "type": step_type, "blob": step_blob}]),
+        ])
+        self.reader = MySQLStateReader(self.pool, serde=serde)
+
+    def test_reads_only_requested_channels(self):
+        view = asyncio.run(self.reader.read("t1", channels=("original_query", "step_results", "plan")))
+
+        self.assertEqual(view.checkpoint_id, "cp-2")
+        self.assertEqual(view.etag, '"cp-2"')
+        self.assertEqual(view.values["original_query"], "我的快递到哪了")
+        self.assertEqual(view.values["step_results"], self.steps)
+        self.assertNotIn("plan", view.values)
+        blob_query = [params for query, params in self.pool.executed if "FROM checkpoint_blobs" in query]
+        self.assertEqual(blob_query, [["t1", "step_results", "5"]])
+        self.assertEqual(find_step(view.values["step_results"], 1).step_description, "查询物流")
+
+    def test_matching_etag_skips_loading_channels(self):
+        view = asyncio.run(self.reader.read("t1", if_none_match='W/"cp-1", "cp-2"'))
+
+        self.assertTrue(view.not_modified)
+        self.assertEqual(len(self.pool.executed), 1)
+
+    def test_etag_matching(self):
+        self.assertTrue(etag_matches("*", "cp"))
+        self.assertFalse(etag_matches('"cp-1"', "cp-2"))
+        self.assertFalse(etag_matches(None, "cp-2"))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -2,7 +2,7 @@ import unittest
 from types import SimpleNamespace
 from unittest.mock import AsyncMock, Mock, patch
 
-from langchain_core.messages import AIMessage, HumanMessage
+from langchain_core.messages import AIMessage, AIMessageChunk, HumanMessage
 from langgraph.errors import GraphInterrupt
 from langgraph.types import Command
 
@@ -164,7 +164,8 @@ class HumanInTheLoopFlowTests(unittest.IsolatedAsyncioTestCase):
         self.assertEqual(command.update["human_question"], "请补充商户ID")
         self.assertEqual(command.update["human_resume_node"], "plan_executor_node")
         self.assertNotIn("step_results", command.update)
-        self.assertTrue(any(msg.content.startswith("⏸️ 步骤") for msg in command.update["messages"]))
+        # 进度提示走 stream writer，不再写入 messages
+        self.assertNotIn("messages", command.update)
 
     async def test_plan_executor_skips_ask_human_tool_in_tool_results(self):
         mock_ai_response = AIMessage(content="")
@@ -263,11 +264,16 @@ class HumanInTheLoopFlowTests(unittest.IsolatedAsyncioTestCase):
         self.assertEqual(result["step_results"][0].status, StepStatus.SUCCESS)
 
     async def test_query_rewrite_routes_to_ask_human(self):
-        mock_llm = SimpleNamespace(
-            ainvoke=AsyncMock(
-                return_value=AIMessage(
-                    content='{"need_clarification": true, "clarifying_question": "请补充商户ID", "rewritten_query": "", "keywords": []}'
-                )
+        mock_llm = Mock()
+        mock_llm.bind_tools = Mock(return_value=mock_llm)
+        mock_llm.ainvoke = AsyncMock(
+            return_value=AIMessage(
+                content="",
+                tool_calls=[{
+                    "name": "QueryRewrite",
+                    "args": {"need_clarification": True, "clarifying_question": "请补充商户ID", "rewritten_query": "", "keywords": []},
+                    "id": "call_1",
+                }],
             )
         )
 
@@ -288,11 +294,16 @@ class HumanInTheLoopFlowTests(unittest.IsolatedAsyncioTestCase):
         self.assertEqual(command.update["human_resume_node"], "query_rewrite_node")
 
     async def test_query_rewrite_consumes_latest_human_message(self):
-        mock_llm = SimpleNamespace(
-            ainvoke=AsyncMock(
-                return_value=AIMessage(
-                    content='{"need_clarification": false, "clarifying_question": "", "rewritten_query": "查询商户\\n补充信息：商户1002", "keywords": ["商户1002"]}'
-                )
+        mock_llm = Mock()
+        mock_llm.bind_tools = Mock(return_value=mock_llm)
+        mock_llm.ainvoke = AsyncMock(
+            return_value=AIMessage(
+                content="",
+                tool_calls=[{
+                    "name": "QueryRewrite",
+                    "args": {"need_clarification": False, "rewritten_query": "查询商户\n补充信息：商户1002", "keywords": ["商户1002"]},
+                    "id": "call_1",
+                }],
             )
         )
 
@@ -311,9 +322,10 @@ class HumanInTheLoopFlowTests(unittest.IsolatedAsyncioTestCase):
         self.assertEqual(result["keywords"], ["商户1002"])
 
     async def test_replan_routes_to_finalize_on_respond(self):
-        mock_llm = SimpleNamespace(
-            ainvoke=AsyncMock(return_value=AIMessage(content='{"decision":"respond","reasoning":"enough"}'))
-        )
+        # 代理忽略 tool_choice 直接回复 JSON 文本时也能解析
+        mock_llm = Mock()
+        mock_llm.bind_tools = Mock(return_value=mock_llm)
+        mock_llm.ainvoke = AsyncMock(return_value=AIMessage(content='{"decision":"respond","reasoning":"enough"}'))
 
         with patch("src.prompt.prompt_loader.get_prompt", return_value="{query}\n{plan_list}\n{completed_steps}\n{remaining_steps}\n{sop_note}"), \
              patch("src.nodes.plan_nodes.get_gpt_model", return_value=mock_llm):
@@ -382,30 +394,27 @@ class ExecuteChatRequestSmokeTests(unittest.IsolatedAsyncioTestCase):
 
 class PlanningNodeTests(unittest.IsolatedAsyncioTestCase):
     async def test_empty_plan_prompt_does_not_error(self):
-        mock_llm = AsyncMock()
-        mock_llm.ainvoke = AsyncMock(return_value=AIMessage(content='{"steps": ["step1"]}'))
+        async def astream(messages):
+            yield AIMessageChunk(content="", tool_call_chunks=[{"name": "Plan", "args": '{"steps": ["st', "id": "call_1", "index": 0}])
+            yield AIMessageChunk(content="", tool_call_chunks=[{"name": None, "args": 'ep1"]}', "id": None, "index": 0}])
 
-        mock_parser = Mock()
-        mock_parser.get_format_instructions = Mock(return_value="format")
+        mock_llm = Mock()
+        mock_llm.bind_tools = Mock(return_value=mock_llm)
+        mock_llm.astream = astream
 
         with patch("src.nodes.plan_nodes.sop_loader") as mock_sop_loader, \
              patch("src.nodes.plan_nodes.get_gpt_model", return_value=mock_llm), \
-             patch("src.nodes.plan_nodes.JsonOutputParser", return_value=mock_parser), \
-             patch("src.nodes.plan_nodes.ChatPromptTemplate") as mock_template, \
              patch("src.prompt.prompt_loader.get_prompt", return_value="system"):
             mock_sop_loader.get_planning_prompt.return_value = ""
 
-            mock_chain = AsyncMock()
-            mock_chain.ainvoke = AsyncMock(return_value={"steps": ["step1"]})
-            mock_template.from_messages.return_value.__or__ = Mock(return_value=Mock(__or__=Mock(return_value=mock_chain)))
-
             from src.nodes.plan_nodes import planning_node
             result = await planning_node({
                 "rewritten_query": "测试查询",
                 "intent": "default",
             })
 
-            self.assertIn("plan", result)
+            self.assertEqual(result["plan"], ["step1"])
+            self.assertEqual(mock_llm.bind_tools.call_args.kwargs["tool_choice"], "Plan")
 
 
 class TokenUsageAccumulationTests(unittest.TestCase):
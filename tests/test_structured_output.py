@@ -0,0 +1,89 @@
+import unittest
+from unittest.mock import AsyncMock, Mock, patch
+
+from langchain_core.messages import AIMessage, AIMessageChunk
+from langchain_openai import ChatOpenAI
+
+from src.graph_state import Plan, ReplanDecision
+from src.utils.structured_output import (
+    METHOD_JSON_SCHEMA,
+    StructuredOutputError,
+    ainvoke_structured,
+    bind_schema,
+    get_structured_output_stats,
+    parse_structured,
+)
+
+
+class ParseStructuredTests(unittest.TestCase):
+    def test_tool_call_and_content_are_both_parsed(self):
+        tool_message = AIMessage(content="", tool_calls=[{"name": "Plan", "args": {"steps": ["a"]}, "id": "call_1"}])
+        self.assertEqual(parse_structured(tool_message, Plan, "test_parse").steps, ["a"])
+
+        content_message = AIMessage(content='```json\n{"decision": "continue"}\n```')
+        self.assertEqual(parse_structured(content_message, ReplanDecision, "test_parse").decision, "continue")
+        self.assertEqual(get_structured_output_stats()["test_parse"]["via"], {"tool_call": 1, "content": 1})
+
+    def test_schema_mismatch_is_counted(self):
+        message = AIMessage(content='{"decision": "maybe"}')
+        with self.assertRaises(StructuredOutputError) as ctx:
+            parse_structured(message, ReplanDecision, "test_mismatch")
+        # 作为 ValueError 抛出，run_cascade 据此升级模型
+        self.assertIsInstance(ctx.exception, ValueError)
+
+        with self.assertRaises(StructuredOutputError):
+            parse_structured(AIMessage(content="无法判断"), ReplanDecision, "test_mismatch")
+
+        stats = get_structured_output_stats()["test_mismatch"]
+        self.assertEqual(stats["parse_failures"], 2)
+        self.assertEqual(stats["reasons"], {"schema_mismatch": 1, "invalid_json": 1})
+
+    def test_bind_schema_forces_tool_or_response_format(self):
+        llm = ChatOpenAI(model="gpt-4.1-mini", api_key="test")
+        tool_bound = bind_schema(llm, Plan)
+        self.assertEqual(tool_bound.kwargs["tools"][0]["function"]["name"], "Plan")
+        self.assertEqual(tool_bound.kwargs["tool_choice"]["function"]["name"], "Plan")
+
+        json_bound = bind_schema(llm, Plan, method=METHOD_JSON_SCHEMA)
+        self.assertEqual(json_bound.kwargs["response_format"]["json_schema"]["name"], "Plan")
+
+
+class StreamingTests(unittest.IsolatedAsyncioTestCase):
+    async def test_partial_results_are_streamed(self):
+        async def astream(messages):
+            for args in ('{"steps": ["查', '询召回", "检', '查展示"]}'):
+                yield AIMessageChunk(content="", tool_call_chunks=[{"name": None, "args": args, "id": None, "index": 0}])
+
+        llm = Mock()
+        llm.bind_tools = Mock(return_value=llm)
+        llm.astream = astream
+        llm.ainvoke = AsyncMock()
+        partials = []
+
+        plan = await ainvoke_structured(llm, [], Plan, "test_stream", on_partial=partials.append)
+
+        self.assertEqual(plan.steps, ["查询召回", "检查展示"])
+        self.assertEqual(partials[0], {"steps": ["查"]})
+        self.assertEqual(partials[-1], {"steps": ["查询召回", "检查展示"]})
+        llm.ainvoke.assert_not_called()
+
+
+class QueryRewriteFallbackTests(unittest.IsolatedAsyncioTestCase):
+    async def test_invalid_output_on_all_tiers_falls_back_to_original_query(self):
+        from src.nodes.query_rewrite_node import query_rewrite_node
+
+        llm = Mock()
+        llm.bind_tools = Mock(return_value=llm)
+        llm.ainvoke = AsyncMock(return_value=AIMessage(content="抱歉，我无法处理"))
+
+        with patch("src.nodes.query_rewrite_node.get_gpt_model", return_value=llm), \
+             patch("src.nodes.query_rewrite_node.get_prompt", return_value="{query} {history}"):
+            result = await query_rewrite_node({"original_query": "商户1002不展示", "messages": [], "plan": [], "current_step": 0})
+
+        self.assertEqual(result, {"rewritten_query": "商户1002不展示"})
+        self.assertEqual(llm.ainvoke.await_count, 2)
+        self.assertGreaterEqual(get_structured_output_stats()["query_rewrite_node"]["parse_failures"], 2)
+
+
+if __name__ == "__main__":
+    unittest.main()
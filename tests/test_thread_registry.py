@@ -0,0 +1,48 @@
+import os
+import unittest
+from datetime import datetime
+from types import SimpleNamespace
+from unittest.mock import AsyncMock, patch
+
+from src.utils.thread_registry import build_list_query, decode_cursor, encode_cursor
+from src.utils.time_travel_utils import get_all_thread_ids
+
+
+class ThreadRegistryQueryTests(unittest.TestCase):
+    def test_cursor_roundtrip(self):
+        last_active = datetime(2024, 5, 1, 12, 30, 0, 123456)
+
+        self.assertEqual(decode_cursor(encode_cursor(last_active, "thread_1")), (last_active, "thread_1"))
+
+    def test_invalid_cursor_raises_value_error(self):
+        with self.assertRaises(ValueError):
+            decode_cursor("not-a-cursor")
+
+    def test_list_query_uses_keyset_and_filters(self):
+        cursor = encode_cursor(datetime(2024, 5, 1, 12, 0), "thread_9")
+
+        query, params = build_list_query(status="completed", intent="order_query", limit=20, cursor=cursor)
+
+        self.assertIn("WHERE status = %s AND intent = %s AND (last_active < %s OR (last_active = %s AND thread_id < %s))", query)
+        self.assertTrue(query.endswith("ORDER BY last_active DESC, thread_id DESC LIMIT %s"))
+        self.assertEqual(params[:2], ["completed", "order_query"])
+        self.assertEqual(params[-2:], ["thread_9", 21])
+
+
+class GetAllThreadIdsTests(unittest.IsolatedAsyncioTestCase):
+    async def test_reads_registry_when_enabled(self):
+        page = {"items": [{"thread_id": "t2"}, {"thread_id": "t1"}], "next_cursor": None}
+        with patch.dict(os.environ, {"LANGGRAPH_CHECKPOINTER": "mysql", "THREAD_REGISTRY_ENABLED": "true"}), \
+             patch("src.utils.time_travel_utils.list_threads", new=AsyncMock(return_value=page)):
+            self.assertEqual(await get_all_thread_ids(SimpleNamespace(checkpointer=None)), ["t2", "t1"])
+
+    async def test_memory_checkpointer_skips_registry(self):
+        list_threads = AsyncMock()
+        with patch.dict(os.environ, {"LANGGRAPH_CHECKPOINTER": "memory"}), \
+             patch("src.utils.time_travel_utils.list_threads", new=list_threads):
+            self.assertEqual(await get_all_thread_ids(SimpleNamespace(checkpointer=object())), [])
+        list_threads.assert_not_called()
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,67 @@
+import asyncio
+import operator
+import unittest
+from typing import Annotated, TypedDict
+
+from langgraph.checkpoint.memory import InMemorySaver
+from langgraph.graph import StateGraph
+from langgraph.types import Command, interrupt
+
+from src.utils.tiered_checkpointer import HotCheckpointTier, TieredCheckpointer
+
+
+class _State(TypedDict):
+    items: Annotated[list, operator.add]
+
+
+def _build_graph(checkpointer):
+    def collect(state: _State):
+        answer = interrupt("need input")
+        return {"items": [answer]}
+
+    graph = StateGraph(_State)
+    graph.add_node("collect", collect)
+    graph.set_entry_point("collect")
+    graph.set_finish_point("collect")
+    return graph.compile(checkpointer=checkpointer)
+
+
+class TieredCheckpointerTests(unittest.TestCase):
+    def test_resume_is_served_from_hot_tier(self):
+        durable = InMemorySaver()
+        hot = HotCheckpointTier(max_threads=10, ttl_seconds=60)
+        config = {"configurable": {"thread_id": "thread_1"}}
+
+        async def run():
+            # 每轮重新编译图，模拟按请求构建
+            await _build_graph(TieredCheckpointer(durable, hot)).ainvoke({"items": ["a"]}, config)
+            result = await _build_graph(TieredCheckpointer(durable, hot)).ainvoke(Command(resume="b"), config)
+            durable_state = await _build_graph(durable).aget_state(config)
+            return result, durable_state
+
+        result, durable_state = asyncio.run(run())
+
+        self.assertEqual(result["items"], ["a", "b"])
+        self.assertEqual(durable_state.values["items"], ["a", "b"])
+        self.assertGreater(hot.stats()["hits"], 0)
+
+    def test_lru_eviction_and_ttl(self):
+        hot = HotCheckpointTier(max_threads=1, ttl_seconds=60)
+        checkpoint = {"v": 4, "id": "1", "ts": "", "channel_values": {}, "channel_versions": {}, "versions_seen": {}}
+
+        hot.put("thread_1", "", checkpoint, {}, None)
+        hot.put("thread_2", "", checkpoint, {}, None)
+
+        self.assertIsNone(hot.get("thread_1", ""))
+        self.assertEqual(hot.get("thread_2", "").checkpoint["id"], "1")
+        self.assertIsNone(hot.get("thread_2", "", checkpoint_id="0"))
+        self.assertEqual(hot.stats()["evictions"], 1)
+
+        hot.ttl_seconds = 0
+        hot.put("thread_3", "", checkpoint, {}, None)
+        self.assertIsNone(hot.get("thread_3", ""))
+        self.assertEqual(hot.stats()["expirations"], 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
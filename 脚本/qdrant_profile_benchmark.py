@@ -0,0 +1,207 @@
+"""
+Qdrant 集合配置档基准测试
+
+对比各配置档（baseline / int8 / binary ...）相对精确检索（exact=True）的：
+- 查询延迟 p50 / p99
+- 内存占用（按配置估算 + Qdrant 进程 RSS 变化）
+- recall@3
+
+用法（需本地 Qdrant）：
+    python 脚本/qdrant_profile_benchmark.py --source dz_channel_faq
+    python 脚本/qdrant_profile_benchmark.py --synthetic 20000 --profiles baseline,int8,binary
+"""
+import argparse
+import math
+import random
+import statistics
+import sys
+import time
+from pathlib import Path
+from typing import Dict, List, Optional
+
+import requests
+from qdrant_client import QdrantClient
+from qdrant_client.models import CollectionStatus, PointStruct
+
+project_root = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(project_root))
+
+from src.config.qdrant import get_qdrant_client_kwargs, get_qdrant_url
+from src.constants import DEFAULT_RETRIEVAL_LIMIT, EMBEDDING_VECTOR_SIZE
+from src.utils.qdrant_profile import PROFILES, create_collection, estimate_ram_bytes, get_profile
+
+
+def load_source_points(client: QdrantClient, collection_name: str) -> List[PointStruct]:
+    """从已有集合导出全部点（含向量）作为基准数据。"""
+    points = []
+    offset = None
+    while True:
+        records, offset = client.scroll(
+            collection_name=collection_name,
+            limit=256,
+            offset=offset,
+            with_payload=True,
+            with_vectors=True,
+        )
+        for record in records:
+            points.append(PointStruct(id=record.id, vector=record.vector, payload=record.payload))
+        if offset is None:
+            break
+    return points
+
+
+def _normalize(vector: List[float]) -> List[float]:
+    norm = math.sqrt(sum(v * v for v in vector)) or 1.0
+    return [v / norm for v in vector]
+
+
+def make_synthetic_points(count: int, dim: int, seed: int = 42) -> List[PointStruct]:
+    rng = random.Random(seed)
+    return [
+        PointStruct(id=i, vector=_normalize([rng.gauss(0, 1) for _ in range(dim)]), payload={"i": i})
+        for i in range(count)
+    ]
+
+
+def make_queries(points: List[PointStruct], count: int, noise: float = 0.05, seed: int = 7) -> List[List[float]]:
+    """以语料中的向量加少量扰动作为查询，模拟“相似问法”。"""
+    rng = random.Random(seed)
+    samples = rng.sample(points, min(count, len(points)))
+    return [_normalize([v + rng.gauss(0, noise) for v in p.vector]) for p in samples]
+
+
+def read_qdrant_rss() -> Optional[int]:
+    """读取 Qdrant /metrics 中的进程常驻内存（字节），读取失败返回 None。"""
+    try:
+        resp = requests.get(f"{get_qdrant_url()}/metrics", timeout=5)
+        resp.raise_for_status()
+    except requests.RequestException:
+        return None
+    for line in resp.text.splitlines():
+        if line.startswith("memory_resident_bytes"):
+            return int(float(line.split()[-1]))
+    return None
+
+
+def wait_until_indexed(client: QdrantClient, collection_name: str, timeout_s: float = 600) -> None:
+    deadline = time.time() + timeout_s
+    while time.time() < deadline:
+        info = client.get_collection(collection_name)
+        if info.status == CollectionStatus.GREEN:
+            return
+        time.sleep(1)
+    print(f"⚠️ {collection_name} 未在 {timeout_s}s 内完成索引，结果可能偏慢")
+
+
+def percentile(values: List[float], pct: float) -> float:
+    if len(values) < 2:
+        return values[0] if values else 0.0
+    return statistics.quantiles(values, n=100, method="inclusive")[int(pct) - 1]
+
+
+def run_queries(client: QdrantClient, collection_name: str, queries: List[List[float]], search_params, limit: int):
+    latencies_ms = []
+    results = []
+    for query in queries:
+        start = time.perf_counter()
+        resp = client.query_points(
+            collection_name=collection_name,
+            query=query,
+            limit=limit,
+            search_params=search_params,
+            with_payload=False,
+        )
+        latencies_ms.append((time.perf_counter() - start) * 1000)
+        results.append([p.id for p in resp.points])
+    return latencies_ms, results
+
+
+def benchmark(args) -> List[Dict]:
+    client = QdrantClient(**get_qdrant_client_kwargs())
+    if args.synthetic:
+        points = make_synthetic_points(args.synthetic, args.dim)
+    else:
+        points = load_source_points(client, args.source)
+    if not points:
+        raise SystemExit("没有可用于基准测试的数据")
+
+    vector_size = len(points[0].vector)
+    queries = make_queries(points, args.queries)
+    rows = []
+
+    for name in args.profiles.split(","):
+        profile = get_profile(name.strip())
+        collection_name = f"{args.prefix}_{profile.name}"
+        if client.collection_exists(collection_name):
+            client.delete_collection(collection_name)
+
+        rss_before = read_qdrant_rss()
+        create_collection(client, collection_name, profile, vector_size=vector_size)
+        for i in range(0, len(points), 256):
+            client.upsert(collection_name=collection_name, points=points[i:i + 256], wait=True)
+        wait_until_indexed(client, collection_name)
+        rss_after = read_qdrant_rss()
+
+        # 精确检索结果作为 ground truth
+        _, exact_results = run_queries(
+            client, collection_name, queries, profile.search_params(exact=True), args.limit
+        )
+        # 预热一轮，排除首次加载的影响
+        run_queries(client, collection_name, queries[:10], profile.search_params(), args.limit)
+        latencies, approx_results = run_queries(
+            client, collection_name, queries, profile.search_params(), args.limit
+        )
+
+        recall = statistics.mean(
+            len(set(exact) & set(approx)) / max(len(exact), 1)
+            for exact, approx in zip(exact_results, approx_results)
+        )
+        rows.append({
+            "profile": profile.name,
+            "points": len(points),
+            "p50_ms": percentile(latencies, 50),
+            "p99_ms": percentile(latencies, 99),
+            f"recall@{args.limit}": recall,
+            "est_ram_mb": estimate_ram_bytes(profile, len(points), vector_size) / 1024 / 1024,
+            "rss_delta_mb": (
+                (rss_after - rss_before) / 1024 / 1024
+                if rss_before is not None and rss_after is not None else None
+            ),
+        })
+
+        if not args.keep:
+            client.delete_collection(collection_name)
+    return rows
+
+
+def print_table(rows: List[Dict]) -> None:
+    if not rows:
+        return
+    headers = list(rows[0].keys())
+    print(" | ".join(headers))
+    print(" | ".join("---" for _ in headers))
+    for row in rows:
+        cells = []
+        for key in headers:
+            value = row[key]
+            cells.append(f"{value:.3f}" if isinstance(value, float) else str(value))
+        print(" | ".join(cells))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Qdrant collection profile benchmark")
+    parser.add_argument("--source", default="dz_channel_faq", help="导出基准数据的源集合")
+    parser.add_argument("--synthetic", type=int, default=0, help="使用 N 条随机向量代替源集合")
+    parser.add_argument("--dim", type=int, default=EMBEDDING_VECTOR_SIZE, help="随机向量维度")
+    parser.add_argument("--profiles", default=",".join(PROFILES), help="逗号分隔的配置档列表")
+    parser.add_argument("--queries", type=int, default=200, help="查询条数")
+    parser.add_argument("--limit", type=int, default=DEFAULT_RETRIEVAL_LIMIT, help="top-k")
+    parser.add_argument("--prefix", default="bench_faq", help="临时集合名前缀")
+    parser.add_argument("--keep", action="store_true", help="保留临时集合")
+    args = parser.parse_args()
+
+    print_table(benchmark(args))
+
+
+if __name__ == "__main__":
+    main()
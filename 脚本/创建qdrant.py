@@ -2,13 +2,14 @@ import sys
 from pathlib import Path
 
 from qdrant_client import QdrantClient
-from qdrant_client.models import Distance, VectorParams, PointStruct
+from qdrant_client.models import PointStruct
 
 project_root = Path(__file__).resolve().parent.parent
 sys.path.insert(0, str(project_root))
 
 from src.config.eb import TongyiEmbedding
 from src.config.qdrant import get_qdrant_client_kwargs
+from src.utils.qdrant_profile import create_collection, get_profile
 
 client = QdrantClient(**get_qdrant_client_kwargs())
 
@@ -16,12 +17,10 @@ collection_name = "dz_channel_faq"
 vector_size = 1536  # 确保与 TongyiEmbedding 输出维度一致
 
 # ✅ 安全创建：先检查是否已存在，避免重复创建报错
-if not client.collection_exists(collection_name):
-    client.create_collection(
-        collection_name=collection_name,
-        vectors_config=VectorParams(size=vector_size, distance=Distance.COSINE)
-    )
-    print(f"✅ 集合 '{collection_name}' 创建成功！")
+# 配置档由 QDRANT_COLLECTION_PROFILE 决定（baseline / int8 / binary）
+profile = get_profile()
+if create_collection(client, collection_name, profile, vector_size=vector_size):
+    print(f"✅ 集合 '{collection_name}' 创建成功！(profile={profile.name})")
 else:
     print(f"⚠️ 集合 '{collection_name}' 已存在，跳过创建。")
 